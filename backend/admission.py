@@ -0,0 +1,199 @@
+# Admission control for LLM-backed endpoints (token buckets + bounded concurrency)
+import functools
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from flask import jsonify, request, session
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens/second refill up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Take one token; return (allowed, seconds until a token is available)"""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class ConcurrencyLimiter:
+    """
+    At most `max_concurrent` requests run at once; up to `max_queue` more wait
+    (holding their worker thread) for at most `queue_timeout` seconds. Everything
+    beyond that is shed immediately so cheap endpoints keep free threads.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> bool:
+        with self._cond:
+            if self.active < self.max_concurrent:
+                self.active += 1
+                return True
+            if self.waiting >= self.max_queue:
+                return False
+            self.waiting += 1
+            try:
+                admitted = self._cond.wait_for(lambda: self.active < self.max_concurrent, self.queue_timeout)
+                if admitted:
+                    self.active += 1
+                return admitted
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+class AdmissionController:
+    """Global and per-session rate limits plus a concurrency limiter shared by LLM routes"""
+
+    def __init__(self, enabled: bool = True, global_rate: float = 5.0, global_burst: float = 20,
+                 session_rate: float = 0.5, session_burst: float = 5, max_concurrent: int = 2,
+                 max_queue: int = 1, queue_timeout: float = 1.0, max_sessions: int = 10000):
+        self.enabled = enabled
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.max_sessions = max_sessions
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.limiter = ConcurrencyLimiter(max_concurrent, max_queue, queue_timeout)
+        self._sessions: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'admitted': 0, 'rejected_session_rate': 0,
+                      'rejected_global_rate': 0, 'rejected_concurrency': 0}
+
+    def _session_bucket(self, key: str) -> TokenBucket:
+        bucket = self._sessions.get(key)
+        if bucket is None:
+            bucket = self._sessions[key] = TokenBucket(self.session_rate, self.session_burst)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(key)
+        return bucket
+
+    def check_rate(self, key: str) -> Tuple[Optional[str], float]:
+        """Apply the per-session then the global bucket; return (rejection reason, retry after)"""
+        with self._lock:
+            now = time.monotonic()
+            session_bucket = self._session_bucket(key)
+            allowed, wait = session_bucket.try_acquire(now)
+            if not allowed:
+                self.stats['rejected_session_rate'] += 1
+                return 'session_rate', wait
+            allowed, wait = self.global_bucket.try_acquire(now)
+            if not allowed:
+                # Don't charge the session for a request the server turned away
+                session_bucket.refund()
+                self.stats['rejected_global_rate'] += 1
+                return 'global_rate', wait
+            return None, 0.0
+
+    def try_admit(self, key: str) -> Tuple[Optional[str], float]:
+        """Admit a request (rate limits, then a concurrency slot); return (rejection reason, retry after)"""
+        reason, retry_after = self.check_rate(key)
+        if reason:
+            return reason, retry_after
+        if not self.limiter.acquire():
+            with self._lock:
+                self._session_bucket(key).refund()
+                self.global_bucket.refund()
+                self.stats['rejected_concurrency'] += 1
+            return 'concurrency', self.limiter.queue_timeout
+        with self._lock:
+            self.stats['admitted'] += 1
+        return None, 0.0
+
+    def release(self):
+        """Free the concurrency slot taken by try_admit"""
+        self.limiter.release()
+
+    def get_stats(self) -> Dict:
+        """Get limiter configuration, live concurrency and rejection counters"""
+        with self._lock:
+            stats = dict(self.stats)
+            tracked_sessions = len(self._sessions)
+        return dict(stats,
+                    enabled=self.enabled,
+                    active=self.limiter.active,
+                    waiting=self.limiter.waiting,
+                    max_concurrent=self.limiter.max_concurrent,
+                    max_queue=self.limiter.max_queue,
+                    global_rate_per_sec=self.global_bucket.rate,
+                    session_rate_per_sec=self.session_rate,
+                    tracked_sessions=tracked_sessions)
+
+
+def _client_key() -> str:
+    return str(session.get('user_id') or session.get('session_id') or request.remote_addr or 'anonymous')
+
+
+def _reject(message: str, retry_after: float):
+    response = jsonify({
+        'status': 'error',
+        'message': message,
+        'retry_after': math.ceil(retry_after)
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admission_controlled(func):
+    """Route decorator: rate-limit and bound concurrency of an LLM-backed endpoint"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not admission.enabled:
+            return func(*args, **kwargs)
+
+        reason, retry_after = admission.try_admit(_client_key())
+        if reason == 'session_rate':
+            return _reject('Too many AI requests. Please slow down.', retry_after)
+        if reason:
+            return _reject('The AI service is busy. Please try again shortly.', retry_after)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            admission.release()
+    return wrapper
+
+
+# Global admission controller (limits are per worker process)
+admission = AdmissionController(
+    enabled=os.getenv('LLM_ADMISSION_ENABLED', '1') == '1',
+    global_rate=float(os.getenv('LLM_GLOBAL_RATE', 5)),
+    global_burst=float(os.getenv('LLM_GLOBAL_BURST', 20)),
+    session_rate=float(os.getenv('LLM_SESSION_RATE', 0.5)),
+    session_burst=float(os.getenv('LLM_SESSION_BURST', 5)),
+    max_concurrent=int(os.getenv('LLM_MAX_CONCURRENT', 2)),
+    max_queue=int(os.getenv('LLM_MAX_QUEUE', 1)),
+    queue_timeout=float(os.getenv('LLM_QUEUE_TIMEOUT', 1.0))
+)
@@ -0,0 +1,50 @@
+# Alarm tone synthesis for the drowsiness detector (vectorized, in memory, cached per process)
+import io
+import os
+import wave
+from functools import lru_cache
+
+import numpy as np
+
+WAVEFORMS = ('sine', 'square', 'sawtooth', 'beep')
+
+ALARM_WAVEFORM = os.getenv('ALARM_WAVEFORM', 'sine')
+ALARM_FREQUENCY = float(os.getenv('ALARM_FREQUENCY', 800))
+ALARM_VOLUME = float(os.getenv('ALARM_VOLUME', 0.3))
+ALARM_SAMPLE_RATE = 22050
+ALARM_DURATION = 1.0
+
+
+def synthesize(waveform: str = 'sine', frequency: float = 800.0, volume: float = 0.3,
+               sample_rate: int = ALARM_SAMPLE_RATE, duration: float = ALARM_DURATION) -> np.ndarray:
+    """Stereo int16 samples (frames, 2) for one period of the alarm, computed in one pass"""
+    if waveform not in WAVEFORMS:
+        raise ValueError(f"Unknown waveform '{waveform}' (expected one of {', '.join(WAVEFORMS)})")
+    volume = min(max(volume, 0.0), 1.0)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    phase = frequency * t
+    if waveform == 'square':
+        wave_ = np.sign(np.sin(2 * np.pi * phase))
+    elif waveform == 'sawtooth':
+        wave_ = 2.0 * (phase - np.floor(phase + 0.5))
+    else:
+        wave_ = np.sin(2 * np.pi * phase)
+        if waveform == 'beep':
+            # Four short beeps per loop: on for the first 60% of every quarter second
+            wave_ *= (t * 4) % 1.0 < 0.6
+    mono = (wave_ * volume * 32767).astype(np.int16)
+    return np.repeat(mono[:, None], 2, axis=1)
+
+
+@lru_cache(maxsize=8)
+def alarm_wav(waveform: str = ALARM_WAVEFORM, frequency: float = ALARM_FREQUENCY, volume: float = ALARM_VOLUME,
+              sample_rate: int = ALARM_SAMPLE_RATE, duration: float = ALARM_DURATION) -> bytes:
+    """The alarm as WAV file bytes, synthesized once per process for each setting"""
+    samples = synthesize(waveform, frequency, volume, sample_rate, duration)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
@@ -1,106 +1,165 @@
 # Flask app for Smart Grocery + Recipe Planner
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import Blueprint, Flask, Response, render_template, make_response, request, jsonify, session, redirect, url_for, flash, send_file
 from dotenv import load_dotenv
 import os
 import json
 import logging
 from datetime import datetime, timedelta
 import uuid
+import atexit
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
+# Load environment variables (before importing modules that read configuration)
 load_dotenv()
 
-# OpenAI setup
-openai_client = None
-try:
-    import openai
-    openai_api_key = os.getenv('OPENAI_API_KEY')
-    if openai_api_key:
-        openai_client = openai.OpenAI(api_key=openai_api_key)
-        logger.info("✅ OpenAI client initialized")
-    else:
-        logger.warning("⚠️ OpenAI API key not found")
-except ImportError:
-    logger.warning("⚠️ OpenAI library not installed")
+from lazy_loader import LazyObject, lazy_import, ensure_loaded, reset_lazy
+from llm_usage import usage_tracker, llm_call_site, track_llm_call
+from llm_client import get_client, get_client_state, reset_client, LLMUnavailableError, CircuitOpenError
+from recipe_parser import (
+    RECIPE_SYSTEM_PROMPT, build_recipe_prompt, recipe_response_format,
+    parse_recipe_json, normalize_recipe, recipe_parse_stats
+)
+from chat_memory import conversation_store, extractive_summary
+import assets
+import http_cache
+import metrics
+import profiling
+from http_cache import make_etag, not_modified, with_etag, render_cached_page
+from admission import admission, admission_controlled
+from job_queue import job_queue
+from drowsiness_events import drowsiness_recorder
+import health_metrics
+from health_metrics import BatchError, activity_multiplier, bmi_category, calculate_bmr, normalize_activity_level
+
+# OpenAI setup (shared client with deadlines, retries and circuit breaker, created on first use)
+openai_client = LazyObject(get_client, 'openai_client')
 
 # Import custom modules (with error handling)
 try:
     from meal_planner import generate_meal_plan, budget_filter
 except ImportError:
     logger.warning("⚠️ meal_planner module not found. Some features may not work.")
-    
-try:
-    from firebase_service import save_user_data, get_user_data
-except ImportError:
-    logger.warning("⚠️ firebase_service module not found. Using fallback storage.")
-    
-try:
-    from openai_integration import generate_recipe_suggestions, generate_grocery_list
-except ImportError:
-    logger.warning("⚠️ openai_integration module not found. Some features may not work.")
-    
-try:
-    from database_service import db_service
-except ImportError:
-    logger.warning("⚠️ database_service module not found. Creating simple fallback.")
-    
-    # Simple fallback database service
-    class SimpleDatabaseService:
-        def __init__(self):
-            self.data = {'users': [], 'meal_plans': []}
-            
-        def save_user_profile(self, data):
-            user_id = str(uuid.uuid4())
-            data['user_id'] = user_id
-            self.data['users'].append(data)
-            return {'status': 'success', 'user_id': user_id}
-            
-        def get_user_profile(self, email):
-            for user in self.data['users']:
-                if user.get('email') == email:
-                    return user
-            return None
-            
-        def save_meal_plan(self, user_id, meal_plan_data):
-            meal_plan_data['user_id'] = user_id
-            meal_plan_data['id'] = str(uuid.uuid4())
-            self.data['meal_plans'].append(meal_plan_data)
-            return {'status': 'success'}
-            
-        def get_meal_plans(self, user_id):
-            return [plan for plan in self.data['meal_plans'] if plan.get('user_id') == user_id]
-            
-        def save_health_tracking(self, user_id, data):
-            return {'status': 'success'}
-            
-        def get_database_stats(self):
-            return {
-                'users': len(self.data['users']),
-                'meal_plans': len(self.data['meal_plans']),
-                'status': 'connected (fallback)'
-            }
-    
-    db_service = SimpleDatabaseService()
+
+# NumPy-backed recipe index is only imported when a recipe is first requested
+recipe_index = lazy_import('recipe_index', 'recipe_index')
+request_signature = lazy_import('recipe_index', 'request_signature')
+
+# Nutrition database (compiled CSV, memory-mapped) also loads on first use; without NumPy
+# recipes keep the model's calorie figure and plans go without estimates
+nutrition_db = lazy_import('nutrition_db', 'nutrition_db')
+attach_recipe_nutrition = lazy_import('nutrition_db', 'attach_recipe_nutrition', lambda recipe: recipe)
+plan_nutrition = lazy_import('nutrition_db', 'plan_nutrition', lambda meal_plan: None)
+
+# Model used for recipe generation (json_schema output on models that support it)
+RECIPE_MODEL = os.getenv('OPENAI_RECIPE_MODEL', 'gpt-3.5-turbo')
+
+# Simple fallback database service
+class SimpleDatabaseService:
+    def __init__(self):
+        self.data = {'users': [], 'meal_plans': []}
+        
+    def save_user_profile(self, data):
+        user_id = str(uuid.uuid4())
+        data['user_id'] = user_id
+        self.data['users'].append(data)
+        return {'status': 'success', 'user_id': user_id}
+        
+    def get_user_profile(self, email):
+        for user in self.data['users']:
+            if user.get('email') == email:
+                return user
+        return None
+        
+    def save_meal_plan(self, user_id, meal_plan_data):
+        meal_plan_data['user_id'] = user_id
+        meal_plan_data['id'] = str(uuid.uuid4())
+        self.data['meal_plans'].append(meal_plan_data)
+        return {'status': 'success'}
+        
+    def get_meal_plans(self, user_id):
+        return [plan for plan in self.data['meal_plans'] if plan.get('user_id') == user_id]
+        
+    def save_health_tracking(self, user_id, data):
+        return {'status': 'success'}
+        
+    def get_database_stats(self):
+        return {
+            'users': len(self.data['users']),
+            'meal_plans': len(self.data['meal_plans']),
+            'status': 'connected (fallback)'
+        }
+
+def load_database_service():
+    """Import the SQLite service (which creates its tables) or fall back to memory"""
+    try:
+        from database_service import db_service as service
+    except ImportError:
+        logger.warning("⚠️ database_service module not found. Creating simple fallback.")
+        service = SimpleDatabaseService()
+    return service
+
+db_service = LazyObject(load_database_service, 'db_service')
+
+# Why drowsiness detection is off in this process (set by load_drowsiness_sessions)
+drowsiness_unavailable_reason = 'Drowsiness detection requires opencv-python and mediapipe on the server'
+
+def load_drowsiness_sessions():
+    """Server-side drowsiness session manager (needs opencv-python, mediapipe and a single worker), or None"""
+    global drowsiness_unavailable_reason
+    # Sessions, cameras and the Face Mesh pool live in this process; with several workers a
+    # stream or stop request would land on a worker that does not own the session
+    workers = int(os.getenv('WEB_CONCURRENCY', 1))
+    if workers > 1:
+        drowsiness_unavailable_reason = (f'Drowsiness detection needs a single worker process (WEB_CONCURRENCY=1); '
+                                         f'this server runs {workers}')
+        logger.warning(f"⚠️ Drowsiness detection disabled: {workers} worker processes")
+        return None
+    try:
+        import mediapipe  # noqa: F401 - fail here, not on the first session
+        import simple_drowsiness_detector  # noqa: F401
+        from drowsiness_sessions import DetectionSessionManager
+    except ImportError as e:
+        logger.warning(f"⚠️ Drowsiness detection unavailable: {e}")
+        return None
+    manager = DetectionSessionManager(event_sink=drowsiness_recorder.record)
+    atexit.register(manager.shutdown)
+    return manager
+
+# Camera sessions share a bounded Face Mesh pool; the single-camera routes use the 'default' session
+drowsiness_sessions = LazyObject(load_drowsiness_sessions, 'drowsiness_sessions')
+
+# Flush buffered LLM usage and drowsiness events on shutdown
+atexit.register(usage_tracker.stop)
+atexit.register(drowsiness_recorder.stop)
 
 # Create fallback functions for missing modules
-def generate_meal_plan_fallback(health_data, budget, days, cuisine_preference):
-    return {
-        "daily_calories": 2000,
+def generate_meal_plan_fallback(health_data, budget, cuisine_preference="No Preference", days=7):
+    # Target intake (TDEE) as in the real planner; 2000 when the health data is incomplete
+    try:
+        daily_calories = round(calculate_bmr(float(health_data['weight']), float(health_data['height']),
+                                             int(health_data['age']), health_data.get('gender', 'male'))
+                               * activity_multiplier(health_data.get('activity_level')))
+    except (KeyError, TypeError, ValueError):
+        daily_calories = 2000
+    meal_plan = {
+        "daily_calories": daily_calories,
         "days": [
             {"breakfast": "Oatmeal with fruits", "lunch": "Grilled chicken salad", "dinner": "Baked salmon with vegetables"}
             for _ in range(days)
         ],
         "message": "Sample meal plan (using fallback)"
     }
+    # Estimated intake of the sample meals; daily_calories stays the target
+    meal_plan["nutrition"] = plan_nutrition(meal_plan)
+    return meal_plan
 
 def budget_filter_fallback(meal_plan, budget):
     return meal_plan
 
-def generate_recipe_suggestions_fallback(dietary_preferences, cuisine_type):
+def generate_recipe_suggestions_fallback(meal_plan):
     return [
         {"name": "Healthy Breakfast Bowl", "description": "Nutritious morning meal"},
         {"name": "Quick Lunch Salad", "description": "Fresh and light lunch option"},
@@ -126,144 +185,157 @@ if 'generate_meal_plan' not in globals():
     generate_meal_plan = generate_meal_plan_fallback
 if 'budget_filter' not in globals():
     budget_filter = budget_filter_fallback
-if 'generate_recipe_suggestions' not in globals():
-    generate_recipe_suggestions = generate_recipe_suggestions_fallback
-if 'generate_grocery_list' not in globals():
-    generate_grocery_list = generate_grocery_list_fallback
-if 'save_user_data' not in globals():
-    save_user_data = save_user_data_fallback
-if 'get_user_data' not in globals():
-    get_user_data = get_user_data_fallback
-
-load_dotenv()  # Load environment variables from .env
-
-app = Flask(__name__)
-app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-change-this')
-app.permanent_session_lifetime = timedelta(days=7)
 
-# Configure app
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Firebase (firebase_admin + a connection test) and OpenAI helpers load on first call
+save_user_data = lazy_import('firebase_service', 'save_user_data', save_user_data_fallback)
+get_user_data = lazy_import('firebase_service', 'get_user_data', get_user_data_fallback)
+generate_recipe_suggestions = lazy_import('openai_integration', 'generate_recipe_suggestions', generate_recipe_suggestions_fallback)
+generate_grocery_list = lazy_import('openai_integration', 'generate_grocery_list', generate_grocery_list_fallback)
 
-# Ensure upload directory exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+bp = Blueprint('main', __name__)
 
-@app.route('/')
+@bp.route('/')
 def index():
     """Home page"""
-    return render_template('index.html')
+    return render_cached_page('index.html')
 
-@app.route('/meal-planner')
+@bp.route('/meal-planner')
 def meal_planner():
     """Meal planner page"""
-    return render_template('meal_planner.html')
+    return render_cached_page('meal_planner.html')
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 def dashboard():
     """User dashboard"""
     if 'user_id' not in session:
         flash('Please complete your profile first', 'warning')
-        return redirect(url_for('meal_planner'))
+        return redirect(url_for('main.meal_planner'))
     
     user_id = session['user_id']
-    user_profile = db_service.get_user_profile(session.get('email', ''))
+    email = session.get('email', '')
+    
+    # Revalidate against the latest profile/meal plan row versions before rendering
+    etag = None
+    if hasattr(db_service, 'get_meal_plans_version'):
+        etag = make_etag('dashboard', user_id, assets.build_id(),
+                         db_service.get_user_profile_version(email),
+                         db_service.get_meal_plans_version(user_id))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    user_profile = db_service.get_user_profile(email)
     meal_plans = db_service.get_meal_plans(user_id)
     
-    return render_template('dashboard.html', 
+    return with_etag(make_response(render_template('dashboard.html', 
                          user_profile=user_profile, 
-                         meal_plans=meal_plans)
+                         meal_plans=meal_plans)), etag)
 
-@app.route('/health-tracker')
+@bp.route('/health-tracker')
 def health_tracker():
     """Health tracking page similar to Streamlit version"""
-    return render_template('health_tracker.html')
+    return render_cached_page('health_tracker.html')
 
-@app.route('/weight-loss')
+@bp.route('/weight-loss')
 def weight_loss():
     """Weight loss tracking page"""
-    return render_template('weight_loss.html')
+    return render_cached_page('weight_loss.html')
 
-@app.route('/motion-detection')
+@bp.route('/motion-detection')
 def motion_detection():
     """Motion detection using OpenCV"""
-    return render_template('motion_detection.html')
+    return render_cached_page('motion_detection.html')
 
-@app.route('/recipe-generator')
+@bp.route('/recipe-generator')
 def recipe_generator():
     """Recipe generator page"""
-    return render_template('recipe_generator.html')
+    return render_cached_page('recipe_generator.html')
 
-@app.route('/ai-assistant')
+@bp.route('/ai-assistant')
 def ai_assistant():
     """AI Assistant chat page"""
-    return render_template('ai_assistant.html')
+    return render_cached_page('ai_assistant.html')
 
-@app.route('/family-plans')
+@bp.route('/family-plans')
 def family_plans():
     """Family meal planning page"""
-    return render_template('family_plans.html')
+    return render_cached_page('family_plans.html')
 
-@app.route('/api/generate-recipe', methods=['POST'])
+@bp.route('/api/generate-recipe', methods=['POST'])
+@admission_controlled
 def api_generate_recipe():
     """API endpoint for recipe generation"""
     try:
         data = request.get_json()
         
+        # Answer near-duplicate requests from the local recipe index
+        signature = request_signature(data)
+        recipe_index.load(db_service)
+        cached_recipe, similarity = recipe_index.query(signature)
+        if cached_recipe:
+            if 'nutrition' not in cached_recipe:
+                attach_recipe_nutrition(cached_recipe)
+            return jsonify({
+                'status': 'success',
+                'recipe': cached_recipe,
+                'source': 'index',
+                'similarity': round(similarity, 3)
+            })
+        
         # Use OpenAI API if available
         if openai_client:
             try:
-                prompt = f"""
-                Generate a detailed recipe based on these requirements:
-                - Ingredients: {', '.join(data.get('ingredients', []))}
-                - Cuisine: {data.get('cuisine_type', 'any')}
-                - Meal type: {data.get('meal_type', 'lunch')}
-                - Dietary restrictions: {', '.join(data.get('dietary_restrictions', []))}
-                - Cooking time: {data.get('cooking_time', 'no preference')}
-                - Servings: {data.get('servings', 4)}
-                
-                Return a JSON object with:
-                - name (string)
-                - prep_time (string)
-                - servings (number)
-                - calories (number)
-                - ingredients (array of strings)
-                - instructions (array of strings)
-                - tips (string)
-                """
-                
-                response = openai_client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=1500,
-                    temperature=0.7
-                )
+                with llm_call_site('generate_recipe'):
+                    response = openai_client.chat.completions.create(
+                        model=RECIPE_MODEL,
+                        messages=[
+                            {"role": "system", "content": RECIPE_SYSTEM_PROMPT},
+                            {"role": "user", "content": build_recipe_prompt(data)}
+                        ],
+                        response_format=recipe_response_format(RECIPE_MODEL),
+                        max_tokens=800,
+                        temperature=0.7
+                    )
                 
                 recipe_text = response.choices[0].message.content
+                fallback = create_fallback_recipe(data)
                 
-                # Try to parse JSON from response
-                try:
-                    import json
-                    recipe = json.loads(recipe_text)
-                except:
-                    # Fallback if JSON parsing fails
-                    recipe = create_fallback_recipe(data)
+                # Parse JSON tolerantly (fences, prose, trailing commas, truncation)
+                parsed, stage = parse_recipe_json(recipe_text)
+                recipe_parse_stats.record(stage, parsed is not None, getattr(response, 'usage', None))
+                if parsed is not None:
+                    recipe = attach_recipe_nutrition(normalize_recipe(parsed, fallback))
+                    source = 'openai'
+                    
+                    # Persist and index so similar requests skip the LLM
+                    if hasattr(db_service, 'save_recipe'):
+                        save_result = db_service.save_recipe(recipe, signature)
+                        if save_result['status'] == 'success':
+                            recipe_index.add(save_result['recipe_id'], signature, recipe)
+                else:
+                    logger.warning("⚠️ Recipe completion could not be parsed, using fallback")
+                    recipe = fallback
+                    source = 'fallback'
                 
                 return jsonify({
                     'status': 'success',
-                    'recipe': recipe
+                    'recipe': recipe,
+                    'source': source
                 })
                 
             except Exception as e:
                 logger.error(f"OpenAI API error: {e}")
                 return jsonify({
                     'status': 'success',
-                    'recipe': create_fallback_recipe(data)
+                    'recipe': create_fallback_recipe(data),
+                    'source': 'fallback'
                 })
         else:
             # Fallback recipe generation
             return jsonify({
                 'status': 'success',
-                'recipe': create_fallback_recipe(data)
+                'recipe': create_fallback_recipe(data),
+                'source': 'fallback'
             })
             
     except Exception as e:
@@ -282,11 +354,11 @@ def create_fallback_recipe(data):
     
     recipe_name = f"{cuisine} {meal_type}" if cuisine else f"Delicious {meal_type}"
     
-    return {
+    recipe = {
         'name': recipe_name.strip(),
         'prep_time': '30-45 minutes',
         'servings': servings,
-        'calories': 400,
+        'calories': None,
         'ingredients': [
             f"1 portion {ingredient}" for ingredient in ingredients[:6]
         ] + [
@@ -305,8 +377,9 @@ def create_fallback_recipe(data):
         ],
         'tips': 'Feel free to adjust seasonings to your taste. Add your favorite spices or herbs to enhance the flavor!'
     }
+    return attach_recipe_nutrition(recipe)
 
-@app.route('/api/save-profile', methods=['POST'])
+@bp.route('/api/save-profile', methods=['POST'])
 def save_profile():
     """Save user profile data"""
     try:
@@ -342,73 +415,158 @@ def save_profile():
             'message': f'Error saving profile: {str(e)}'
         }), 500
 
-@app.route('/api/generate-meal-plan', methods=['POST'])
-def api_generate_meal_plan():
-    """Generate meal plan based on user preferences"""
-    try:
-        data = request.get_json()
-        
-        # Extract parameters
-        health_data = {
-            'age': data.get('age', 30),
-            'weight': data.get('weight', 70),
-            'height': data.get('height', 170),
-            'activity_level': data.get('activity_level', 'moderate'),
-            'dietary_preferences': data.get('dietary_preferences', []),
-            'health_goals': data.get('health_goals', [])
-        }
-        
-        budget = data.get('budget', 100)
-        days = data.get('days', 7)
-        cuisine_preference = data.get('cuisine_preference', 'any')
-        
-        # Generate meal plan
+def run_meal_plan_pipeline(data, user_id=None, context=None):
+    """
+    Planning, budget filtering, OpenAI recipe suggestions and grocery list, then
+    storage writes. Runs inline for synchronous requests or on the job queue,
+    where `context.stage()` reports progress.
+    """
+    stage = context.stage if context else (lambda name: None)
+    
+    weight = float(data.get('weight', 70) or 70)
+    height = float(data.get('height', 170) or 170)
+    health_data = {
+        'age': data.get('age', 30),
+        'weight': weight,
+        'height': height,
+        'gender': data.get('gender', 'male'),
+        'activity_level': normalize_activity_level(data.get('activity_level')),
+        'dietary_preferences': data.get('dietary_preferences', []),
+        'dietary_restrictions': data.get('dietary_restrictions', data.get('dietary_preferences', [])),
+        'health_goals': data.get('health_goals', []),
+        'blood_sugar': data.get('blood_sugar', 100),
+        'bmi': round(weight / ((height / 100) ** 2), 1)
+    }
+    
+    budget = data.get('budget', 100)
+    days = data.get('days', 7)
+    cuisine_preference = data.get('cuisine_preference', 'any')
+    daily_calories = round(calculate_bmr(weight, height, int(health_data['age']), health_data['gender'])
+                           * activity_multiplier(health_data['activity_level']))
+    
+    with llm_call_site('meal_plan'):
+        stage('planning')
         meal_plan = generate_meal_plan(
             health_data=health_data,
             budget=budget,
-            days=days,
             cuisine_preference=cuisine_preference
         )
         
-        # Apply budget filter
-        filtered_plan = budget_filter(meal_plan, budget)
+        # Apply budget filter (text plans get budget guidance instead of filtering)
+        stage('budget')
+        budget_result = budget_filter(meal_plan, budget)
+        if isinstance(meal_plan, str):
+            filtered_plan, budget_guidance = meal_plan, budget_result
+        else:
+            filtered_plan, budget_guidance = budget_result, None
         
-        # Generate recipe suggestions
-        recipe_suggestions = generate_recipe_suggestions(
-            dietary_preferences=health_data['dietary_preferences'],
-            cuisine_type=cuisine_preference
-        )
+        # Generate recipe suggestions (fail fast to the fallback when OpenAI is unavailable)
+        stage('recipe_suggestions')
+        try:
+            recipe_suggestions = generate_recipe_suggestions(filtered_plan)
+        except LLMUnavailableError as e:
+            logger.warning(f"⚠️ Recipe suggestions using fallback: {e}")
+            recipe_suggestions = generate_recipe_suggestions_fallback(filtered_plan)
         
         # Generate grocery list
-        grocery_list = generate_grocery_list(filtered_plan)
-        
-        # Save to database if user is logged in
-        if 'user_id' in session:
-            meal_plan_data = {
-                'name': f"Meal Plan {datetime.now().strftime('%Y-%m-%d')}",
-                'meal_plan': filtered_plan,
-                'recipe_suggestions': recipe_suggestions,
-                'grocery_list': grocery_list,
-                'health_data': health_data,
-                'budget': budget,
-                'days': days,
-                'cuisine_preference': cuisine_preference,
-                'calories_target': filtered_plan.get('daily_calories', 2000),
-                'budget_limit': budget
-            }
-            
-            save_result = db_service.save_meal_plan(session['user_id'], meal_plan_data)
-            
-            # Also save to Firebase/JSON for backup
-            save_user_data(health_data, filtered_plan, recipe_suggestions)
-        
-        return jsonify({
-            'status': 'success',
+        stage('grocery_list')
+        try:
+            grocery_list = generate_grocery_list(filtered_plan)
+        except LLMUnavailableError as e:
+            logger.warning(f"⚠️ Grocery list using fallback: {e}")
+            grocery_list = generate_grocery_list_fallback(filtered_plan)
+    
+    # Per-meal and per-day calories/macros from the local nutrition database
+    nutrition = plan_nutrition(filtered_plan)
+    
+    # Save to database if user is logged in
+    if user_id:
+        stage('saving')
+        meal_plan_data = {
+            'name': f"Meal Plan {datetime.now().strftime('%Y-%m-%d')}",
             'meal_plan': filtered_plan,
             'recipe_suggestions': recipe_suggestions,
             'grocery_list': grocery_list,
-            'message': 'Meal plan generated successfully!'
+            'health_data': health_data,
+            'budget': budget,
+            'days': days,
+            'cuisine_preference': cuisine_preference,
+            'calories_target': daily_calories,
+            'nutrition': nutrition,
+            'budget_limit': budget
+        }
+        
+        db_service.save_meal_plan(user_id, meal_plan_data)
+        
+        # Also save to Firebase/JSON for backup
+        save_user_data(health_data, filtered_plan, recipe_suggestions)
+    
+    return {
+        'meal_plan': filtered_plan,
+        'budget_guidance': budget_guidance,
+        'daily_calories': daily_calories,
+        'nutrition': nutrition,
+        'recipe_suggestions': recipe_suggestions,
+        'grocery_list': grocery_list,
+        'message': 'Meal plan generated successfully!'
+    }
+
+job_queue.register('meal_plan', lambda payload, context: run_meal_plan_pipeline(
+    payload['request'], payload.get('user_id'), context))
+
+def _job_view(job):
+    """Public view of a background job"""
+    return {
+        'job_id': job['id'],
+        'job_status': job['status'],
+        'stage': job['stage'],
+        'progress': job['progress'],
+        'result': job['result'],
+        'error': job['error'],
+        'attempts': job['attempts'],
+        'created_at': job['created_at']
+    }
+
+def _get_own_job(job_id):
+    """Look up a job, hiding jobs that belong to another user"""
+    job_queue.start()
+    job = job_queue.get(job_id)
+    if job is None or (job['user_id'] and str(job['user_id']) != str(session.get('user_id'))):
+        return None
+    return job
+
+def enqueue_meal_plan(data):
+    """Queue a meal plan job and answer 202 with where to follow it"""
+    job = job_queue.submit('meal_plan', {'request': data, 'user_id': session.get('user_id')},
+                           user_id=session.get('user_id'))
+    if job is None:
+        response = jsonify({
+            'status': 'error',
+            'message': 'Too many meal plans are being generated. Please try again shortly.'
         })
+        response.headers['Retry-After'] = '10'
+        return response, 503
+    
+    return jsonify({
+        'status': 'success',
+        'job_id': job['id'],
+        'job_status': job['status'],
+        'status_url': url_for('main.get_meal_plan_job', job_id=job['id']),
+        'events_url': url_for('main.meal_plan_job_events', job_id=job['id'])
+    }), 202
+
+@bp.route('/api/generate-meal-plan', methods=['POST'])
+@admission_controlled
+def api_generate_meal_plan():
+    """Generate meal plan based on user preferences (?async=1 queues it as a job)"""
+    try:
+        data = request.get_json() or {}
+        
+        if request.args.get('async') == '1':
+            return enqueue_meal_plan(data)
+        
+        result = run_meal_plan_pipeline(data, session.get('user_id'))
+        return jsonify(dict(result, status='success'))
         
     except Exception as e:
         return jsonify({
@@ -416,7 +574,254 @@ def api_generate_meal_plan():
             'message': f'Error generating meal plan: {str(e)}'
         }), 500
 
-@app.route('/api/save-health-tracking', methods=['POST'])
+@bp.route('/api/meal-plan-jobs', methods=['POST'])
+@admission_controlled
+def create_meal_plan_job():
+    """Queue meal plan generation and return a job id immediately"""
+    return enqueue_meal_plan(request.get_json() or {})
+
+@bp.route('/api/meal-plan-jobs/<job_id>')
+def get_meal_plan_job(job_id):
+    """Poll a meal plan job"""
+    job = _get_own_job(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job not found'
+        }), 404
+    return jsonify(dict(_job_view(job), status='success'))
+
+@bp.route('/api/meal-plan-jobs/<job_id>/events')
+def meal_plan_job_events(job_id):
+    """Server-sent events with stage-by-stage progress of a meal plan job"""
+    if _get_own_job(job_id) is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job not found'
+        }), 404
+    
+    # Each stream holds a worker thread; past the per-worker cap the client polls the status URL instead
+    if not job_queue.open_stream():
+        response = jsonify({
+            'status': 'error',
+            'message': 'Too many open job streams, poll status_url instead',
+            'status_url': f'/api/meal-plan-jobs/{job_id}'
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = '2'
+        return response
+    
+    def events():
+        # Streams end after JOB_STREAM_TIMEOUT; EventSource reconnects after `retry` ms and gets the current state
+        yield "retry: 2000\n\n"
+        for job in job_queue.stream(job_id):
+            event = 'done' if job['status'] in ('succeeded', 'failed') else 'progress'
+            yield f"event: {event}\ndata: {json.dumps(_job_view(job), default=str)}\n\n"
+    
+    response = Response(events(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # Runs when the server is done with the response, even if the client left before the first event
+    response.call_on_close(job_queue.close_stream)
+    return response
+
+@bp.route('/api/job-queue-status')
+def job_queue_status():
+    """Background job queue depth and counters for this worker"""
+    return jsonify({
+        'status': 'success',
+        'job_queue': job_queue.get_stats()
+    })
+
+def _drowsiness_unavailable():
+    return jsonify({
+        'status': 'error',
+        'message': drowsiness_unavailable_reason
+    }), 503
+
+def _drowsiness_session_not_found(session_id):
+    return jsonify({
+        'status': 'error',
+        'message': f'No drowsiness session {session_id}'
+    }), 404
+
+def _start_drowsiness_session(data, session_id=None):
+    """Start a session from a JSON body: camera (device index or DROWSINESS_CAMERAS entry), target_fps, adaptive"""
+    from drowsiness_sessions import resolve_camera
+    try:
+        if not isinstance(data, dict):
+            raise ValueError('Request body must be a JSON object')
+        camera = resolve_camera(data.get('camera', data.get('camera_index', 0)))
+        session_id = session_id or data.get('session_id')
+        if session_id is not None and not isinstance(session_id, str):
+            raise ValueError('session_id must be a string')
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    try:
+        target_fps = float(data['target_fps']) if data.get('target_fps') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({
+            'status': 'error',
+            'message': 'target_fps must be a number'
+        }), 400
+    result = drowsiness_sessions.start_session(
+        camera, session_id=session_id, target_fps=target_fps,
+        adaptive=bool(data.get('adaptive', False)), sound=bool(data.get('sound', True)),
+        user_id=session['user_id']
+    )
+    if result['status'] == 'limit_reached':
+        return jsonify(result), 429
+    if result['status'] == 'error':
+        return jsonify(result), 503
+    return jsonify(result)
+
+@bp.route('/api/drowsiness/start', methods=['POST'])
+def start_drowsiness_detection():
+    """Start server-side detection on a local camera; frames go to the MJPEG stream"""
+    if 'user_id' not in session:
+        return jsonify({
+            'status': 'error',
+            'message': 'User not logged in'
+        }), 401
+    if not drowsiness_sessions:
+        return _drowsiness_unavailable()
+    return _start_drowsiness_session(request.get_json(silent=True) or {}, 'default')
+
+@bp.route('/api/drowsiness/sessions', methods=['GET', 'POST'])
+def drowsiness_session_list():
+    """List detection sessions, or start one for another camera"""
+    if 'user_id' not in session:
+        return jsonify({
+            'status': 'error',
+            'message': 'User not logged in'
+        }), 401
+    if not drowsiness_sessions:
+        return _drowsiness_unavailable()
+    if request.method == 'POST':
+        return _start_drowsiness_session(request.get_json(silent=True) or {})
+    return jsonify({
+        'status': 'success',
+        'sessions': drowsiness_sessions.list_sessions(session['user_id']),
+        'max_sessions': drowsiness_sessions.max_sessions
+    })
+
+@bp.route('/api/drowsiness/stop', methods=['POST'], defaults={'session_id': 'default'})
+@bp.route('/api/drowsiness/sessions/<session_id>', methods=['DELETE'])
+def stop_drowsiness_detection(session_id):
+    """Stop a detection session and release its camera"""
+    if 'user_id' not in session:
+        return jsonify({
+            'status': 'error',
+            'message': 'User not logged in'
+        }), 401
+    if not drowsiness_sessions:
+        return _drowsiness_unavailable()
+    result = drowsiness_sessions.stop_session(session_id, user_id=session['user_id'])
+    if result['status'] == 'not_found':
+        return _drowsiness_session_not_found(session_id)
+    return jsonify(result)
+
+@bp.route('/api/drowsiness/stats')
+def drowsiness_stats():
+    """Session limits, Face Mesh pool usage and per-session detector statistics"""
+    if 'user_id' not in session:
+        return jsonify({
+            'status': 'error',
+            'message': 'User not logged in'
+        }), 401
+    if not drowsiness_sessions:
+        return _drowsiness_unavailable()
+    return jsonify({
+        'status': 'success',
+        'statistics': drowsiness_sessions.get_stats(session['user_id'])
+    })
+
+@bp.route('/api/drowsiness/history')
+def drowsiness_history():
+    """Persisted sleep alerts of the current user, optionally for one session (?session_id=) and window (?days=)"""
+    if 'user_id' not in session:
+        return jsonify({
+            'status': 'error',
+            'message': 'User not logged in'
+        }), 401
+    try:
+        days = min(max(int(request.args.get('days', 7)), 1), 3650)
+        limit = min(max(int(request.args.get('limit', 500)), 1), 5000)
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'days and limit must be integers'
+        }), 400
+    since = (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds')
+    events = drowsiness_recorder.history(session['user_id'], request.args.get('session_id'), since, limit)
+    return jsonify({
+        'status': 'success',
+        'events': events,
+        'count': len(events)
+    })
+
+@bp.route('/api/drowsiness/sessions/<session_id>/stats')
+def drowsiness_session_stats(session_id):
+    """Detector counters, pipeline timing and stream viewers of one session"""
+    if 'user_id' not in session:
+        return jsonify({
+            'status': 'error',
+            'message': 'User not logged in'
+        }), 401
+    if not drowsiness_sessions:
+        return _drowsiness_unavailable()
+    interface = drowsiness_sessions.get_session(session_id, session['user_id'])
+    if interface is None:
+        return _drowsiness_session_not_found(session_id)
+    return jsonify({
+        'status': 'success',
+        'statistics': interface.get_web_statistics()
+    })
+
+@bp.route('/api/drowsiness/stream', defaults={'session_id': 'default'})
+@bp.route('/api/drowsiness/sessions/<session_id>/stream')
+def drowsiness_stream(session_id):
+    """Annotated frames as MJPEG; every viewer shares one encoded frame"""
+    if 'user_id' not in session:
+        return jsonify({
+            'status': 'error',
+            'message': 'User not logged in'
+        }), 401
+    if not drowsiness_sessions:
+        return _drowsiness_unavailable()
+    interface = drowsiness_sessions.get_session(session_id, session['user_id'])
+    if interface is None:
+        return _drowsiness_session_not_found(session_id)
+    from drowsiness_stream import MJPEG_BOUNDARY
+    response = Response(interface.broadcaster.mjpeg(),
+                        mimetype=f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}')
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route('/api/drowsiness/events', defaults={'session_id': 'default'})
+@bp.route('/api/drowsiness/sessions/<session_id>/events')
+def drowsiness_events(session_id):
+    """Server-sent events with the detector status (EAR, alert state, counters)"""
+    if 'user_id' not in session:
+        return jsonify({
+            'status': 'error',
+            'message': 'User not logged in'
+        }), 401
+    if not drowsiness_sessions:
+        return _drowsiness_unavailable()
+    interface = drowsiness_sessions.get_session(session_id, session['user_id'])
+    if interface is None:
+        return _drowsiness_session_not_found(session_id)
+    response = Response(interface.broadcaster.status_events(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route('/api/save-health-tracking', methods=['POST'])
 def save_health_tracking():
     """Save daily health tracking data"""
     try:
@@ -448,7 +853,7 @@ def save_health_tracking():
             'message': f'Error saving health data: {str(e)}'
         }), 500
 
-@app.route('/api/get-meal-plans')
+@bp.route('/api/get-meal-plans')
 def get_meal_plans():
     """Get user's meal plans"""
     try:
@@ -459,12 +864,21 @@ def get_meal_plans():
             }), 401
         
         user_id = session['user_id']
+        
+        # Strong ETag keyed on the latest meal plan row; unchanged lists cost a 304
+        etag = None
+        if hasattr(db_service, 'get_meal_plans_version'):
+            etag = make_etag('meal_plans', user_id, db_service.get_meal_plans_version(user_id))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
         meal_plans = db_service.get_meal_plans(user_id)
         
-        return jsonify({
+        return with_etag(jsonify({
             'status': 'success',
             'meal_plans': meal_plans
-        })
+        }), etag)
         
     except Exception as e:
         return jsonify({
@@ -472,7 +886,7 @@ def get_meal_plans():
             'message': f'Error retrieving meal plans: {str(e)}'
         }), 500
 
-@app.route('/api/database-stats')
+@bp.route('/api/database-stats')
 def database_stats():
     """Get database statistics"""
     try:
@@ -487,7 +901,118 @@ def database_stats():
             'message': f'Error getting database stats: {str(e)}'
         }), 500
 
-@app.route('/api/user-profile')
+@bp.route('/api/recipe-stats')
+def recipe_stats():
+    """Get recipe generation parse and similarity index statistics"""
+    return jsonify({
+        'status': 'success',
+        'stats': recipe_parse_stats.snapshot(),
+        'index': recipe_index.get_stats(),
+        'nutrition': nutrition_db.get_stats() if nutrition_db else None
+    })
+
+@bp.route('/api/nutrition', methods=['POST'])
+def api_nutrition():
+    """Per-serving calories and macros for an ingredient list"""
+    data = request.get_json(silent=True) or {}
+    ingredients = data.get('ingredients')
+    if not isinstance(ingredients, list) or not ingredients:
+        return jsonify({'status': 'error', 'message': 'ingredients must be a non-empty list'}), 400
+    if not nutrition_db:
+        return jsonify({'status': 'error', 'message': 'Nutrition database is not available'}), 503
+    return jsonify({
+        'status': 'success',
+        'nutrition': nutrition_db.recipe_nutrition(ingredients, data.get('servings', 1)),
+        'ingredients': [nutrition_db.parse_ingredient(i) for i in ingredients] if data.get('details') else None
+    })
+
+@bp.route('/api/llm-usage')
+def llm_usage_report():
+    """Get OpenAI token, cost and latency report per call site"""
+    try:
+        days = min(max(int(request.args.get('days', 7)), 1), 3650)
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'days must be an integer'
+        }), 400
+    try:
+        return jsonify({
+            'status': 'success',
+            'report': usage_tracker.report(days)
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error building LLM usage report: {str(e)}'
+        }), 500
+
+@bp.route('/api/llm-client-status')
+def llm_client_status():
+    """Get OpenAI client circuit breaker and retry state"""
+    return jsonify({
+        'status': 'success',
+        'client': get_client_state()
+    })
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    """Request, database and OpenAI metrics in Prometheus text format"""
+    response = make_response(metrics.registry.render())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@bp.route('/api/admin/profiles')
+def list_request_profiles():
+    """List recent request profiles (PROFILING_ENABLED=1 and PROFILE_TOKEN only)"""
+    if not profiling.PROFILING_ENABLED or not profiling.token_ok():
+        return jsonify({'status': 'error', 'message': 'Not found'}), 404
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), profiling.PROFILE_KEEP)
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'limit must be an integer'
+        }), 400
+    return jsonify({
+        'status': 'success',
+        'profiles': profiling.list_profiles(limit)
+    })
+
+@bp.route('/api/admin/profiles/<profile_id>')
+def download_request_profile(profile_id):
+    """Download a profile: raw cProfile data, ?format=json summary or ?format=text report"""
+    if not profiling.PROFILING_ENABLED or not profiling.token_ok():
+        return jsonify({'status': 'error', 'message': 'Not found'}), 404
+    
+    output_format = request.args.get('format', 'prof')
+    if output_format == 'text':
+        report = profiling.profile_text(profile_id)
+        if report:
+            response = make_response(report)
+            response.mimetype = 'text/plain'
+            return response
+    else:
+        path = profiling.profile_path(profile_id, 'json' if output_format == 'json' else 'prof')
+        if path:
+            return send_file(os.path.abspath(path), as_attachment=output_format != 'json',
+                             download_name=os.path.basename(path))
+    
+    return jsonify({
+        'status': 'error',
+        'message': 'Profile not found'
+    }), 404
+
+@bp.route('/api/admission-status')
+def admission_status():
+    """Rate limiter and concurrency limiter state for LLM-backed endpoints"""
+    return jsonify({
+        'status': 'success',
+        'admission': admission.get_stats()
+    })
+
+@bp.route('/api/user-profile')
 def get_user_profile():
     """Get current user profile"""
     try:
@@ -498,13 +1023,21 @@ def get_user_profile():
             }), 401
         
         email = session['email']
+        
+        etag = None
+        if hasattr(db_service, 'get_user_profile_version'):
+            etag = make_etag('user_profile', email, db_service.get_user_profile_version(email))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
         profile = db_service.get_user_profile(email)
         
         if profile:
-            return jsonify({
+            return with_etag(jsonify({
                 'status': 'success',
                 'profile': profile
-            })
+            }), etag)
         else:
             return jsonify({
                 'status': 'error',
@@ -517,28 +1050,28 @@ def get_user_profile():
             'message': f'Error retrieving profile: {str(e)}'
         }), 500
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     """Logout user"""
     session.clear()
     flash('You have been logged out successfully', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/favicon.ico')
+@bp.route('/favicon.ico')
 def favicon():
     """Serve favicon"""
     return '', 204  # No content response for favicon
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found_error(error):
     return render_template('404.html'), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
     return render_template('500.html'), 500
 
 # Health utility endpoints
-@app.route('/api/calculate-bmi', methods=['POST'])
+@bp.route('/api/calculate-bmi', methods=['POST'])
 def calculate_bmi():
     """Calculate BMI"""
     try:
@@ -553,20 +1086,7 @@ def calculate_bmi():
             }), 400
         
         bmi = weight / (height ** 2)
-        
-        # BMI categories
-        if bmi < 18.5:
-            category = 'Underweight'
-            color = 'info'
-        elif bmi < 25:
-            category = 'Normal weight'
-            color = 'success'
-        elif bmi < 30:
-            category = 'Overweight'
-            color = 'warning'
-        else:
-            category = 'Obese'
-            color = 'danger'
+        category, color = bmi_category(bmi)
         
         return jsonify({
             'status': 'success',
@@ -581,7 +1101,7 @@ def calculate_bmi():
             'message': f'Error calculating BMI: {str(e)}'
         }), 500
 
-@app.route('/api/calculate-calories', methods=['POST'])
+@bp.route('/api/calculate-calories', methods=['POST'])
 def calculate_calories():
     """Calculate daily calorie needs"""
     try:
@@ -591,25 +1111,12 @@ def calculate_calories():
         weight = float(data.get('weight', 70))
         height = float(data.get('height', 170))
         gender = data.get('gender', 'male')
-        activity_level = data.get('activity_level', 'moderate')
+        activity_level = normalize_activity_level(data.get('activity_level'))
         
         # Calculate BMR using Mifflin-St Jeor Equation
-        if gender.lower() == 'male':
-            bmr = 10 * weight + 6.25 * height - 5 * age + 5
-        else:
-            bmr = 10 * weight + 6.25 * height - 5 * age - 161
-        
-        # Activity multipliers
-        activity_multipliers = {
-            'sedentary': 1.2,
-            'light': 1.375,
-            'moderate': 1.55,
-            'active': 1.725,
-            'very_active': 1.9
-        }
+        bmr = calculate_bmr(weight, height, age, gender)
         
-        multiplier = activity_multipliers.get(activity_level, 1.55)
-        daily_calories = bmr * multiplier
+        daily_calories = bmr * activity_multiplier(activity_level)
         
         return jsonify({
             'status': 'success',
@@ -624,7 +1131,61 @@ def calculate_calories():
             'message': f'Error calculating calories: {str(e)}'
         }), 500
 
-@app.route('/api/chat', methods=['POST'])
+def _read_batch_columns():
+    """Read a batch from a CSV upload, a text/csv body or JSON"""
+    upload = request.files.get('file')
+    if upload:
+        return health_metrics.columns_from_csv(upload.read().decode('utf-8-sig'))
+    if request.mimetype == 'text/csv':
+        return health_metrics.columns_from_csv(request.get_data(as_text=True))
+    data = request.get_json(silent=True)
+    if data is None:
+        raise BatchError('Send JSON, a text/csv body or a CSV file upload')
+    return health_metrics.columns_from_json(data)
+
+def _batch_response(fields, label):
+    """Compute a batch with NumPy and return JSON (or CSV with ?format=csv)"""
+    try:
+        columns = _read_batch_columns()
+        result = health_metrics.compute_batch(columns)
+        rows = health_metrics.batch_rows(columns, result, fields)
+        
+        if request.args.get('format') == 'csv':
+            response = make_response(health_metrics.rows_to_csv(rows, fields))
+            response.mimetype = 'text/csv'
+            return response
+        
+        return jsonify({
+            'status': 'success',
+            'summary': health_metrics.batch_summary(result),
+            'results': rows
+        })
+        
+    except BatchError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error calculating {label}: {str(e)}'
+        }), 500
+
+@bp.route('/api/calculate-bmi/batch', methods=['POST'])
+def calculate_bmi_batch():
+    """Calculate BMI and category for many people in one request"""
+    return _batch_response(['bmi', 'category', 'color'], 'BMI batch')
+
+@bp.route('/api/calculate-calories/batch', methods=['POST'])
+def calculate_calories_batch():
+    """Calculate BMR and daily calories for many people in one request"""
+    return _batch_response(['bmr', 'daily_calories', 'activity_level', 'bmi', 'category'], 'calorie batch')
+
+CHAT_SYSTEM_PROMPT = "You are a helpful AI nutritionist and meal planning assistant. Provide helpful advice about nutrition, cooking, meal planning, healthy eating, recipes, and grocery shopping. Keep responses concise and practical."
+
+@bp.route('/api/chat', methods=['POST'])
+@admission_controlled
 def api_chat():
     """AI Assistant chat endpoint"""
     try:
@@ -642,32 +1203,37 @@ def api_chat():
                 'status': 'error',
                 'message': 'AI Assistant is not available. Please check OpenAI configuration.'
             }), 500
+        
+        # Conversation memory is kept server-side, keyed by the session
+        if 'session_id' not in session:
+            session['session_id'] = str(uuid.uuid4())
+            session.permanent = True
+        session_id = session['session_id']
             
         # Generate response using OpenAI
         try:
-            response = openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a helpful AI nutritionist and meal planning assistant. Provide helpful advice about nutrition, cooking, meal planning, healthy eating, recipes, and grocery shopping. Keep responses concise and practical."
-                    },
-                    {
-                        "role": "user", 
-                        "content": user_message
-                    }
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
+            with llm_call_site('chat'):
+                response = openai_client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=conversation_store.build_messages(session_id, CHAT_SYSTEM_PROMPT, user_message),
+                    max_tokens=500,
+                    temperature=0.7
+                )
             
             ai_response = response.choices[0].message.content.strip()
+            conversation_store.add_exchange(session_id, user_message, ai_response)
             
             return jsonify({
                 'status': 'success',
-                'response': ai_response
+                'response': ai_response,
+                'conversation': conversation_store.describe(session_id)
             })
             
+        except CircuitOpenError:
+            return jsonify({
+                'status': 'error',
+                'message': 'AI Assistant is temporarily unavailable. Please try again shortly.'
+            }), 503
         except Exception as e:
             return jsonify({
                 'status': 'error',
@@ -680,7 +1246,36 @@ def api_chat():
             'message': f'Error processing chat request: {str(e)}'
         }), 500
 
-@app.route('/api/generate-family-plan', methods=['POST'])
+@bp.route('/api/chat/reset', methods=['POST'])
+def api_chat_reset():
+    """Clear the server-side conversation for this session"""
+    if 'session_id' in session:
+        conversation_store.clear(session['session_id'])
+    return jsonify({
+        'status': 'success',
+        'message': 'Conversation cleared'
+    })
+
+def summarize_chat_turns(previous_summary, turns, max_tokens):
+    """Fold evicted chat turns into the rolling conversation summary"""
+    if not openai_client:
+        return extractive_summary(previous_summary, turns, max_tokens)
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+    with llm_call_site('chat_summary'):
+        response = openai_client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "Update the running summary of a nutrition chat. Keep user facts, goals, restrictions and decisions. Be terse."},
+                {"role": "user", "content": f"Summary so far:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"}
+            ],
+            max_tokens=max_tokens,
+            temperature=0.2
+        )
+    return response.choices[0].message.content.strip()
+
+conversation_store.summarizer = summarize_chat_turns
+
+@bp.route('/api/generate-family-plan', methods=['POST'])
 def api_generate_family_plan():
     """Generate family meal plan endpoint"""
     try:
@@ -756,13 +1351,75 @@ def api_generate_family_plan():
             'message': f'Error generating family plan: {str(e)}'
         }), 500
 
+_BREAKER_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+metrics.registry.gauge('llm_admission_active', 'AI requests currently running in this worker',
+                       lambda: admission.limiter.active)
+metrics.registry.gauge('llm_admission_waiting', 'AI requests queued for a concurrency slot in this worker',
+                       lambda: admission.limiter.waiting)
+metrics.registry.gauge('openai_circuit_breaker_state', 'OpenAI circuit breaker (0 closed, 1 half-open, 2 open)',
+                       lambda: _BREAKER_STATES.get(get_client_state().get('circuit_breaker', {}).get('state')))
+metrics.registry.gauge('chat_conversations', 'Server-side chat conversations held in memory',
+                       lambda: conversation_store.get_stats().get('conversations'))
+
+def create_app(config=None):
+    """Application factory: build a configured Flask app (heavy services load lazily)"""
+    app = Flask(__name__)
+    app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-change-this')
+    app.permanent_session_lifetime = timedelta(days=7)
+    
+    # Configure app
+    app.config['UPLOAD_FOLDER'] = 'uploads'
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    if config:
+        app.config.update(config)
+    
+    # Ensure upload directory exists
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    
+    app.register_blueprint(bp)
+    assets.init_app(app)
+    http_cache.init_app(app)
+    metrics.init_app(app)
+    profiling.init_app(app)
+    
+    # Persist LLM usage records, background jobs and chat conversations alongside the rest of the app data
+    usage_tracker.attach_storage(db_service)
+    job_queue.attach_storage(db_service)
+    drowsiness_recorder.attach_storage(db_service)
+    conversation_store.attach_storage(db_service)
+    
+    return app
+
+def init_worker():
+    """
+    Per-worker initialization for multi-process serving (called after fork):
+    each worker gets its own (lazily created) OpenAI client and HTTP connection
+    pool, its own usage flush thread, a ready database service and its own job
+    worker threads (resuming jobs a previous process left unfinished) before the
+    first request.
+    """
+    reset_client()
+    reset_lazy(openai_client)
+    usage_tracker.attach_storage(db_service)
+    drowsiness_recorder.attach_storage(db_service)
+    metrics.registry.start_snapshot_thread()
+    ensure_loaded(db_service)
+    job_queue.start()
+
 if __name__ == '__main__':
     print("🚀 Starting Smart Grocery + Recipe Planner (Flask)")
     print("🔥 Database service initialized")
     print("📱 Available at: http://localhost:5000")
     
+    app = create_app()
+    
     # Initialize database
     db_stats = db_service.get_database_stats()
     print(f"📊 Database stats: {db_stats}")
     
+    # Resume unfinished meal plan jobs in the serving (reloader child) process only
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        job_queue.start()
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,371 @@
+# Static asset pipeline: minify + content-hash JS/CSS, manifest lookup and immutable caching
+# Usage (from backend/): python assets.py build | python assets.py report
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from typing import Dict, List, Optional
+
+from flask import current_app, request, send_file, url_for
+from werkzeug.security import safe_join
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+# The build before the current one; its files stay servable for pages rendered before the switch
+PREVIOUS_MANIFEST_NAME = 'manifest.previous.json'
+SOURCE_EXTENSIONS = ('.js', '.css')
+GZIP_LEVEL = 9
+
+# Set ASSETS_MANIFEST=0 to always serve the unbuilt sources (debug mode does too)
+ASSETS_MANIFEST = os.getenv('ASSETS_MANIFEST', '1') == '1'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Unbuilt sources keep their names across edits, so browsers must revalidate them
+SOURCE_CACHE_CONTROL = 'public, no-cache'
+
+_manifest: Optional[Dict[str, str]] = None
+_manifest_mtime = None
+_build_id: Optional[str] = None
+_manifest_lock = threading.Lock()
+
+
+# --- minification -------------------------------------------------------------------
+
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE_RE = re.compile(r'\s+')
+_CSS_PUNCT_RE = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(source: str) -> str:
+    """Strip comments and redundant whitespace; never touches +, ~ or spacing inside calc()"""
+    css = _CSS_COMMENT_RE.sub('', source)
+    css = _CSS_SPACE_RE.sub(' ', css)
+    css = _CSS_PUNCT_RE.sub(r'\1', css)
+    css = css.replace(': ', ':').replace(';}', '}')
+    return css.strip() + '\n'
+
+
+def _count_backticks(line: str) -> int:
+    return len(re.findall(r'(?<!\\)`', line))
+
+
+def minify_js(source: str) -> str:
+    """
+    Conservative line-based minifier: drops indentation, blank lines and
+    full-line comments but keeps every statement on its own line, so automatic
+    semicolon insertion behaves exactly as before. Lines inside multi-line
+    template literals are left untouched.
+    """
+    output = []
+    in_template = False
+    in_comment = False
+    for line in source.splitlines():
+        if in_template:
+            output.append(line)
+            if _count_backticks(line) % 2:
+                in_template = False
+            continue
+        stripped = line.strip()
+        if in_comment:
+            if '*/' in stripped:
+                in_comment = False
+                stripped = stripped.split('*/', 1)[1].strip()
+            else:
+                continue
+        if stripped.startswith('/*') and not stripped.startswith('/**/'):
+            if '*/' not in stripped:
+                in_comment = True
+                continue
+            stripped = stripped.split('*/', 1)[1].strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        output.append(stripped)
+        if _count_backticks(stripped) % 2:
+            in_template = True
+    return '\n'.join(output) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+# --- build ------------------------------------------------------------------------
+
+def _source_files(static_dir: str) -> List[str]:
+    """Static JS/CSS sources (relative, forward slashes), skipping the build output"""
+    files = []
+    for root, dirs, names in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != os.path.join(static_dir, DIST_DIR))
+        for name in sorted(names):
+            if name.endswith(SOURCE_EXTENSIONS) and '.min.' not in name:
+                files.append(os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, '/'))
+    return files
+
+
+def build(static_dir: str = STATIC_DIR) -> Dict[str, Dict]:
+    """
+    Minify every source into dist/<path>.<hash>.min.<ext> with a precompressed
+    .gz sibling and write the manifest mapping source paths to built paths.
+    Runs against the live directory: new files are written next to the old
+    ones, the manifest is swapped atomically, and only files of builds older
+    than the previous one are deleted, so pages (and page caches) rendered
+    just before the switch keep working.
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+
+    manifest = {}
+    report = {}
+    for rel_path in _source_files(static_dir):
+        with open(os.path.join(static_dir, rel_path), encoding='utf-8') as f:
+            source = f.read()
+        base, ext = os.path.splitext(rel_path)
+        data = MINIFIERS[ext](source).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:8]
+        built = f"{DIST_DIR}/{base}.{digest}.min{ext}"
+
+        out_path = os.path.join(static_dir, built)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with open(out_path, 'wb') as f:
+            f.write(data)
+        compressed = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+        with open(out_path + '.gz', 'wb') as f:
+            f.write(compressed)
+
+        manifest[rel_path] = built
+        report[rel_path] = {
+            'built': built,
+            'source_bytes': len(source.encode('utf-8')),
+            'minified_bytes': len(data),
+            'gzip_bytes': len(compressed)
+        }
+
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest_path = os.path.join(dist_dir, MANIFEST_NAME)
+    previous = _read_json(manifest_path)
+    if previous != manifest:
+        _write_json(os.path.join(dist_dir, PREVIOUS_MANIFEST_NAME), previous)
+    _write_json(manifest_path, manifest)
+    previous = _read_json(os.path.join(dist_dir, PREVIOUS_MANIFEST_NAME))
+    _prune(static_dir, set(manifest.values()) | set(previous.values()))
+    reload_manifest()
+    return report
+
+
+def _read_json(path: str) -> Dict[str, str]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: str, data: Dict[str, str]):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def _prune(static_dir: str, keep: set):
+    """Delete built files (and .gz siblings) that neither the current nor the previous manifest references"""
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    for root, _, names in os.walk(dist_dir):
+        for name in names:
+            if name in (MANIFEST_NAME, PREVIOUS_MANIFEST_NAME):
+                continue
+            path = os.path.join(root, name)
+            built = os.path.relpath(path, static_dir).replace(os.sep, '/')
+            if built.endswith('.gz'):
+                built = built[:-3]
+            if built not in keep:
+                os.remove(path)
+
+
+# --- lookup -----------------------------------------------------------------------
+
+def _manifest_path(static_dir: str = STATIC_DIR) -> str:
+    return os.path.join(static_dir, DIST_DIR, MANIFEST_NAME)
+
+
+def load_manifest() -> Dict[str, str]:
+    """Built paths by source path; re-read when the manifest file changes (empty when unbuilt)"""
+    global _manifest, _manifest_mtime, _build_id
+    path = _manifest_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    if _manifest is not None and mtime == _manifest_mtime:
+        return _manifest
+    with _manifest_lock:
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        _build_id = hashlib.sha1(json.dumps(manifest, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+        _manifest, _manifest_mtime = manifest, mtime
+    return _manifest
+
+
+def reload_manifest():
+    """Forget the cached manifest (it is re-read on the next lookup)"""
+    global _manifest
+    _manifest = None
+
+
+def build_id() -> str:
+    """Short id of the asset build in use, for ETags of pages that embed asset URLs"""
+    if not ASSETS_MANIFEST or current_app.debug:
+        return 'source'
+    load_manifest()
+    return _build_id
+
+
+def asset_url(path: str) -> str:
+    """
+    URL of a static asset: the fingerprinted build when one exists, otherwise
+    the source file (debug mode, ASSETS_MANIFEST=0 or no build yet)
+    """
+    if ASSETS_MANIFEST and not current_app.debug:
+        path = load_manifest().get(path, path)
+    return url_for('static', filename=path)
+
+
+# --- serving ----------------------------------------------------------------------
+
+def _dist_prefix() -> str:
+    return f"{current_app.static_url_path}/{DIST_DIR}/"
+
+
+def serve_precompressed():
+    """before_request hook: answer dist/ requests with the prebuilt .gz when the client accepts gzip"""
+    if request.method != 'GET' or not request.path.startswith(_dist_prefix()):
+        return None
+    if not request.accept_encodings['gzip']:
+        return None
+    rel_path = request.path[len(current_app.static_url_path) + 1:]
+    gz_path = safe_join(current_app.static_folder, rel_path + '.gz')
+    if gz_path is None or not os.path.isfile(gz_path):
+        return None
+    response = send_file(gz_path, mimetype=_mimetype(rel_path), conditional=True, etag=True)
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def _mimetype(path: str) -> str:
+    return 'text/css' if path.endswith('.css') else 'text/javascript'
+
+
+def static_cache_headers(response):
+    """after_request hook: far-future immutable caching for fingerprinted files"""
+    static_prefix = f"{current_app.static_url_path}/"
+    if not request.path.startswith(static_prefix) or response.status_code not in (200, 304):
+        return response
+    if request.path.startswith(_dist_prefix()):
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+    else:
+        response.headers['Cache-Control'] = SOURCE_CACHE_CONTROL
+    return response
+
+
+def init_app(app):
+    """Expose asset_url() to templates and register the static caching hooks"""
+    app.add_template_global(asset_url)
+    app.before_request(serve_precompressed)
+    app.after_request(static_cache_headers)
+    if ASSETS_MANIFEST and not os.path.exists(_manifest_path()):
+        logger.warning("⚠️ No asset build found; serving unminified static files (run: python assets.py build)")
+
+
+# --- report -----------------------------------------------------------------------
+
+# Pages that render without a saved profile (/dashboard redirects until one exists)
+PAGES = ['/', '/meal-planner', '/health-tracker', '/weight-loss',
+         '/motion-detection', '/recipe-generator', '/ai-assistant', '/family-plans']
+
+_ASSET_REF_RE = re.compile(r'<(?:script[^>]*\ssrc|link[^>]*\shref)="([^"]+)"')
+
+
+def _page_bytes(client, page: str, static_url_path: str) -> Dict:
+    """Transferred bytes for one page: HTML plus every local asset it references, raw and gzipped"""
+    html = client.get(page).get_data()
+    sizes = {'html': len(html), 'html_gzip': len(gzip.compress(html, mtime=0)), 'assets': 0, 'assets_gzip': 0}
+    for ref in _ASSET_REF_RE.findall(html.decode('utf-8')):
+        if not ref.startswith(static_url_path + '/'):
+            continue  # CDN assets are the same before and after
+        asset = client.get(ref).get_data()
+        sizes['assets'] += len(asset)
+        sizes['assets_gzip'] += len(gzip.compress(asset, mtime=0))
+    sizes['total'] = sizes['html'] + sizes['assets']
+    sizes['total_gzip'] = sizes['html_gzip'] + sizes['assets_gzip']
+    # A repeat visit only fetches the HTML; fingerprinted assets come from the browser cache
+    sizes['repeat_visit_gzip'] = sizes['html_gzip']
+    return sizes
+
+
+def page_report(app, pages: List[str] = PAGES) -> Dict[str, Dict]:
+    """Bytes per page with unbuilt sources (before) and with the fingerprinted build (after)"""
+    global ASSETS_MANIFEST
+    import http_cache
+
+    results = {}
+    enabled = ASSETS_MANIFEST
+    try:
+        for label, use_manifest in (('before', False), ('after', True)):
+            ASSETS_MANIFEST = use_manifest
+            http_cache._page_cache.clear()
+            client = app.test_client()
+            for page in pages:
+                results.setdefault(page, {})[label] = _page_bytes(client, page, app.static_url_path)
+    finally:
+        ASSETS_MANIFEST = enabled
+        http_cache._page_cache.clear()
+    return results
+
+
+def _print_report(results: Dict[str, Dict]):
+    print(f"{'page':<20} {'before':>10} {'after':>10} {'before gz':>10} {'after gz':>10} {'repeat gz':>10}")
+    totals = [0, 0, 0, 0, 0]
+    for page, sizes in results.items():
+        row = [sizes['before']['total'], sizes['after']['total'],
+               sizes['before']['total_gzip'], sizes['after']['total_gzip'],
+               sizes['after']['repeat_visit_gzip']]
+        totals = [t + v for t, v in zip(totals, row)]
+        print(f"{page:<20} " + " ".join(f"{v:>10,}" for v in row))
+    print(f"{'TOTAL':<20} " + " ".join(f"{v:>10,}" for v in totals))
+
+
+def main(argv: List[str]) -> int:
+    command = argv[1] if len(argv) > 1 else 'build'
+    if command == 'build':
+        report = build()
+        for rel_path, info in report.items():
+            print(f"📦 {rel_path} -> {info['built']} "
+                  f"({info['source_bytes']:,} -> {info['minified_bytes']:,} bytes, {info['gzip_bytes']:,} gzipped)")
+        print(f"✅ Built {len(report)} asset(s), manifest at {_manifest_path()}")
+        return 0
+    if command == 'report':
+        if not os.path.exists(_manifest_path()):
+            build()
+        # Go through the imported module: the app's asset_url() reads its globals, not __main__'s
+        import assets
+        from app import create_app
+        results = assets.page_report(create_app())
+        if '--json' in argv:
+            print(json.dumps(results, indent=2))
+        else:
+            _print_report(results)
+        return 0
+    print(f"Unknown command: {command} (expected build or report)")
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,153 @@
+# Overload benchmark: latency of a cheap endpoint while LLM-backed routes are flooded
+# Usage (from backend/): python benchmarks/bench_admission.py --flood-clients 16 --duration 10
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_capacity import BACKEND_DIR, free_port, wait_until_ready
+
+
+def start_stub_openai(delay):
+    """Local stand-in for the OpenAI API that answers every completion after `delay` seconds"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(delay)
+            body = json.dumps({
+                'id': 'stub', 'object': 'chat.completion', 'created': int(time.time()), 'model': 'gpt-3.5-turbo',
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': 'Eat more vegetables.'}}],
+                'usage': {'prompt_tokens': 50, 'completion_tokens': 10, 'total_tokens': 60}
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', free_port()), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def flood_loop(args):
+    """Hammer /api/chat with one session (cookie) per process; count status codes"""
+    port, stop_at = args
+    counts, cookie = {}, None
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while time.time() < stop_at:
+        headers = {'Content-Type': 'application/json'}
+        if cookie:
+            headers['Cookie'] = cookie
+        try:
+            conn.request('POST', '/api/chat', json.dumps({'message': 'What should I eat?'}), headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            counts['error'] = counts.get('error', 0) + 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        cookie = (response.getheader('Set-Cookie') or '').split(';')[0] or cookie
+        counts[response.status] = counts.get(response.status, 0) + 1
+    conn.close()
+    return counts
+
+
+def probe_loop(port, stop_at):
+    """Serial /api/calculate-bmi requests on a fresh connection each (no keep-alive advantage)"""
+    latencies, errors = [], 0
+    payload = json.dumps({'weight': 72.5, 'height': 178})
+    while time.time() < stop_at:
+        start = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.request('POST', '/api/calculate-bmi', payload, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status != 200:
+                errors += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.05)
+    return latencies, errors
+
+
+def run(admission_enabled, args, stub_port):
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY='1', GUNICORN_THREADS=str(args.threads),
+               BIND=f'127.0.0.1:{port}', GUNICORN_ACCESS_LOG='/dev/null', GUNICORN_LOG_LEVEL='warning',
+               OPENAI_API_KEY='stub', OPENAI_BASE_URL=f'http://127.0.0.1:{stub_port}/v1',
+               LLM_ADMISSION_ENABLED='1' if admission_enabled else '0')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                              cwd=BACKEND_DIR, env=env)
+    try:
+        wait_until_ready(port)
+        stop_at = time.time() + args.duration
+        with multiprocessing.Pool(args.flood_clients) as pool:
+            flood = pool.map_async(flood_loop, [(port, stop_at)] * args.flood_clients)
+            latencies, errors = probe_loop(port, stop_at)
+            flood_counts = flood.get()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    statuses = {}
+    for counts in flood_counts:
+        for status, n in counts.items():
+            statuses[str(status)] = statuses.get(str(status), 0) + n
+    latencies.sort()
+    pick = lambda pct: round(latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))], 2) if latencies else None
+    return {
+        'admission_control': admission_enabled,
+        'llm_responses': statuses,
+        'bmi_probe': {
+            'requests': len(latencies),
+            'errors': errors,
+            'latency_ms': {'p50': pick(50), 'p95': pick(95), 'p99': pick(99), 'max': round(latencies[-1], 2) if latencies else None}
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cheap-endpoint latency while LLM routes are overloaded')
+    parser.add_argument('--flood-clients', type=int, default=16, help='concurrent /api/chat sessions')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads (single worker)')
+    parser.add_argument('--llm-delay', type=float, default=2.0, help='stub OpenAI latency in seconds')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    stub = start_stub_openai(args.llm_delay)
+    results = {
+        'flood_clients': args.flood_clients,
+        'threads': args.threads,
+        'llm_delay_seconds': args.llm_delay,
+        'runs': [run(enabled, args, stub.server_address[1]) for enabled in (False, True)]
+    }
+    stub.shutdown()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Batch vs. per-row throughput for the BMI/calorie calculations
+# Usage (from backend/): python benchmarks/bench_batch_metrics.py --rows 5000
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+from bench_capacity import BACKEND_DIR, free_port, wait_until_ready
+import health_metrics
+
+ACTIVITY_LEVELS = list(health_metrics.ACTIVITY_MULTIPLIERS)
+
+
+def make_people(count, seed=7):
+    rng = random.Random(seed)
+    return [{
+        'id': f'patient-{i}',
+        'weight': round(rng.uniform(40, 140), 1),
+        'height': round(rng.uniform(145, 200), 1),
+        'age': rng.randint(18, 90),
+        'gender': rng.choice(['male', 'female']),
+        'activity_level': rng.choice(ACTIVITY_LEVELS)
+    } for i in range(count)]
+
+
+def post(conn, path, body, content_type='application/json'):
+    conn.request('POST', path, body, {'Content-Type': content_type})
+    response = conn.getresponse()
+    data = response.read()
+    if response.status != 200:
+        raise SystemExit(f"{path} returned {response.status}: {data[:200]!r}")
+    return data
+
+
+def timed(label, rows, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    return {'mode': label, 'rows': rows, 'seconds': round(elapsed, 4), 'rows_per_sec': round(rows / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-row HTTP calls vs. batch endpoints')
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--per-row-sample', type=int, default=1000,
+                        help='rows sent one request at a time (extrapolated; keeps the run short)')
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    people = make_people(args.rows)
+    sample = people[:min(args.per_row_sample, args.rows)]
+    columnar = {field: [p[field] for p in people] for field in health_metrics.BATCH_FIELDS}
+    csv_body = 'id,weight,height,age,gender,activity_level\n' + '\n'.join(
+        f"{p['id']},{p['weight']},{p['height']},{p['age']},{p['gender']},{p['activity_level']}" for p in people)
+
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY='1', GUNICORN_THREADS='1', BIND=f'127.0.0.1:{port}',
+               GUNICORN_ACCESS_LOG='/dev/null', GUNICORN_LOG_LEVEL='warning')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=BACKEND_DIR, env=env)
+    try:
+        wait_until_ready(port)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        results = [
+            timed('per-row HTTP (keep-alive)', len(sample),
+                  lambda: [post(conn, '/api/calculate-calories', json.dumps(p)) for p in sample]),
+            timed('batch JSON rows', args.rows,
+                  lambda: post(conn, '/api/calculate-calories/batch', json.dumps(people))),
+            timed('batch JSON columns', args.rows,
+                  lambda: post(conn, '/api/calculate-calories/batch', json.dumps(columnar))),
+            timed('batch CSV in, CSV out', args.rows,
+                  lambda: post(conn, '/api/calculate-calories/batch?format=csv', csv_body, 'text/csv')),
+        ]
+        conn.close()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    columns = health_metrics.columns_from_json(columnar)
+    results.append(timed('in-process compute_batch', args.rows, lambda: health_metrics.compute_batch(columns)))
+
+    base = results[0]['rows_per_sec']
+    for result in results:
+        result['speedup'] = round(result['rows_per_sec'] / base, 1)
+
+    report = {'rows': args.rows, 'results': results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# Capacity benchmark: requests/second vs. gunicorn worker count on CPU-bound routes
+# Usage (from backend/): python benchmarks/bench_capacity.py --workers 1 2 4 --duration 10
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = {
+    'calculate-calories': ('/api/calculate-calories', {'age': 35, 'weight': 72.5, 'height': 178, 'gender': 'female', 'activity_level': 'active'}),
+    'calculate-bmi': ('/api/calculate-bmi', {'weight': 72.5, 'height': 178})
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/favicon.ico')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"Server on port {port} did not start")
+
+
+def client_loop(args):
+    """One load-generating process: keep-alive POSTs until the deadline"""
+    port, path, body, stop_at = args
+    payload = json.dumps(body)
+    headers = {'Content-Type': 'application/json'}
+    latencies, errors = [], 0
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    while time.time() < stop_at:
+        start = time.perf_counter()
+        try:
+            conn.request('POST', path, payload, headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+    conn.close()
+    return latencies, errors
+
+
+def run_level(workers, threads, clients, duration, endpoint):
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+               BIND=f'127.0.0.1:{port}', GUNICORN_ACCESS_LOG='/dev/null', GUNICORN_LOG_LEVEL='warning')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                              cwd=BACKEND_DIR, env=env)
+    try:
+        wait_until_ready(port)
+        path, body = ENDPOINTS[endpoint]
+        stop_at = time.time() + duration
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.map(client_loop, [(port, path, body, stop_at)] * clients)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    latencies = sorted(l for lat, _ in results for l in lat)
+    errors = sum(e for _, e in results)
+    pick = lambda pct: round(latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))], 2) if latencies else None
+    return {
+        'workers': workers,
+        'threads': threads,
+        'clients': clients,
+        'requests': len(latencies),
+        'errors': errors,
+        'req_per_sec': round(len(latencies) / duration, 1),
+        'latency_ms': {'p50': pick(50), 'p95': pick(95), 'p99': pick(99)}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Requests/second vs. gunicorn worker count')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--clients', type=int, default=max(2, multiprocessing.cpu_count()),
+                        help='concurrent load-generating processes')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per level')
+    parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='calculate-calories')
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args()
+
+    results = {
+        'endpoint': ENDPOINTS[args.endpoint][0],
+        'cpu_count': multiprocessing.cpu_count(),
+        'levels': [run_level(w, args.threads, args.clients, args.duration, args.endpoint) for w in args.workers]
+    }
+    base = results['levels'][0]['req_per_sec'] or 1
+    for level in results['levels']:
+        level['speedup'] = round(level['req_per_sec'] / base, 2)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
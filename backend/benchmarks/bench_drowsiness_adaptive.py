@@ -0,0 +1,111 @@
+# Accuracy vs. CPU per frame of adaptive Face Mesh scheduling, measured on recorded clips
+# Usage (from backend/): python benchmarks/bench_drowsiness_adaptive.py clips/*.mp4 --full-every 2 3 5 --scale 1.0 0.5
+# Needs opencv-python and mediapipe (pygame is initialized but the alarm is muted)
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+try:
+    import cv2
+    from simple_drowsiness_detector import SimpleDrowsinessDetector
+except ImportError as e:
+    raise SystemExit(f"This benchmark needs the detector's dependencies (opencv-python, mediapipe, pygame): {e}")
+
+
+def run_clip(path, adaptive_options=None, max_frames=None):
+    """Per-frame EAR and alert state for one clip, plus CPU seconds spent in analyze_frame"""
+    detector = SimpleDrowsinessDetector(adaptive=adaptive_options is not None, adaptive_options=adaptive_options)
+    detector.play_alarm = lambda: None
+    capture = cv2.VideoCapture(path)
+    ears, alerts = [], []
+    cpu = 0.0
+    try:
+        while max_frames is None or len(ears) < max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            started = time.process_time()
+            result = detector.analyze_frame(frame)
+            cpu += time.process_time() - started
+            ears.append(float(result['ear']))
+            alerts.append(bool(result['drowsy']))
+    finally:
+        capture.release()
+        detector.close()
+    return {
+        'ears': ears,
+        'alerts': alerts,
+        'cpu_s': cpu,
+        'sleep_alerts': detector.sleep_alerts,
+        'threshold': detector.EYE_AR_THRESH,
+        'adaptive': detector.adaptive.get_stats() if detector.adaptive else None
+    }
+
+
+def compare(baseline, candidate, threshold):
+    """Agreement of a run with the every-frame, full-resolution baseline"""
+    frames = min(len(baseline['ears']), len(candidate['ears']))
+    ear_errors = [abs(a - b) for a, b in zip(baseline['ears'][:frames], candidate['ears'][:frames])]
+    closed_agree = sum((a < threshold) == (b < threshold)
+                       for a, b in zip(baseline['ears'][:frames], candidate['ears'][:frames]))
+    alert_agree = sum(a == b for a, b in zip(baseline['alerts'][:frames], candidate['alerts'][:frames]))
+    return {
+        'frames': frames,
+        'ear_mae': round(sum(ear_errors) / frames, 4) if frames else 0.0,
+        'ear_max_error': round(max(ear_errors), 4) if frames else 0.0,
+        'eye_state_agreement': round(closed_agree / frames, 4) if frames else 0.0,
+        'alert_agreement': round(alert_agree / frames, 4) if frames else 0.0,
+        'sleep_alerts': candidate['sleep_alerts'],
+        'baseline_sleep_alerts': baseline['sleep_alerts']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('clips', nargs='+', help='recorded video files')
+    parser.add_argument('--full-every', type=int, nargs='+', default=[2, 3, 5])
+    parser.add_argument('--scale', type=float, nargs='+', default=[1.0, 0.5])
+    parser.add_argument('--motion-threshold', type=float, nargs='+', default=[6.0])
+    parser.add_argument('--max-frames', type=int, help='stop each clip after N frames')
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    for clip in args.clips:
+        baseline = run_clip(clip, None, args.max_frames)
+        frames = len(baseline['ears'])
+        if not frames:
+            print(f"⚠️ {clip}: no frames read")
+            continue
+        threshold = baseline['threshold']
+        base_ms = baseline['cpu_s'] / frames * 1000
+        print(f"\n🎞️ {clip}: {frames} frames, baseline {base_ms:.2f} ms CPU/frame, {baseline['sleep_alerts']} alert(s)")
+        print(f"  {'scale':>5} {'every':>5} {'motion':>6} {'ms/frame':>9} {'saving':>7} {'mesh %':>7} "
+              f"{'EAR MAE':>8} {'eyes ok':>8} {'alert ok':>8} {'alerts':>6}")
+        for scale, full_every, motion in itertools.product(args.scale, args.full_every, args.motion_threshold):
+            options = {'scale': scale, 'full_every': full_every, 'motion_threshold': motion}
+            run = run_clip(clip, options, args.max_frames)
+            accuracy = compare(baseline, run, threshold)
+            cpu_ms = run['cpu_s'] / len(run['ears']) * 1000
+            row = dict(options, clip=clip, cpu_ms_per_frame=round(cpu_ms, 3),
+                       baseline_cpu_ms_per_frame=round(base_ms, 3),
+                       cpu_saving=round(1 - cpu_ms / base_ms, 3) if base_ms else 0.0,
+                       mesh_run_ratio=run['adaptive']['mesh_run_ratio'], **accuracy)
+            results.append(row)
+            print(f"  {scale:>5} {full_every:>5} {motion:>6} {cpu_ms:>9.2f} {row['cpu_saving']:>7.0%} "
+                  f"{row['mesh_run_ratio']:>7.0%} {row['ear_mae']:>8.4f} {row['eye_state_agreement']:>8.1%} "
+                  f"{row['alert_agreement']:>8.1%} {row['sleep_alerts']:>6}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
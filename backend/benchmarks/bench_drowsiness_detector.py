@@ -0,0 +1,277 @@
+# Camera-free regression and benchmark harness for SimpleDrowsinessDetector
+# Usage (from backend/): python benchmarks/bench_drowsiness_detector.py --check [--frames 3000] [--trace data/drowsiness/shift1.frames.csv] [--video clip.mp4]
+# Needs opencv-python (or opencv-python-headless) only: Face Mesh is replaced by scripted landmarks
+# (benchmarks/fakes.py), the alarm is stubbed and nothing opens a window, so it runs in headless CI.
+#
+# Each scenario is an EAR/face-presence script fed frame by frame through detect_drowsiness().
+# The detector's alerts, alarm timing and blinks are checked against drowsiness_batch's offline
+# replay of the same EYE_AR_THRESH / EYE_AR_CLOSED_S rule; latency and memory are measured. Frames are
+# fed faster than real time, so the detector's frame rate is pinned to the replayed REPLAY_FPS.
+# Full-frame mode only: the scripted mesh ignores crops, so adaptive scheduling is measured on real
+# footage by bench_drowsiness_adaptive.py instead.
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+try:
+    import cv2
+    from simple_drowsiness_detector import SimpleDrowsinessDetector
+except ImportError as e:
+    raise SystemExit(f"This harness needs opencv-python (or opencv-python-headless): {e}")
+
+from drowsiness_batch import alert_events, blink_count
+from drowsiness_metrics import EYE_AR_CLOSED_S, EYE_AR_THRESH, closed_frames
+from fakes import ScriptedFaceMesh, SingleMeshPool
+from llm_usage import percentile
+
+REPLAY_FPS = 30.0
+OPEN_EAR = 0.32
+CLOSED_EAR = 0.12
+
+
+def _script(*runs):
+    """EAR script from (frames, ear) runs"""
+    return np.concatenate([np.full(frames, ear, dtype=np.float64) for frames, ear in runs])
+
+
+def scenarios(frames: int, consec: int = closed_frames(REPLAY_FPS), seed: int = 7):
+    """(name, ears, faces) scripts covering the alert rule's edges plus a long mixed run"""
+    rng = random.Random(seed)
+    blinks = np.full(900, OPEN_EAR)
+    for start in range(45, 900, 90):
+        blinks[start:start + 3] = CLOSED_EAR
+
+    dropouts = _script((60, OPEN_EAR), (consec * 2, CLOSED_EAR), (60, OPEN_EAR))
+    dropout_faces = np.ones(len(dropouts), dtype=bool)
+    dropout_faces[::7] = False  # no face every 7th frame, including mid-closure
+
+    mixed = np.empty(frames, dtype=np.float64)
+    n = 0
+    while n < frames:
+        roll = rng.random()
+        if roll < 0.1:
+            length, ear = rng.randint(consec, consec * 3), rng.uniform(0.05, 0.2)  # dozing off
+        elif roll < 0.6:
+            length, ear = rng.randint(2, 5), rng.uniform(0.08, 0.2)  # blink
+        else:
+            length, ear = rng.randint(30, 150), rng.uniform(0.28, 0.36)  # eyes open
+        mixed[n:n + length] = ear
+        n += length
+    mixed_faces = np.array([rng.random() > 0.02 for _ in range(frames)])
+
+    return [
+        ('eyes_open', _script((600, OPEN_EAR)), None),
+        ('blinks', blinks, None),
+        ('alert_at_threshold', _script((60, OPEN_EAR), (consec, CLOSED_EAR), (60, OPEN_EAR)), None),
+        ('one_frame_short', _script((60, OPEN_EAR), (consec - 1, CLOSED_EAR), (60, OPEN_EAR)), None),
+        ('repeated_alerts', _script((30, OPEN_EAR), (consec * 3, CLOSED_EAR), (30, OPEN_EAR),
+                                    (consec + 5, CLOSED_EAR), (30, OPEN_EAR)), None),
+        ('alert_until_stop', _script((30, OPEN_EAR), (consec * 2, CLOSED_EAR)), None),
+        ('face_dropouts', dropouts, dropout_faces),
+        ('mixed', mixed, mixed_faces)
+    ]
+
+
+def load_trace(path: str):
+    """EAR and face columns of a drowsiness_batch <video>.frames.csv"""
+    ears, faces = [], []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            ears.append(float(row['ear']))
+            faces.append(row['face'] in ('True', 'true', '1'))
+    return os.path.basename(path), np.array(ears), np.array(faces, dtype=bool)
+
+
+def load_frames(video=None, limit=300, size=(480, 640)):
+    """Frames to feed alongside the script: the first `limit` frames of a video, or synthetic noise"""
+    if video:
+        capture = cv2.VideoCapture(video)
+        frames = []
+        while len(frames) < limit:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames.append(frame)
+        capture.release()
+        if not frames:
+            raise SystemExit(f"Could not read frames from {video}")
+        return frames
+    rng = np.random.default_rng(3)
+    return [rng.integers(90, 110, size + (3,), dtype=np.uint8) for _ in range(8)]
+
+
+def completed_blinks(closed: np.ndarray, consec: int) -> int:
+    """Blinks the live detector can have counted: short closed runs that ended with open eyes"""
+    count = blink_count(closed, consec)
+    trailing = len(closed) - np.flatnonzero(~closed)[-1] - 1 if (~closed).any() else len(closed)
+    if 0 < trailing < consec:
+        count -= 1
+    return count
+
+
+def run_detector(ears, faces, frames, measure_memory=False):
+    """Feed a script through detect_drowsiness(); per-frame results, alarm frames, events and timings"""
+    mesh = ScriptedFaceMesh(ears, faces)
+    detector = SimpleDrowsinessDetector(sound=False, face_mesh_pool=SingleMeshPool(mesh), frame_rate=REPLAY_FPS)
+    current = [0]
+    alarm_frames = []
+    detector.play_alarm = lambda: alarm_frames.append(current[0])
+    detector.stop_alarm = lambda: None
+    events = []
+    detector.event_sink = events.append
+
+    count = len(ears)
+    work = np.empty_like(frames[0])
+    seen_ears = np.zeros(count)
+    drowsy = np.zeros(count, dtype=bool)
+    face_seen = np.zeros(count, dtype=bool)
+    latency = np.zeros(count)
+    warmup = max(count // 10, 1)
+    memory = None
+    if measure_memory:
+        tracemalloc.start()
+    try:
+        for n in range(count):
+            current[0] = n
+            np.copyto(work, frames[n % len(frames)])
+            started = time.perf_counter()
+            _, drowsy[n], status = detector.detect_drowsiness(work)
+            latency[n] = time.perf_counter() - started
+            seen_ears[n] = detector.last_result['ear']
+            face_seen[n] = status != "No face detected"
+            if measure_memory and n == warmup - 1:
+                baseline = tracemalloc.get_traced_memory()[0]
+        if measure_memory:
+            end, peak = tracemalloc.get_traced_memory()
+            memory = {'growth_kb': round((end - baseline) / 1024, 1),
+                      'growth_kb_per_1k_frames': round((end - baseline) / 1024 / max(count - warmup, 1) * 1000, 2),
+                      'peak_kb': round(peak / 1024, 1)}
+    finally:
+        if measure_memory:
+            tracemalloc.stop()
+    detector.finish_alert()  # what stopping detection does with an alert in progress
+    return {
+        'detector': detector,
+        'ears': seen_ears,
+        'drowsy': drowsy,
+        'faces': face_seen,
+        'alarm_frames': alarm_frames,
+        'events': events,
+        'latency': latency,
+        'mesh_s': mesh.busy,
+        'memory': memory
+    }
+
+
+def evaluate(name, ears, faces, frames):
+    """Run one scenario and compare the detector with the offline replay of the alert rule"""
+    faces = np.ones(len(ears), dtype=bool) if faces is None else faces
+    run = run_detector(ears, faces, frames)
+    memory = run_detector(ears, faces, frames, measure_memory=True)['memory']
+    detector = run['detector']
+    threshold, consec = detector.EYE_AR_THRESH, detector.EYE_AR_CONSEC_FRAMES
+
+    # Expected behaviour from the EARs and faces the detector saw (checked against the script below)
+    seen = run['faces']
+    expected_alerts, expected_events = alert_events(run['ears'], seen, REPLAY_FPS, threshold, consec)
+    closed = run['ears'][seen] < threshold
+    window = detector.eye_closure.capacity
+    checks = {
+        'alarm_timing': run['alarm_frames'] == [e['start_frame'] for e in expected_events],
+        'alert_frames': bool((run['drowsy'][seen] == expected_alerts[seen]).all()),
+        'events_recorded': len(run['events']) == len(expected_events),
+        'blinks': detector.total_blinks == completed_blinks(closed, consec),
+        'perclos': bool(abs(detector.eye_closure.perclos - (closed[-window:].mean() if closed.size else 0.0)) < 1e-9)
+    }
+    checks['face_presence'] = bool((seen == faces).all())
+    injected = ears[faces]
+    checks['ear_fidelity'] = bool(np.abs(run['ears'][faces] - injected).max() < 1e-6) if injected.size else True
+
+    latency_ms = sorted(run['latency'] * 1000)
+    frames_run = len(ears)
+    return {
+        'scenario': name,
+        'frames': frames_run,
+        'alerts': len(run['alarm_frames']),
+        'frames_to_alert': [e['start_frame'] - e['closed_since_frame'] + 1 for e in expected_events],
+        'blinks': detector.total_blinks,
+        'perclos': round(detector.eye_closure.perclos, 4),
+        'latency_ms': {
+            'p50': round(percentile(latency_ms, 50), 3),
+            'p95': round(percentile(latency_ms, 95), 3),
+            'p99': round(percentile(latency_ms, 99), 3),
+            'max': round(latency_ms[-1], 3),
+            # Without the scripted mesh's own time: the detector's share of a real Face Mesh frame
+            'detector_mean': round((run['latency'].sum() - run['mesh_s']) / frames_run * 1000, 3)
+        },
+        'memory': memory,
+        'checks': checks,
+        'passed': all(checks.values())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera-free drowsiness detector regression and benchmark")
+    parser.add_argument('--frames', type=int, default=3000, help='length of the mixed scenario')
+    parser.add_argument('--trace', action='append', default=[],
+                        help='replay a drowsiness_batch <video>.frames.csv (repeatable)')
+    parser.add_argument('--video', help='feed frames from this video instead of synthetic noise')
+    parser.add_argument('--check', action='store_true', help='exit 1 when a check or budget fails (for CI)')
+    parser.add_argument('--max-p95-ms', type=float, help='latency budget per frame (p95)')
+    parser.add_argument('--max-growth-kb', type=float, default=64.0,
+                        help='memory growth budget per 1,000 frames after warm-up')
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args()
+
+    frames = load_frames(args.video)
+    cases = scenarios(args.frames) + [load_trace(path) for path in args.trace]
+    results = []
+    print(f"🧪 EYE_AR_THRESH={EYE_AR_THRESH}, EYE_AR_CLOSED_S={EYE_AR_CLOSED_S} "
+          f"({closed_frames(REPLAY_FPS)} frames at {REPLAY_FPS:g} fps), "
+          f"frames {frames[0].shape[1]}x{frames[0].shape[0]}")
+    print(f"{'scenario':<22} {'frames':>6} {'alerts':>6} {'blinks':>6} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'max ms':>7} {'KB/1k':>6}  result")
+    for name, ears, faces in cases:
+        result = evaluate(name, ears, faces, frames)
+        budget_failures = []
+        if args.max_p95_ms is not None and result['latency_ms']['p95'] > args.max_p95_ms:
+            budget_failures.append('p95 latency')
+        if result['memory']['growth_kb_per_1k_frames'] > args.max_growth_kb:
+            budget_failures.append('memory growth')
+        result['budget_failures'] = budget_failures
+        failed = [check for check, ok in result['checks'].items() if not ok] + budget_failures
+        result['passed'] = not failed
+        results.append(result)
+        latency = result['latency_ms']
+        print(f"{name:<22} {result['frames']:>6} {result['alerts']:>6} {result['blinks']:>6} "
+              f"{latency['p50']:>7.3f} {latency['p95']:>7.3f} {latency['max']:>7.3f} "
+              f"{result['memory']['growth_kb_per_1k_frames']:>6.1f}  {'✅ pass' if not failed else '❌ ' + ', '.join(failed)}")
+
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"📈 Peak RSS {max_rss_mb:.1f} MB")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results, 'max_rss_mb': round(max_rss_mb, 1)}, f, indent=2)
+
+    failures = [r for r in results if not r['passed']]
+    if failures:
+        print(f"❌ {len(failures)} scenario(s) failed")
+        if args.check:
+            sys.exit(1)
+    else:
+        print("✅ All scenarios passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+# Per-frame cost of EAR + eye drawing: per-point Python loops vs. one vectorized extraction
+# Usage (from backend/): python benchmarks/bench_drowsiness_ear.py --frames 20000
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+from drowsiness_metrics import LEFT_EYE, RIGHT_EYE, EyeLandmarks, eye_aspect_ratios
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+MESH_POINTS = 478  # Face Mesh with refine_landmarks=True
+
+
+class Landmark:
+    """Stand-in for a MediaPipe NormalizedLandmark"""
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x, y, z=0.0):
+        self.x, self.y, self.z = x, y, z
+
+
+def make_landmark_sets(count, seed=11):
+    """Synthetic meshes: jittered face positions with eyes that open and close"""
+    rng = random.Random(seed)
+    sets = []
+    for _ in range(count):
+        cx, cy = rng.uniform(0.3, 0.7), rng.uniform(0.3, 0.7)
+        mesh = [Landmark(cx + rng.uniform(-0.2, 0.2), cy + rng.uniform(-0.25, 0.25)) for _ in range(MESH_POINTS)]
+        for eye, ex in ((LEFT_EYE, cx + 0.08), (RIGHT_EYE, cx - 0.08)):
+            openness = rng.choice([0.002, 0.01, 0.02])
+            # p0/p3 are the corners, p1/p2 above and p5/p4 below (EAR geometry)
+            offsets = [(-0.04, 0), (-0.015, -openness), (0.015, -openness), (0.04, 0), (0.015, openness), (-0.015, openness)]
+            for idx, (dx, dy) in zip(eye[:6], offsets):
+                mesh[idx] = Landmark(ex + dx, cy - 0.05 + dy)
+        sets.append(mesh)
+    return sets
+
+
+# --- the per-point implementation the detector used before ---------------------------
+
+def legacy_calculate_ear(landmarks, eye_indices):
+    eye_points = []
+    for idx in eye_indices:
+        if idx < len(landmarks):
+            eye_points.append([landmarks[idx].x, landmarks[idx].y])
+    if len(eye_points) < 6:
+        return 0
+    eye_points = np.array(eye_points)
+    v1 = np.linalg.norm(eye_points[1] - eye_points[5])
+    v2 = np.linalg.norm(eye_points[2] - eye_points[4])
+    h = np.linalg.norm(eye_points[0] - eye_points[3])
+    return (v1 + v2) / (2.0 * h) if h > 0 else 0
+
+
+def draw_dot(frame, x, y):
+    """cv2.circle when OpenCV is installed; otherwise only the coordinates are exercised"""
+    if cv2 is not None:
+        cv2.circle(frame, (x, y), 2, (0, 255, 0), -1)
+    else:
+        frame[y, x] = (0, 255, 0)
+
+
+def legacy_frame(landmarks, frame):
+    left_ear = legacy_calculate_ear(landmarks, LEFT_EYE[:6])
+    right_ear = legacy_calculate_ear(landmarks, RIGHT_EYE[:6])
+    ear = (left_ear + right_ear) / 2.0
+    h, w, _ = frame.shape
+    for idx in LEFT_EYE[:6] + RIGHT_EYE[:6]:
+        if idx < len(landmarks):
+            draw_dot(frame, int(landmarks[idx].x * w), int(landmarks[idx].y * h))
+    return ear
+
+
+def vectorized_frame(landmarks, frame, eyes):
+    if not eyes.fill(landmarks):
+        return 0.0
+    left_ear, right_ear = eye_aspect_ratios(eyes.eye_points())
+    h, w, _ = frame.shape
+    for x, y in eyes.to_pixels(w, h).tolist():
+        draw_dot(frame, x, y)
+    return (float(left_ear) + float(right_ear)) / 2.0
+
+
+def time_per_frame(func, sets, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for landmarks in sets:
+            func(landmarks)
+        best = min(best, time.perf_counter() - started)
+    return best / len(sets) * 1e6
+
+
+def time_recording(sets, eyes, repeats):
+    stack = np.zeros((len(sets), 2, 6, 2))
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for n, landmarks in enumerate(sets):
+            eyes.fill(landmarks)
+            stack[n] = eyes.eye_points()
+        ears = eye_aspect_ratios(stack).mean(axis=1)
+        best = min(best, time.perf_counter() - started)
+    assert ears.shape == (len(sets),)
+    return best / len(sets) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', type=int, default=20000, help='synthetic landmark sets per run')
+    parser.add_argument('--repeats', type=int, default=5, help='runs per variant (best is reported)')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args()
+
+    sets = make_landmark_sets(args.frames)
+    eyes = EyeLandmarks()
+
+    # Same EAR and same painted pixels before timing anything
+    legacy_canvas = np.zeros((args.height, args.width, 3), dtype=np.uint8)
+    vector_canvas = np.zeros_like(legacy_canvas)
+    for landmarks in sets[:500]:
+        expected = legacy_frame(landmarks, legacy_canvas)
+        actual = vectorized_frame(landmarks, vector_canvas, eyes)
+        assert abs(expected - actual) < 1e-9, (expected, actual)
+    pixels_match = bool(np.array_equal(legacy_canvas, vector_canvas))
+
+    frame = np.zeros((args.height, args.width, 3), dtype=np.uint8)
+    results = {
+        'frames': args.frames,
+        'drawing': 'cv2.circle' if cv2 is not None else 'single pixel (OpenCV not installed)',
+        'pixels_match': pixels_match,
+        'us_per_frame': {
+            'legacy_ear_only': time_per_frame(
+                lambda lm: (legacy_calculate_ear(lm, LEFT_EYE[:6]) + legacy_calculate_ear(lm, RIGHT_EYE[:6])) / 2.0,
+                sets, args.repeats),
+            'vectorized_ear_only': time_per_frame(
+                lambda lm: eyes.fill(lm) and float(eye_aspect_ratios(eyes.eye_points()).sum()) / 2.0,
+                sets, args.repeats),
+            'legacy_ear_and_draw': time_per_frame(lambda lm: legacy_frame(lm, frame), sets, args.repeats),
+            'vectorized_ear_and_draw': time_per_frame(lambda lm: vectorized_frame(lm, frame, eyes), sets, args.repeats),
+            # Offline analysis: extract every frame into one stack, then EAR for the whole recording at once
+            'vectorized_ear_recording': time_recording(sets, eyes, args.repeats),
+        }
+    }
+    timings = results['us_per_frame']
+    results['speedup'] = {
+        'ear_only': round(timings['legacy_ear_only'] / timings['vectorized_ear_only'], 2),
+        'ear_and_draw': round(timings['legacy_ear_and_draw'] / timings['vectorized_ear_and_draw'], 2),
+        'ear_recording': round(timings['legacy_ear_only'] / timings['vectorized_ear_recording'], 2),
+    }
+
+    print(f"🧪 {args.frames} synthetic frames, drawing via {results['drawing']} (pixels match: {pixels_match})")
+    for name, value in timings.items():
+        print(f"  {name:<26} {value:8.2f} µs/frame")
+    print(f"⚡ EAR {results['speedup']['ear_only']}x, EAR + drawing {results['speedup']['ear_and_draw']}x, "
+          f"whole recording {results['speedup']['ear_recording']}x faster")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
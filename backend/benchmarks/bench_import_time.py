@@ -0,0 +1,85 @@
+# Import-time profile of the Flask app (per-module cost via `python -X importtime`)
+# Usage: python benchmarks/bench_import_time.py [--output import_time.json] [--baseline old.json]
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a worker does at boot: import the app module and build the Flask app
+BOOT_SNIPPET = "import app; app.create_app()"
+
+
+def profile_imports(snippet, runs):
+    """Run the snippet in fresh interpreters and keep the fastest run's import table"""
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", snippet],
+            cwd=BACKEND_DIR, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise SystemExit(f"Boot failed:\n{result.stderr[-2000:]}")
+        modules = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            modules.append({
+                'module': name.strip(),
+                'depth': (len(name) - len(name.lstrip())) // 2,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000
+            })
+        total_ms = sum(m['cumulative_ms'] for m in modules if m['depth'] == 0)
+        if best is None or total_ms < best['total_ms']:
+            best = {'total_ms': round(total_ms, 1), 'modules': modules}
+    return best
+
+
+def summarize(profile, top):
+    """Aggregate self time per top-level package and list the heaviest imports"""
+    packages = {}
+    for module in profile['modules']:
+        package = module['module'].split('.')[0]
+        packages[package] = packages.get(package, 0) + module['self_ms']
+    heaviest = sorted(profile['modules'], key=lambda m: m['cumulative_ms'], reverse=True)[:top]
+    return {
+        'total_import_ms': profile['total_ms'],
+        'module_count': len(profile['modules']),
+        'packages_ms': {k: round(v, 1) for k, v in sorted(packages.items(), key=lambda kv: -kv[1])[:top]},
+        'heaviest_imports': [
+            {'module': m['module'], 'cumulative_ms': round(m['cumulative_ms'], 1)} for m in heaviest
+        ]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-time profile of app startup')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreter runs (fastest is kept)')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--output', help='write the report to this JSON file')
+    parser.add_argument('--baseline', help='previous report; exit non-zero on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown vs baseline (fraction)')
+    args = parser.parse_args()
+
+    report = summarize(profile_imports(BOOT_SNIPPET, args.runs), args.top)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        limit = baseline['total_import_ms'] * (1 + args.tolerance)
+        if report['total_import_ms'] > limit:
+            print(f"❌ Import time regressed: {report['total_import_ms']}ms > {limit:.1f}ms", file=sys.stderr)
+            sys.exit(1)
+        print(f"✅ Import time within budget ({report['total_import_ms']}ms <= {limit:.1f}ms)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
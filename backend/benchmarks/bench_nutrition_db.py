@@ -0,0 +1,144 @@
+# Name-matching accuracy and per-recipe latency for the columnar nutrition database
+# Usage: python benchmarks/bench_nutrition_db.py [--recipes 2000] [--baseline] [--output results.json]
+import argparse
+import csv
+import difflib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nutrition_db
+from llm_usage import percentile
+
+QUANTITIES = ["1", "2", "1/2", "1 1/2", "3", "200g", "250 g", "1 lb", "2-3", "½", ""]
+UNITS = ["", "", "cup", "cups", "tbsp", "tsp", "large", "slices", "oz"]
+ADJECTIVES = ["fresh", "chopped", "large", "diced", "sliced"]
+
+
+def misspell(rng, word):
+    """Drop or swap one letter inside the longest word"""
+    if len(word) < 6:
+        return word
+    i = rng.randint(1, len(word) - 3)
+    if rng.random() < 0.5:
+        return word[:i] + word[i + 1:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def variants(rng, label):
+    words = label.split()
+    longest = max(range(len(words)), key=lambda i: len(words[i]))
+    typo = " ".join(misspell(rng, w) if i == longest else w for i, w in enumerate(words))
+    return {
+        'exact': label,
+        'title_case': label.title(),
+        'plural': label + ("es" if label.endswith(("o", "ch")) else "" if label.endswith("s") else "s"),
+        'adjective': f"{rng.choice(ADJECTIVES)} {label}",
+        'descriptor': f"boneless {label}, cut into pieces",
+        'misspelled': typo
+    }
+
+
+def naive_match(keys, name):
+    """Baseline: difflib over every name for every line (what a straightforward CSV lookup would do)"""
+    found = difflib.get_close_matches(name.lower(), keys, n=1, cutoff=0.6)
+    return found[0] if found else None
+
+
+def random_recipe(rng, labels):
+    lines = []
+    for label in rng.sample(labels, rng.randint(6, 12)):
+        parts = [rng.choice(QUANTITIES), rng.choice(UNITS), rng.choice(["", rng.choice(ADJECTIVES)]), label]
+        lines.append(" ".join(p for p in parts if p) + rng.choice(["", "", ", finely chopped", " (optional)"]))
+    return lines
+
+
+def timed(fn, runs):
+    latencies = []
+    for args in runs:
+        t0 = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - t0) * 1e6)
+    latencies.sort()
+    return {'p50': round(percentile(latencies, 50), 1), 'p95': round(percentile(latencies, 95), 1),
+            'p99': round(percentile(latencies, 99), 1), 'mean': round(sum(latencies) / len(latencies), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Nutrition database benchmark')
+    parser.add_argument('--recipes', type=int, default=2000, help='random recipes per latency scenario')
+    parser.add_argument('--csv', default=nutrition_db.NUTRITION_CSV)
+    parser.add_argument('--baseline', action='store_true', help='also time a difflib scan over the CSV names')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = os.path.join(tmp, 'nutrition')
+        t0 = time.perf_counter()
+        built = nutrition_db.build(args.csv, prefix)
+        results['build_ms'] = round((time.perf_counter() - t0) * 1000, 2)
+        t0 = time.perf_counter()
+        db = nutrition_db.load(args.csv, prefix)
+        results['load_ms'] = round((time.perf_counter() - t0) * 1000, 2)
+        results['foods'] = built['foods']
+        results['matrix_bytes'] = built['bytes']
+
+        with open(args.csv, newline='', encoding='utf-8') as handle:
+            records = list(csv.DictReader(handle))
+        labels = []
+        for row, record in enumerate(records):
+            for label in [record['name']] + [a for a in record['aliases'].split('|') if a]:
+                labels.append((row, label))
+
+        # Accuracy: every name and alias, rewritten the ways recipes write them
+        accuracy = {}
+        for expected, label in labels:
+            for kind, text in variants(rng, label).items():
+                row, _ = db.match(text)
+                stats = accuracy.setdefault(kind, [0, 0])
+                stats[0] += int(row == expected)
+                stats[1] += 1
+        results['accuracy'] = {kind: round(ok / total, 4) for kind, (ok, total) in accuracy.items()}
+
+        names = [label for _, label in labels]
+        recipes = [(random_recipe(rng, names), rng.choice([1, 2, 4])) for _ in range(args.recipes)]
+        results['ingredients_per_recipe'] = round(sum(len(r) for r, _ in recipes) / len(recipes), 1)
+
+        def cold(lines, servings):
+            db._cache.clear()
+            db._lines.clear()
+            return db.recipe_nutrition(lines, servings)
+
+        results['recipe_us'] = {'cold_cache': timed(cold, recipes)}
+        # Warm: a working set of recipes whose lines fit the parse cache, each already seen once
+        working_set = recipes[:500]
+        for lines, servings in working_set:
+            db.recipe_nutrition(lines, servings)
+        results['recipe_us']['warm_cache'] = timed(db.recipe_nutrition,
+                                                   working_set * max(len(recipes) // len(working_set), 1))
+        if args.baseline:
+            keys = sorted({label.lower() for label in names})
+
+            def baseline(lines, servings):
+                return [naive_match(keys, nutrition_db.parse_quantity(line)[2]) for line in lines]
+
+            results['recipe_us']['difflib_baseline'] = timed(baseline, recipes[:max(len(recipes) // 10, 1)])
+        results['stats'] = db.get_stats()
+        del db  # release the memory map before the directory goes away
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# Recall / latency benchmark for the local recipe similarity index
+# Usage: python benchmarks/bench_recipe_index.py [--size 5000] [--queries 2000]
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recipe_index import RecipeIndex, request_signature
+
+INGREDIENTS = [
+    "chicken", "beef", "pork", "salmon", "tuna", "shrimp", "tofu", "egg", "rice", "pasta",
+    "quinoa", "lentil", "chickpea", "black bean", "potato", "sweet potato", "carrot", "onion",
+    "garlic", "ginger", "tomato", "spinach", "kale", "broccoli", "cauliflower", "zucchini",
+    "bell pepper", "mushroom", "avocado", "lemon", "lime", "coconut milk", "yogurt", "cheese",
+    "basil", "cilantro", "parsley", "oat", "almond", "peanut", "corn", "cabbage", "eggplant"
+]
+CUISINES = ["italian", "mexican", "indian", "chinese", "thai", "mediterranean", "american", "japanese"]
+MEALS = ["breakfast", "lunch", "dinner", "snack"]
+DIETS = [[], [], [], ["vegetarian"], ["vegan"], ["gluten-free"], ["low-carb"]]
+
+
+def random_request(rng):
+    return {
+        'ingredients': rng.sample(INGREDIENTS, rng.randint(3, 6)),
+        'cuisine_type': rng.choice(CUISINES),
+        'meal_type': rng.choice(MEALS),
+        'dietary_restrictions': rng.choice(DIETS),
+        'servings': rng.choice([2, 4, 4, 4, 6])
+    }
+
+
+def near_duplicate(rng, req):
+    """Same request phrased differently: shuffled, pluralized, with adjectives"""
+    ingredients = [rng.choice([i, i + "s", "fresh " + i, "chopped " + i, i.title()]) for i in req['ingredients']]
+    rng.shuffle(ingredients)
+    return dict(req, ingredients=ingredients, cuisine_type=req['cuisine_type'].title())
+
+
+def one_ingredient_added(rng, req):
+    """A stored request plus one ingredient it lacks: similar vectors, but the stored recipe must not answer it"""
+    extra = rng.choice([i for i in INGREDIENTS if i not in req['ingredients']])
+    return dict(req, ingredients=req['ingredients'] + [extra])
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def shared_storage_hit_rate(args, sync: bool) -> dict:
+    """
+    Hit rate of a stream of requests spread round-robin over `args.workers`
+    per-process indexes. Each request repeats an earlier one with probability
+    --repeat; a miss saves the recipe to a shared SQLite database as the app
+    does. With sync, every worker calls load() before querying (refresh
+    interval 0); without it, workers only see their own recipes.
+    """
+    from database_service import DatabaseService
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = DatabaseService(db_path=os.path.join(tmp, 'bench.db'))
+        indexes = [RecipeIndex(threshold=args.threshold, refresh_interval=0) for _ in range(args.workers)]
+        asked, hits = [], 0
+        for n in range(args.stream):
+            req = near_duplicate(rng, rng.choice(asked)) if asked and rng.random() < args.repeat else random_request(rng)
+            asked.append(req)
+            index = indexes[n % args.workers]
+            if sync:
+                index.load(storage)
+            signature = request_signature(req)
+            recipe, _ = index.query(signature)
+            if recipe is not None:
+                hits += 1
+                continue
+            saved = storage.save_recipe({'name': f'recipe {n}'}, signature)
+            index.add(saved['recipe_id'], signature, {'id': saved['recipe_id']})
+    return {'requests': args.stream, 'hit_rate': round(hits / args.stream, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recipe index recall/latency benchmark')
+    parser.add_argument('--size', type=int, default=5000, help='recipes in the index')
+    parser.add_argument('--queries', type=int, default=2000, help='queries per scenario')
+    parser.add_argument('--threshold', type=float, default=0.9)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='also simulate this many gunicorn workers sharing the SQLite database')
+    parser.add_argument('--stream', type=int, default=2000, help='requests in the multi-worker simulation')
+    parser.add_argument('--repeat', type=float, default=0.5, help='share of requests repeating an earlier one')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    index = RecipeIndex(threshold=args.threshold)
+    requests_ = [random_request(rng) for _ in range(args.size)]
+
+    start = time.perf_counter()
+    for recipe_id, req in enumerate(requests_):
+        index.add(recipe_id, request_signature(req), {'id': recipe_id})
+    build_seconds = time.perf_counter() - start
+
+    results = {'index_size': args.size, 'threshold': args.threshold, 'build_seconds': round(build_seconds, 3)}
+    seen = set(json.dumps(request_signature(r), sort_keys=True) for r in requests_)
+    scenarios = {
+        'near_duplicate': [(i, near_duplicate(rng, requests_[i])) for i in rng.sample(range(args.size), min(args.queries, args.size))],
+        'one_ingredient_added': [(None, one_ingredient_added(rng, requests_[i]))
+                                 for i in rng.sample(range(args.size), min(args.queries, args.size))],
+        'novel': []
+    }
+    while len(scenarios['novel']) < args.queries:
+        req = random_request(rng)
+        if json.dumps(request_signature(req), sort_keys=True) not in seen:
+            scenarios['novel'].append((None, req))
+
+    for name, queries in scenarios.items():
+        latencies, hits, correct = [], 0, 0
+        for expected_id, req in queries:
+            t0 = time.perf_counter()
+            recipe, _ = index.query(request_signature(req))
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if recipe is not None:
+                hits += 1
+                correct += int(recipe['id'] == expected_id)
+        results[name] = {
+            'queries': len(queries),
+            'hit_rate': round(hits / len(queries), 4),
+            # Near-duplicates should hit their own recipe; requests with an ingredient no stored recipe has,
+            # and novel requests, should miss
+            'correct_rate': round((correct if name == 'near_duplicate' else len(queries) - hits) / len(queries), 4),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 4),
+                'p95': round(percentile(latencies, 95), 4),
+                'p99': round(percentile(latencies, 99), 4)
+            }
+        }
+
+    if args.workers > 1:
+        results['multi_worker'] = {
+            'workers': args.workers,
+            'repeat': args.repeat,
+            'local_only': shared_storage_hit_rate(args, sync=False),
+            'shared_storage': shared_storage_hit_rate(args, sync=True)
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
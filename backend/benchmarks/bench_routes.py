@@ -0,0 +1,370 @@
+# Route benchmark suite: scenario mixes over every route, via the Flask test client and a real HTTP server
+# Usage (from backend/): python benchmarks/bench_routes.py --output bench.json [--baseline previous.json]
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+INGREDIENTS = ['chicken', 'rice', 'broccoli', 'tofu', 'salmon', 'spinach', 'pasta', 'tomato',
+               'beans', 'quinoa', 'eggs', 'mushrooms', 'bell pepper', 'garlic', 'onion', 'lentils']
+
+
+class Step(NamedTuple):
+    weight: int
+    method: str
+    path: str
+    body: Optional[callable] = None
+    expect: int = 200
+    relogin: bool = False
+
+
+def recipe_body(rng):
+    return {'ingredients': rng.sample(INGREDIENTS, 3), 'cuisine_type': rng.choice(['italian', 'thai', 'mexican']),
+            'meal_type': rng.choice(['lunch', 'dinner']), 'servings': rng.choice([2, 4]), 'dietary_restrictions': []}
+
+
+def meal_plan_body(rng):
+    return {'age': rng.randint(20, 70), 'weight': rng.randint(50, 110), 'height': rng.randint(150, 195),
+            'activity_level': 'moderate', 'dietary_preferences': [], 'health_goals': ['maintain'],
+            'budget': rng.choice([50, 100, 150]), 'days': 7, 'cuisine_preference': 'any'}
+
+
+def tracking_body(rng):
+    return {'weight': round(rng.uniform(50, 110), 1), 'calories_consumed': rng.randint(1400, 2800),
+            'exercise_minutes': rng.randint(0, 90), 'water_intake': rng.randint(4, 12), 'sleep_hours': 7, 'notes': ''}
+
+
+def person_body(rng):
+    return {'age': rng.randint(18, 90), 'weight': round(rng.uniform(45, 130), 1), 'height': round(rng.uniform(150, 200), 1),
+            'gender': rng.choice(['male', 'female']), 'activity_level': rng.choice(['sedentary', 'moderate', 'active'])}
+
+
+def batch_body(rng):
+    return [person_body(rng) for _ in range(200)]
+
+
+def chat_body(rng):
+    return {'message': rng.choice(['What is a good high-protein breakfast?', 'How much water should I drink?',
+                                   'Give me a cheap vegetarian dinner idea.'])}
+
+
+def family_body(rng):
+    return {'family_members': [{'name': 'Sam', 'age': 40}, {'name': 'Alex', 'age': 9}], 'preferences': {}}
+
+
+PAGES = ['/', '/meal-planner', '/health-tracker', '/weight-loss', '/motion-detection',
+         '/recipe-generator', '/ai-assistant', '/family-plans']
+
+SCENARIOS: Dict[str, List[Step]] = {
+    'dashboard_browsing': [
+        Step(3, 'GET', '/dashboard'),
+        Step(3, 'GET', '/api/get-meal-plans'),
+        Step(2, 'GET', '/api/user-profile'),
+        Step(1, 'GET', '/api/database-stats'),
+        *[Step(1, 'GET', page) for page in PAGES],
+    ],
+    'plan_generation': [
+        Step(3, 'POST', '/api/generate-meal-plan', meal_plan_body),
+        Step(3, 'POST', '/api/generate-recipe', recipe_body),
+        Step(2, 'POST', '/api/chat', chat_body),
+        Step(1, 'POST', '/api/generate-family-plan', family_body),
+        Step(1, 'GET', '/api/get-meal-plans'),
+    ],
+    'health_logging': [
+        Step(3, 'POST', '/api/save-health-tracking', tracking_body),
+        Step(3, 'POST', '/api/calculate-bmi', person_body),
+        Step(3, 'POST', '/api/calculate-calories', person_body),
+        Step(1, 'POST', '/api/calculate-calories/batch', batch_body),
+        Step(1, 'GET', '/health-tracker'),
+    ],
+    # Every route once per cycle so nothing goes unmeasured
+    'all_routes': [
+        *[Step(1, 'GET', page) for page in PAGES],
+        Step(1, 'GET', '/dashboard'),
+        Step(1, 'POST', '/api/generate-recipe', recipe_body),
+        Step(1, 'POST', '/api/save-profile', lambda rng: {'email': 'bench-all@example.com', 'name': 'Bench'}),
+        Step(1, 'POST', '/api/generate-meal-plan', meal_plan_body),
+        Step(1, 'POST', '/api/meal-plan-jobs', meal_plan_body, expect=202),
+        Step(1, 'GET', '/api/job-queue-status'),
+        Step(1, 'POST', '/api/save-health-tracking', tracking_body),
+        Step(1, 'GET', '/api/get-meal-plans'),
+        Step(1, 'GET', '/api/database-stats'),
+        Step(1, 'GET', '/api/recipe-stats'),
+        Step(1, 'GET', '/api/llm-usage'),
+        Step(1, 'GET', '/api/llm-client-status'),
+        Step(1, 'GET', '/metrics'),
+        Step(1, 'GET', '/api/admin/profiles', expect=404),
+        Step(1, 'GET', '/api/admission-status'),
+        Step(1, 'GET', '/api/user-profile'),
+        Step(1, 'GET', '/favicon.ico', expect=204),
+        Step(1, 'POST', '/api/calculate-bmi', person_body),
+        Step(1, 'POST', '/api/calculate-calories', person_body),
+        Step(1, 'POST', '/api/calculate-bmi/batch', batch_body),
+        Step(1, 'POST', '/api/calculate-calories/batch', batch_body),
+        Step(1, 'POST', '/api/chat', chat_body),
+        Step(1, 'POST', '/api/chat/reset'),
+        Step(1, 'POST', '/api/generate-family-plan', family_body),
+        Step(1, 'GET', '/logout', expect=302, relogin=True),
+    ],
+}
+
+
+def prepare_app(workdir, llm_latency, firebase_latency):
+    """Import the app against a throwaway data directory with OpenAI/Firebase faked"""
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+    sys.path.insert(0, BENCH_DIR)
+    import logging
+    logging.disable(logging.WARNING)
+    import app as app_module
+    from fakes import install_fakes
+    application = app_module.create_app()
+    install_fakes(app_module, llm_latency=llm_latency, firebase_latency=firebase_latency)
+    return application
+
+
+# --- clients -----------------------------------------------------------------
+
+class TestClientUser:
+    """Virtual user backed by the Flask test client (measures the app without a network stack)"""
+
+    def __init__(self, application):
+        self._client = application.test_client()
+
+    def request(self, method, path, body=None):
+        response = self._client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+
+class HttpUser:
+    """Virtual user over a keep-alive HTTP connection with a one-cookie jar"""
+
+    def __init__(self, port):
+        self._port = port
+        self._conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        self._cookie = None
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        if self._cookie:
+            headers['Cookie'] = self._cookie
+        try:
+            self._conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+            response = self._conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self._conn.close()
+            self._conn = http.client.HTTPConnection('127.0.0.1', self._port, timeout=60)
+            return 0
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self._cookie = cookie.split(';')[0]
+        return response.status
+
+
+def login(user, user_number):
+    return user.request('POST', '/api/save-profile', {
+        'email': f'bench-user-{user_number}@example.com', 'name': f'Bench {user_number}',
+        'age': 35, 'weight': 70, 'height': 175, 'activity_level': 'moderate'
+    })
+
+
+def run_user(user, user_number, steps, stop_at, seed, samples):
+    rng = random.Random(seed)
+    login(user, user_number)
+    weights = [step.weight for step in steps]
+    while time.time() < stop_at:
+        step = rng.choices(steps, weights)[0]
+        body = step.body(rng) if step.body else None
+        start = time.perf_counter()
+        status = user.request(step.method, step.path, body)
+        samples.append((f"{step.method} {step.path}", (time.perf_counter() - start) * 1000, status, status == step.expect))
+        if step.relogin:
+            login(user, user_number)
+
+
+# --- statistics ----------------------------------------------------------------
+
+def pick(sorted_values, pct):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))], 3)
+
+
+def summarize(samples, duration):
+    def block(items):
+        latencies = sorted(s[1] for s in items)
+        return {
+            'requests': len(items),
+            'req_per_sec': round(len(items) / duration, 1),
+            'errors': sum(1 for s in items if not s[3]),
+            'status_codes': dict(sorted(Counter(str(s[2]) for s in items).items())),
+            'latency_ms': {'p50': pick(latencies, 50), 'p95': pick(latencies, 95), 'p99': pick(latencies, 99)}
+        }
+    routes: Dict[str, list] = {}
+    for sample in samples:
+        routes.setdefault(sample[0], []).append(sample)
+    result = block(samples)
+    result['routes'] = {route: block(items) for route, items in sorted(routes.items())}
+    return result
+
+
+def run_scenario(make_user, steps, users, duration, seed):
+    samples: List[tuple] = []
+    stop_at = time.time() + duration
+    threads = [threading.Thread(target=run_user, args=(make_user(), n, steps, stop_at, seed + n, samples))
+               for n in range(users)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, time.time() - start)
+
+
+# --- modes -----------------------------------------------------------------------
+
+def serve(port, workdir, llm_latency, firebase_latency, ready):
+    """Child process: threaded werkzeug server around the faked app"""
+    from werkzeug.serving import make_server
+    application = prepare_app(workdir, llm_latency, firebase_latency)
+    server = make_server('127.0.0.1', port, application, threaded=True)
+    ready.set()
+    server.serve_forever()
+
+
+def free_port():
+    import socket
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run_client_mode(args, scenarios):
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        application = prepare_app(workdir, args.llm_latency, args.firebase_latency)
+        try:
+            return {name: run_scenario(lambda: TestClientUser(application), SCENARIOS[name],
+                                       args.client_users, args.duration, args.seed) for name in scenarios}
+        finally:
+            # Flush buffered LLM usage while the throwaway database still exists
+            from llm_usage import usage_tracker
+            usage_tracker.flush()
+            os.chdir(cwd)
+
+
+def run_http_mode(args, scenarios):
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for name in scenarios:
+        # Fresh server and database per scenario so scenarios don't skew each other
+        with tempfile.TemporaryDirectory() as workdir:
+            port, ready = free_port(), context.Event()
+            server = context.Process(target=serve, args=(port, workdir, args.llm_latency, args.firebase_latency, ready),
+                                     daemon=True)
+            server.start()
+            if not ready.wait(60):
+                raise SystemExit('HTTP server did not start')
+            try:
+                results[name] = run_scenario(lambda: HttpUser(port), SCENARIOS[name], args.http_users,
+                                             args.duration, args.seed)
+            finally:
+                server.terminate()
+                server.join(10)
+    return results
+
+
+# --- comparison ------------------------------------------------------------------
+
+def compare(current, baseline, threshold):
+    """Print throughput/p95 changes per mode and scenario; return the regressions found"""
+    regressions = []
+    print(f"\n{'mode/scenario':<36}{'req/s':>22}{'p95 ms':>24}")
+    for mode, scenarios in current['results'].items():
+        for name, result in scenarios.items():
+            old = baseline.get('results', {}).get(mode, {}).get(name)
+            if not old:
+                continue
+            rps_ratio = result['req_per_sec'] / old['req_per_sec'] if old['req_per_sec'] else 1.0
+            p95_new, p95_old = result['latency_ms']['p95'] or 0, old['latency_ms']['p95'] or 0
+            p95_ratio = p95_new / p95_old if p95_old else 1.0
+            flag = ''
+            if rps_ratio < 1 - threshold or p95_ratio > 1 + threshold:
+                flag = '  <-- regression'
+                regressions.append(f"{mode}/{name}")
+            print(f"{mode + '/' + name:<36}{old['req_per_sec']:>9} -> {result['req_per_sec']:<9}"
+                  f"{p95_old:>10} -> {p95_new:<10}{flag}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput and latency of every route under scenario mixes')
+    parser.add_argument('--mode', choices=['client', 'http', 'both'], default='both')
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per scenario and mode')
+    parser.add_argument('--client-users', type=int, default=1, help='virtual users in test-client mode')
+    parser.add_argument('--http-users', type=int, default=4, help='concurrent virtual users in HTTP mode')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='fake OpenAI latency in seconds')
+    parser.add_argument('--firebase-latency', type=float, default=0.0, help='fake Firebase latency in seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against a previous results file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative change counted as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    report = {
+        'git_commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+        'results': {}
+    }
+    if args.mode in ('client', 'both'):
+        report['results']['client'] = run_client_mode(args, args.scenarios)
+    if args.mode in ('http', 'both'):
+        report['results']['http'] = run_http_mode(args, args.scenarios)
+
+    for mode, scenarios in report['results'].items():
+        for name, result in scenarios.items():
+            print(f"{mode:<7}{name:<22}{result['req_per_sec']:>9} req/s  p50 {result['latency_ms']['p50']} ms  "
+                  f"p95 {result['latency_ms']['p95']} ms  p99 {result['latency_ms']['p99']} ms  errors {result['errors']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            raise SystemExit(f"Regressions: {', '.join(regressions)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+# In-process stand-ins for OpenAI, Firebase and MediaPipe Face Mesh used by the benchmarks
+import json
+import math
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from types import SimpleNamespace
+
+
+def _completion(content, model, prompt_tokens=120, completion_tokens=80):
+    return SimpleNamespace(
+        id=f"fake-{uuid.uuid4().hex[:12]}",
+        model=model,
+        choices=[SimpleNamespace(index=0, finish_reason='stop',
+                                 message=SimpleNamespace(role='assistant', content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                              total_tokens=prompt_tokens + completion_tokens)
+    )
+
+
+class FakeCompletions:
+    """Answers chat.completions.create() after a fixed latency with a plausible payload"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def create(self, model='gpt-3.5-turbo', messages=None, timeout=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = " ".join(str(m.get('content', '')) for m in (messages or [])).lower()
+        if kwargs.get('response_format') or 'recipe' in prompt and 'json' in prompt:
+            content = json.dumps({
+                'name': 'Benchmark Stir Fry',
+                'description': 'A quick stir fry',
+                'prep_time': '10 minutes',
+                'cook_time': '15 minutes',
+                'servings': 4,
+                'difficulty': 'Easy',
+                'ingredients': ['200g chicken', '1 bell pepper', '2 tbsp soy sauce'],
+                'instructions': ['Slice everything', 'Stir fry for 10 minutes', 'Serve'],
+                'nutrition': {'calories': 420, 'protein': '32g', 'carbs': '30g', 'fat': '14g'},
+                'tips': ['Use a hot pan']
+            })
+        elif 'grocery' in prompt:
+            content = json.dumps({'produce': ['Bell peppers'], 'protein': ['Chicken breast'], 'pantry': ['Soy sauce']})
+        elif 'summary' in prompt:
+            content = 'User wants quick high-protein dinners.'
+        else:
+            content = 'Try a balanced plate: half vegetables, a quarter protein, a quarter whole grains.'
+        return _completion(content, model)
+
+
+class FakeOpenAI:
+    """Minimal openai.OpenAI look-alike exposing chat.completions"""
+
+    def __init__(self, latency: float = 0.0):
+        self.chat = SimpleNamespace(completions=FakeCompletions(latency))
+
+
+class FakeFirebase:
+    """In-memory replacement for firebase_service.save_user_data/get_user_data"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.documents = []
+        self._lock = threading.Lock()
+
+    def save_user_data(self, health_data, meal_plan, recipe_suggestions):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            doc_id = f"doc-{len(self.documents) + 1}"
+            self.documents.append({
+                'id': doc_id,
+                'health_data': health_data,
+                'meal_plan': meal_plan,
+                'recipe_suggestions': recipe_suggestions,
+                'timestamp': datetime.now().isoformat()
+            })
+        return {"status": "success", "storage": "firebase", "id": doc_id}
+
+    def get_user_data(self):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            return list(self.documents[-10:])
+
+
+def install_fakes(app_module, llm_latency: float = 0.0, firebase_latency: float = 0.0, admission: bool = False):
+    """
+    Point the app at the fakes: OpenAI goes through the real ResilientClient and
+    usage instrumentation (only the network is replaced), Firebase is in memory.
+    """
+    import llm_client
+    from lazy_loader import reset_lazy
+    from llm_usage import instrument_client
+
+    llm_client._client = llm_client.ResilientClient(
+        instrument_client(FakeOpenAI(llm_latency)), llm_client.CircuitBreaker()
+    )
+    reset_lazy(app_module.openai_client)
+
+    firebase = FakeFirebase(firebase_latency)
+    app_module.save_user_data = firebase.save_user_data
+    app_module.get_user_data = firebase.get_user_data
+
+    app_module.admission.enabled = admission
+    return firebase
+
+
+class Landmark:
+    """Stand-in for a MediaPipe NormalizedLandmark"""
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x, y, z=0.0):
+        self.x, self.y, self.z = x, y, z
+
+
+class ScriptedFaceMesh:
+    """
+    Face Mesh look-alike that replays a script instead of looking at the image:
+    frame n has a face when faces[n] is true, and both eyes are shaped so the
+    detector measures exactly ears[n]. The 478-point mesh is built once and
+    only the 12 EAR points move, so process() is cheap; its own time is kept
+    in `busy` so benchmarks can subtract it.
+    """
+
+    MESH_POINTS = 478  # refine_landmarks=True
+    EYE_WIDTH = 0.08
+
+    def __init__(self, ears, faces=None, center=(0.5, 0.45)):
+        from drowsiness_metrics import LEFT_EYE, RIGHT_EYE
+        self.ears = ears
+        self.faces = faces
+        self.frame = 0
+        self.busy = 0.0
+        cx, cy = center
+        # Every point on an ellipse around the face so face-box tracking has sensible bounds
+        self.mesh = [Landmark(cx + 0.15 * math.cos(2 * math.pi * i / self.MESH_POINTS),
+                              cy + 0.2 * math.sin(2 * math.pi * i / self.MESH_POINTS))
+                     for i in range(self.MESH_POINTS)]
+        self._eyes = []
+        for eye, ex in ((LEFT_EYE, cx + 0.06), (RIGHT_EYE, cx - 0.06)):
+            points = [self.mesh[idx] for idx in eye[:6]]
+            self._eyes.append((points, ex, cy - 0.05))
+        self._result = SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=self.mesh)])
+        self._no_face = SimpleNamespace(multi_face_landmarks=None)
+
+    def _shape_eyes(self, ear):
+        half = self.EYE_WIDTH / 2
+        # p0/p3 corners, p1/p2 above and p5/p4 below: EAR = 2 * height / (2 * width)
+        opening = ear * self.EYE_WIDTH / 2
+        for (p0, p1, p2, p3, p4, p5), ex, ey in self._eyes:
+            p0.x, p0.y = ex - half, ey
+            p3.x, p3.y = ex + half, ey
+            p1.x, p1.y = ex - half / 2, ey - opening
+            p5.x, p5.y = ex - half / 2, ey + opening
+            p2.x, p2.y = ex + half / 2, ey - opening
+            p4.x, p4.y = ex + half / 2, ey + opening
+
+    def process(self, rgb_image):
+        started = time.perf_counter()
+        n = self.frame % len(self.ears)
+        self.frame += 1
+        if self.faces is not None and not self.faces[n]:
+            result = self._no_face
+        else:
+            self._shape_eyes(float(self.ears[n]))
+            result = self._result
+        self.busy += time.perf_counter() - started
+        return result
+
+    def close(self):
+        pass
+
+
+class SingleMeshPool:
+    """face_mesh_pool for SimpleDrowsinessDetector that always lends the same (scripted) model"""
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+
+    @contextmanager
+    def acquire(self, owner=None):
+        yield self.mesh
@@ -0,0 +1,83 @@
+# Background batch writer shared by the SQLite-backed recorders (LLM usage, drowsiness events)
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriter:
+    """
+    Buffers rows in memory and writes them to storage in batches (every
+    `flush_interval` seconds, or as soon as `max_buffer` rows are waiting), so
+    callers never block on the database. Subclasses name the storage method that
+    saves a batch and build the rows; rows stay buffered if a write fails.
+    """
+
+    save_method = ''         # DatabaseService method taking a list of rows
+    thread_name = 'buffered-writer-flush'
+    label = 'Buffered rows'  # used in log messages
+    fallback_windows = 20    # rows kept in memory (x max_buffer) when storage has no table for them
+
+    def __init__(self, flush_interval: float, max_buffer: int):
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.storage = None
+        self._buffer: List[Dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def attach_storage(self, storage):
+        """
+        Attach a DatabaseService and start the background flush thread. The storage
+        may be a lazy proxy; it is only touched when the first flush happens.
+        """
+        self.storage = storage
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._flush_loop, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def _append(self, row: Dict):
+        """Queue one row, flushing right away once the buffer is full"""
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.max_buffer
+        if full and self.storage is not None:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered rows to storage; rows stay buffered if the write fails"""
+        if self.storage is None or not self._buffer:
+            return 0
+        if not hasattr(self.storage, self.save_method):
+            # Fallback storage has no table for these rows; keep a bounded window in memory
+            with self._lock:
+                self._buffer = self._buffer[-self.max_buffer * self.fallback_windows:]
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                pending, self._buffer = self._buffer, []
+            if not pending:
+                return 0
+            result = getattr(self.storage, self.save_method)(pending)
+            if result.get('status') != 'success':
+                logger.error(f"{self.label} flush failed: {result.get('message')}")
+                with self._lock:
+                    self._buffer = pending + self._buffer
+                return 0
+            return len(pending)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"{self.label} flush error: {e}")
+
+    def stop(self):
+        """Stop the flush thread and write out whatever is still buffered"""
+        self._stop.set()
+        self.flush()
@@ -0,0 +1,229 @@
+# Server-side chat memory with token-budgeted context compaction
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def extractive_summary(previous: str, turns: List[Dict], max_tokens: int) -> str:
+    """Fold turns into the running summary by keeping the first sentence of each"""
+    lines = [previous] if previous else []
+    for turn in turns:
+        first_sentence = turn['content'].strip().split('\n')[0].split('. ')[0][:200]
+        lines.append(f"{turn['role']}: {first_sentence}")
+    summary = "\n".join(lines)
+    # Keep the newest part of the summary when it outgrows its budget
+    max_chars = max_tokens * 4
+    return summary[-max_chars:] if len(summary) > max_chars else summary
+
+
+class Conversation:
+    """Rolling summary plus recent verbatim turns for a single session"""
+
+    def __init__(self):
+        self.summary = ""
+        self.turns: List[Dict] = []
+        self.pending: List[Dict] = []  # turns evicted from `turns` and not yet folded into `summary`
+        self.summarizing = False
+        self.version = 0  # version of the stored copy this one was loaded from or saved as
+        self.last_active = time.monotonic()
+        self.lock = threading.Lock()
+
+    def token_count(self) -> int:
+        return estimate_tokens(self.summary) + sum(estimate_tokens(t['content']) for t in self.pending + self.turns)
+
+
+class ConversationStore:
+    """
+    In-memory conversations keyed by session id. Older turns are compacted into
+    a summary so the prompt stays under `token_budget`; idle or excess
+    conversations are evicted least-recently-used first.
+
+    With storage attached, every change is written through to the database and a
+    conversation is reloaded whenever the stored copy is newer, so a session's
+    requests can land on any server worker. Concurrent requests of one session on
+    different workers are not merged: the last one to finish wins.
+    """
+
+    def __init__(self, token_budget: int = 1500, summary_budget: int = 300,
+                 min_recent_turns: int = 4, max_conversations: int = 1000,
+                 idle_ttl: float = 3600, max_message_chars: int = 2000,
+                 summarizer: Optional[Callable[[str, List[Dict], int], str]] = None):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.min_recent_turns = min_recent_turns
+        self.max_conversations = max_conversations
+        self.idle_ttl = idle_ttl
+        self.max_message_chars = max_message_chars
+        self.summarizer = summarizer or extractive_summary
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._storage = None
+
+    def attach_storage(self, storage):
+        """Share conversations with other workers through `storage` (the database service)"""
+        self._storage = storage
+
+    def _get(self, session_id: str) -> Conversation:
+        conversation = self._get_local(session_id)
+        if self._storage is not None:
+            self._reload(session_id, conversation)
+        return conversation
+
+    def _reload(self, session_id: str, conversation: Conversation):
+        """Replace the local copy when another worker stored a newer one (or reset it)"""
+        try:
+            stored = self._storage.get_chat_conversation(session_id)
+        except Exception as e:
+            logger.error(f"⚠️ Chat conversation reload failed: {e}")
+            return
+        with conversation.lock:
+            if stored is None:
+                if conversation.version:
+                    conversation.summary, conversation.turns, conversation.pending = "", [], []
+                    conversation.version = 0
+            elif stored['version'] != conversation.version:
+                conversation.summary = stored['summary'] or ""
+                # Turns another worker had not folded into the summary yet are evicted again on the next exchange
+                conversation.turns = list(stored['turns'])
+                conversation.pending = []
+                conversation.version = stored['version']
+
+    def _save(self, session_id: str, conversation: Conversation):
+        """Write the conversation through to storage. Caller holds the conversation lock."""
+        if self._storage is None:
+            return
+        try:
+            result = self._storage.save_chat_conversation(
+                session_id, conversation.summary, conversation.pending + conversation.turns, self.idle_ttl
+            )
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        if result.get('status') == 'success':
+            conversation.version = result['version']
+        else:
+            logger.error(f"⚠️ Chat conversation save failed: {result.get('message')}")
+
+    def _get_local(self, session_id: str) -> Conversation:
+        with self._lock:
+            self._evict_idle()
+            conversation = self._conversations.get(session_id)
+            if conversation is None:
+                conversation = Conversation()
+                self._conversations[session_id] = conversation
+                while len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)
+            else:
+                self._conversations.move_to_end(session_id)
+            conversation.last_active = time.monotonic()
+            return conversation
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._conversations:
+            session_id, conversation = next(iter(self._conversations.items()))
+            if conversation.last_active >= cutoff:
+                break
+            del self._conversations[session_id]
+
+    def build_messages(self, session_id: str, system_prompt: str, user_message: str) -> List[Dict]:
+        """Assemble the prompt: system, summary of older turns, recent turns, new message"""
+        conversation = self._get(session_id)
+        with conversation.lock:
+            messages = [{"role": "system", "content": system_prompt}]
+            if conversation.summary:
+                messages.append({
+                    "role": "system",
+                    "content": f"Summary of the earlier conversation:\n{conversation.summary}"
+                })
+            # Turns being summarized right now are still sent verbatim
+            messages.extend(dict(turn) for turn in conversation.pending + conversation.turns)
+        messages.append({"role": "user", "content": user_message[:self.max_message_chars]})
+        return messages
+
+    def add_exchange(self, session_id: str, user_message: str, assistant_message: str):
+        """Store a completed exchange and compact older turns if over budget"""
+        conversation = self._get(session_id)
+        with conversation.lock:
+            conversation.turns.append({"role": "user", "content": user_message[:self.max_message_chars]})
+            conversation.turns.append({"role": "assistant", "content": assistant_message[:self.max_message_chars]})
+            self._evict(conversation)
+            self._save(session_id, conversation)
+            # One caller summarizes at a time; turns evicted meanwhile are picked up by its next round
+            if not conversation.pending or conversation.summarizing:
+                return
+            conversation.summarizing = True
+        self._compact(session_id, conversation)
+
+    def _evict(self, conversation: Conversation):
+        """Move the oldest turns to `pending` until the context fits the budget. Caller holds the lock."""
+        while len(conversation.turns) > self.min_recent_turns and conversation.token_count() > self.token_budget:
+            conversation.pending.append(conversation.turns.pop(0))
+
+    def _compact(self, session_id: str, conversation: Conversation):
+        """Fold pending turns into the summary; the summarizer (possibly an LLM call) runs without the lock"""
+        try:
+            while True:
+                with conversation.lock:
+                    previous, evicted = conversation.summary, list(conversation.pending)
+                    if not evicted:
+                        return
+                try:
+                    summary = self.summarizer(previous, evicted, self.summary_budget)
+                except Exception:
+                    summary = extractive_summary(previous, evicted, self.summary_budget)
+                with conversation.lock:
+                    conversation.summary = summary[-self.summary_budget * 4:]
+                    del conversation.pending[:len(evicted)]
+                    self._save(session_id, conversation)
+        finally:
+            with conversation.lock:
+                conversation.summarizing = False
+
+    def clear(self, session_id: str):
+        """Forget a session's conversation"""
+        with self._lock:
+            self._conversations.pop(session_id, None)
+        if self._storage is not None:
+            self._storage.delete_chat_conversation(session_id)
+
+    def describe(self, session_id: str) -> Dict:
+        """Return size information about a session's conversation"""
+        with self._lock:
+            conversation = self._conversations.get(session_id)
+        if conversation is None:
+            return {"turns": 0, "summarized": False, "context_tokens": 0}
+        with conversation.lock:
+            return {
+                "turns": len(conversation.turns),
+                "summarized": bool(conversation.summary),
+                "context_tokens": conversation.token_count()
+            }
+
+    def get_stats(self) -> Dict:
+        """Get store-wide statistics"""
+        with self._lock:
+            self._evict_idle()
+            return {
+                "conversations": len(self._conversations),
+                "max_conversations": self.max_conversations,
+                "token_budget": self.token_budget
+            }
+
+
+# Global conversation store instance
+conversation_store = ConversationStore(
+    token_budget=int(os.getenv('CHAT_CONTEXT_TOKEN_BUDGET', 1500)),
+    summary_budget=int(os.getenv('CHAT_SUMMARY_TOKEN_BUDGET', 300)),
+    max_conversations=int(os.getenv('CHAT_MAX_CONVERSATIONS', 1000)),
+    idle_ttl=float(os.getenv('CHAT_IDLE_TTL_SECONDS', 3600))
+)
@@ -1,10 +1,28 @@
 # Enhanced Database Service with multiple database support
 import sqlite3
 import json
+import logging
 import os
+import re
+import time
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
+from metrics import db_errors_total, instrument_methods
+
+logger = logging.getLogger(__name__)
+
+
+def _query_failed(method: str, message: str):
+    """
+    Log an error a query method caught and count it in db_errors_total. Only for
+    methods that answer with a fallback (JSON storage, None, []) rather than a
+    {'status': 'error'} result, which instrument_methods counts by itself.
+    """
+    db_errors_total.inc(method)
+    logger.error(message)
+
+
 class DatabaseService:
     def __init__(self, db_path: str = "data/smart_grocery.db"):
         """Initialize database service with SQLite as primary and JSON as fallback"""
@@ -52,6 +70,8 @@ class DatabaseService:
                     )
                 ''')
                 
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_meal_plans_user ON meal_plans (user_id, created_at)')
+                
                 # Create recipes table
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS recipes (
@@ -68,6 +88,10 @@ class DatabaseService:
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 ''')
+                self._ensure_columns(cursor, 'recipes', {
+                    'request_signature': 'TEXT',  # JSON string
+                    'recipe_data': 'TEXT'  # JSON string
+                })
                 
                 # Create grocery_lists table
                 cursor.execute('''
@@ -100,13 +124,90 @@ class DatabaseService:
                     )
                 ''')
                 
+                # Create llm_usage table (per-call OpenAI token/cost accounting)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS llm_usage (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        call_site TEXT,
+                        pipeline TEXT,
+                        model TEXT,
+                        prompt_tokens INTEGER,
+                        completion_tokens INTEGER,
+                        latency_ms REAL,
+                        cost_usd REAL,
+                        outcome TEXT,
+                        created_at TIMESTAMP
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_usage_created ON llm_usage (created_at)')
+                
+                # Create jobs table (background meal plan generation, survives restarts)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        id TEXT PRIMARY KEY,
+                        kind TEXT,
+                        user_id INTEGER,
+                        status TEXT,
+                        stage TEXT,
+                        progress TEXT,  -- JSON string
+                        payload TEXT,  -- JSON string
+                        result TEXT,  -- JSON string
+                        error TEXT,
+                        attempts INTEGER DEFAULT 0,
+                        worker TEXT,
+                        created_at TIMESTAMP,
+                        updated_at REAL
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, updated_at)')
+                
+                # Create drowsiness_events table (sleep alerts from detection sessions)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS drowsiness_events (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        session_id TEXT,
+                        user_id INTEGER,
+                        source TEXT,
+                        event_type TEXT,
+                        started_at TIMESTAMP,
+                        ended_at TIMESTAMP,
+                        alert_s REAL,
+                        eyes_closed_s REAL,
+                        min_ear REAL,
+                        perclos REAL,
+                        blink_rate_per_min REAL
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_drowsiness_events_user ON drowsiness_events (user_id, started_at)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_drowsiness_events_session ON drowsiness_events (session_id, started_at)')
+                
+                # Create chat_conversations table (chat memory shared by all server workers)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS chat_conversations (
+                        session_id TEXT PRIMARY KEY,
+                        summary TEXT,
+                        turns TEXT,  -- JSON string
+                        version INTEGER,
+                        updated_at REAL
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_conversations_updated ON chat_conversations (updated_at)')
+                
                 conn.commit()
-                print("✅ SQLite database initialized successfully")
-                print(f"📁 Database location: {self.db_path}")
+                logger.info("✅ SQLite database initialized successfully")
+                logger.info(f"📁 Database location: {self.db_path}")
                 
         except Exception as e:
-            print(f"❌ SQLite initialization failed: {e}")
-            print("📝 Falling back to JSON storage")
+            logger.error(f"❌ SQLite initialization failed: {e}")
+            logger.warning("📝 Falling back to JSON storage")
+    
+    def _ensure_columns(self, cursor, table: str, columns: Dict[str, str]):
+        """Add columns introduced after a table was first created"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        for name, column_type in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
     
     def save_user_profile(self, user_data: Dict) -> Dict:
         """Save or update user profile"""
@@ -159,7 +260,7 @@ class DatabaseService:
                 return {"status": "success", "user_id": user_id, "storage": "sqlite"}
                 
         except Exception as e:
-            print(f"SQLite save failed: {e}")
+            _query_failed('save_user_profile', f"SQLite save failed: {e}")
             return self._save_to_json(user_data)
     
     def save_meal_plan(self, user_id: int, meal_plan_data: Dict) -> Dict:
@@ -185,7 +286,7 @@ class DatabaseService:
                 return {"status": "success", "plan_id": plan_id, "storage": "sqlite"}
                 
         except Exception as e:
-            print(f"SQLite meal plan save failed: {e}")
+            _query_failed('save_meal_plan', f"SQLite meal plan save failed: {e}")
             return self._save_to_json(meal_plan_data)
     
     def get_user_profile(self, email: str) -> Optional[Dict]:
@@ -208,7 +309,7 @@ class DatabaseService:
                 return None
                 
         except Exception as e:
-            print(f"SQLite user retrieval failed: {e}")
+            _query_failed('get_user_profile', f"SQLite user retrieval failed: {e}")
             return self._get_from_json()
     
     def get_meal_plans(self, user_id: int) -> List[Dict]:
@@ -235,9 +336,35 @@ class DatabaseService:
                 return result
                 
         except Exception as e:
-            print(f"SQLite meal plans retrieval failed: {e}")
+            _query_failed('get_meal_plans', f"SQLite meal plans retrieval failed: {e}")
             return self._get_from_json()
     
+    def get_meal_plans_version(self, user_id: int) -> Optional[str]:
+        """Cheap version stamp of a user's meal plans (changes whenever one is added or removed)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*), MAX(id) FROM meal_plans WHERE user_id = ?", (user_id,))
+                count, max_id = cursor.fetchone()
+                return f"{count}:{max_id}"
+                
+        except Exception as e:
+            _query_failed('get_meal_plans_version', f"SQLite meal plans version lookup failed: {e}")
+            return None
+    
+    def get_user_profile_version(self, email: str) -> Optional[str]:
+        """Version stamp of a user profile (row id and last update time)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, updated_at FROM users WHERE email = ?", (email,))
+                row = cursor.fetchone()
+                return f"{row[0]}:{row[1]}" if row else None
+                
+        except Exception as e:
+            _query_failed('get_user_profile_version', f"SQLite user version lookup failed: {e}")
+            return None
+    
     def save_health_tracking(self, user_id: int, health_data: Dict) -> Dict:
         """Save daily health tracking data"""
         try:
@@ -292,9 +419,294 @@ class DatabaseService:
                 return {"status": "success", "storage": "sqlite"}
                 
         except Exception as e:
-            print(f"SQLite health tracking save failed: {e}")
+            _query_failed('save_health_tracking', f"SQLite health tracking save failed: {e}")
             return self._save_to_json(health_data)
     
+    def save_recipe(self, recipe: Dict, request_signature: Dict) -> Dict:
+        """Save a generated recipe together with the request it answered"""
+        try:
+            prep_minutes = re.search(r'\d+', str(recipe.get('prep_time', '')))
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO recipes 
+                    (name, ingredients, instructions, calories_per_serving, prep_time, 
+                     cuisine_type, dietary_tags, request_signature, recipe_data)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    recipe.get('name', ''),
+                    json.dumps(recipe.get('ingredients', [])),
+                    json.dumps(recipe.get('instructions', [])),
+                    recipe.get('calories'),
+                    int(prep_minutes.group(0)) if prep_minutes else None,
+                    request_signature.get('cuisine', ''),
+                    json.dumps(request_signature.get('diet', [])),
+                    json.dumps(request_signature),
+                    json.dumps(recipe)
+                ))
+                
+                recipe_id = cursor.lastrowid
+                conn.commit()
+                return {"status": "success", "recipe_id": recipe_id, "storage": "sqlite"}
+                
+        except Exception as e:
+            logger.error(f"SQLite recipe save failed: {e}")
+            return {"status": "error", "message": str(e)}
+    
+    def get_indexed_recipes(self, after_id: int = 0) -> List[tuple]:
+        """Get (id, request_signature, recipe) for every recipe saved with a signature, newer than `after_id`"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT id, request_signature, recipe_data FROM recipes
+                    WHERE id > ? AND request_signature IS NOT NULL AND recipe_data IS NOT NULL
+                    ORDER BY id
+                ''', (after_id,))
+                
+                return [(row[0], json.loads(row[1]), json.loads(row[2])) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            _query_failed('get_indexed_recipes', f"SQLite recipe retrieval failed: {e}")
+            return []
+    
+    def save_llm_usage(self, records: List[Dict]) -> Dict:
+        """Bulk insert OpenAI usage records"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.executemany('''
+                    INSERT INTO llm_usage 
+                    (call_site, pipeline, model, prompt_tokens, completion_tokens, 
+                     latency_ms, cost_usd, outcome, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [
+                    (r['call_site'], r['pipeline'], r['model'], r['prompt_tokens'], r['completion_tokens'],
+                     r['latency_ms'], r['cost_usd'], r['outcome'], r['created_at'])
+                    for r in records
+                ])
+                conn.commit()
+                return {"status": "success", "count": len(records), "storage": "sqlite"}
+                
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    
+    def get_llm_usage(self, since: str) -> List[Dict]:
+        """Get OpenAI usage records created at or after `since` (ISO timestamp)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT call_site, pipeline, model, prompt_tokens, completion_tokens,
+                           latency_ms, cost_usd, outcome, created_at
+                    FROM llm_usage WHERE created_at >= ?
+                    ORDER BY created_at
+                ''', (since,))
+                
+                return [dict(row) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            _query_failed('get_llm_usage', f"SQLite LLM usage retrieval failed: {e}")
+            return []
+    
+    def save_job(self, job: Dict) -> Dict:
+        """Insert a new background job"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('''
+                    INSERT INTO jobs 
+                    (id, kind, user_id, status, stage, progress, payload, result, error,
+                     attempts, worker, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    job['id'], job['kind'], job.get('user_id'), job['status'], job.get('stage'),
+                    json.dumps(job.get('progress', [])), json.dumps(job.get('payload', {})),
+                    json.dumps(job.get('result')), job.get('error'), job.get('attempts', 0),
+                    job.get('worker'), job['created_at'], job['updated_at']
+                ))
+                conn.commit()
+                return {"status": "success", "job_id": job['id'], "storage": "sqlite"}
+                
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    
+    def claim_job(self, job_id: str, worker: str, claimable_before: float, now: float) -> bool:
+        """
+        Atomically mark a job running for `worker`. Queued jobs can always be claimed;
+        running jobs only when their last update is older than `claimable_before`
+        (their worker died).
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.execute('''
+                    UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, updated_at = ?
+                    WHERE id = ? AND (status = 'queued' OR (status = 'running' AND updated_at < ?))
+                ''', (worker, now, job_id, claimable_before))
+                conn.commit()
+                return cursor.rowcount == 1
+                
+        except Exception as e:
+            _query_failed('claim_job', f"SQLite job claim failed: {e}")
+            return False
+    
+    def update_job(self, job_id: str, fields: Dict) -> Dict:
+        """Update job status, stage, progress, result or error"""
+        allowed = ['status', 'stage', 'progress', 'result', 'error', 'updated_at']
+        updates = {k: (json.dumps(v) if k in ('progress', 'result') else v) for k, v in fields.items() if k in allowed}
+        if not updates:
+            return {"status": "success"}
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute(
+                    f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in updates)} WHERE id = ?",
+                    list(updates.values()) + [job_id]
+                )
+                conn.commit()
+                return {"status": "success"}
+                
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Get a background job by id"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                job = dict(row)
+                for field in ('progress', 'payload', 'result'):
+                    job[field] = json.loads(job[field]) if job[field] else None
+                return job
+                
+        except Exception as e:
+            _query_failed('get_job', f"SQLite job retrieval failed: {e}")
+            return None
+    
+    def get_chat_conversation(self, session_id: str) -> Optional[Dict]:
+        """Get a stored chat conversation (summary, turns, version) by session id"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute('SELECT summary, turns, version, updated_at FROM chat_conversations WHERE session_id = ?',
+                               (session_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                conversation = dict(row)
+                conversation['turns'] = json.loads(conversation['turns']) if conversation['turns'] else []
+                return conversation
+                
+        except Exception as e:
+            _query_failed('get_chat_conversation', f"SQLite chat conversation retrieval failed: {e}")
+            return None
+    
+    def save_chat_conversation(self, session_id: str, summary: str, turns: List[Dict], idle_ttl: float) -> Dict:
+        """Store a chat conversation, bumping its version, and drop conversations idle longer than `idle_ttl`"""
+        try:
+            now = time.time()
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('''
+                    INSERT INTO chat_conversations (session_id, summary, turns, version, updated_at)
+                    VALUES (?, ?, ?, 1, ?)
+                    ON CONFLICT(session_id) DO UPDATE SET
+                        summary = excluded.summary, turns = excluded.turns,
+                        version = chat_conversations.version + 1, updated_at = excluded.updated_at
+                ''', (session_id, summary, json.dumps(turns), now))
+                version = conn.execute('SELECT version FROM chat_conversations WHERE session_id = ?',
+                                       (session_id,)).fetchone()[0]
+                conn.execute('DELETE FROM chat_conversations WHERE updated_at < ?', (now - idle_ttl,))
+                conn.commit()
+                return {"status": "success", "version": version, "storage": "sqlite"}
+                
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    
+    def delete_chat_conversation(self, session_id: str) -> Dict:
+        """Delete a stored chat conversation"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('DELETE FROM chat_conversations WHERE session_id = ?', (session_id,))
+                conn.commit()
+                return {"status": "success", "storage": "sqlite"}
+                
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    
+    def get_recoverable_jobs(self, stale_before: float) -> List[str]:
+        """Ids of queued jobs and of running jobs whose worker stopped updating them"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id FROM jobs
+                    WHERE status = 'queued' OR (status = 'running' AND updated_at < ?)
+                    ORDER BY created_at
+                ''', (stale_before,))
+                return [row[0] for row in cursor.fetchall()]
+                
+        except Exception as e:
+            _query_failed('get_recoverable_jobs', f"SQLite job recovery scan failed: {e}")
+            return []
+    
+    def save_drowsiness_events(self, events: List[Dict]) -> Dict:
+        """Bulk insert drowsiness alert events"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.executemany('''
+                    INSERT INTO drowsiness_events 
+                    (session_id, user_id, source, event_type, started_at, ended_at, 
+                     alert_s, eyes_closed_s, min_ear, perclos, blink_rate_per_min)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [
+                    (e['session_id'], e['user_id'], e['source'], e['event_type'], e['started_at'], e['ended_at'],
+                     e['alert_s'], e['eyes_closed_s'], e['min_ear'], e['perclos'], e['blink_rate_per_min'])
+                    for e in events
+                ])
+                conn.commit()
+                return {"status": "success", "count": len(events), "storage": "sqlite"}
+                
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    
+    def get_drowsiness_events(self, user_id: int, session_id: Optional[str] = None,
+                              since: Optional[str] = None, limit: int = 500) -> List[Dict]:
+        """One user's drowsiness events, newest first, optionally for one session / since a start time"""
+        if user_id is None:
+            raise ValueError("get_drowsiness_events() needs a user_id")
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                
+                conditions, params = ['user_id = ?'], [user_id]
+                if session_id is not None:
+                    conditions.append('session_id = ?')
+                    params.append(session_id)
+                if since is not None:
+                    conditions.append('started_at >= ?')
+                    params.append(since)
+                where = f"WHERE {' AND '.join(conditions)}"
+                cursor.execute(f'''
+                    SELECT session_id, user_id, source, event_type, started_at, ended_at,
+                           alert_s, eyes_closed_s, min_ear, perclos, blink_rate_per_min
+                    FROM drowsiness_events {where}
+                    ORDER BY started_at DESC LIMIT ?
+                ''', params + [limit])
+                
+                return [dict(row) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            _query_failed('get_drowsiness_events', f"SQLite drowsiness event retrieval failed: {e}")
+            return []
+    
     def _save_to_json(self, data: Dict) -> Dict:
         """Fallback JSON storage"""
         try:
@@ -326,7 +738,7 @@ class DatabaseService:
                     return json.load(f)
             return []
         except Exception as e:
-            print(f"JSON retrieval failed: {e}")
+            logger.error(f"JSON retrieval failed: {e}")
             return []
     
     def get_database_stats(self) -> Dict:
@@ -336,7 +748,8 @@ class DatabaseService:
                 cursor = conn.cursor()
                 
                 stats = {}
-                tables = ['users', 'meal_plans', 'recipes', 'grocery_lists', 'health_tracking']
+                tables = ['users', 'meal_plans', 'recipes', 'grocery_lists', 'health_tracking', 'llm_usage', 'jobs',
+                          'drowsiness_events', 'chat_conversations']
                 
                 for table in tables:
                     cursor.execute(f"SELECT COUNT(*) FROM {table}")
@@ -351,5 +764,8 @@ class DatabaseService:
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
+# Time every public query method for /metrics
+instrument_methods(DatabaseService)
+
 # Global database instance
 db_service = DatabaseService()
@@ -0,0 +1,159 @@
+# Adaptive Face Mesh scheduling: downsampling, face ROI tracking and motion-triggered re-runs
+import os
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from drowsiness_metrics import LandmarkBuffer
+
+# MediaPipe Face Mesh face oval, used to track the face bounding box
+FACE_OVAL = [10, 338, 297, 332, 284, 251, 389, 356, 454, 323, 361, 288, 397, 365, 379, 378, 400, 377,
+             152, 148, 176, 149, 150, 136, 172, 58, 132, 93, 234, 127, 162, 21, 54, 103, 67, 109]
+
+# Input scale for Face Mesh (1.0 = full resolution)
+DROWSINESS_SCALE = float(os.getenv('DROWSINESS_SCALE', 0.5))
+# Run the full mesh at least every N frames
+DROWSINESS_FULL_EVERY = int(os.getenv('DROWSINESS_FULL_EVERY', 3))
+# Mean gray-level change (0-255) in the face or eye region that forces a mesh run
+DROWSINESS_MOTION_THRESHOLD = float(os.getenv('DROWSINESS_MOTION_THRESHOLD', 6.0))
+# Extra space around the tracked face box, as a fraction of its size
+DROWSINESS_ROI_MARGIN = float(os.getenv('DROWSINESS_ROI_MARGIN', 0.3))
+
+# Thumbnail stride for the motion check (every 8th pixel: ~80x60 for 640x480)
+THUMB_STEP = 8
+
+
+def thumbnail(frame: np.ndarray, step: int = THUMB_STEP) -> np.ndarray:
+    """Small grayscale copy of a BGR frame taken by striding (no resize or color conversion)"""
+    return frame[::step, ::step].mean(axis=2, dtype=np.float32)
+
+
+def region_motion(current: np.ndarray, reference: np.ndarray, box: Optional[Tuple[float, float, float, float]]) -> float:
+    """Mean absolute gray-level difference inside a normalized box of two thumbnails"""
+    height, width = current.shape
+    if box is None:
+        y0, y1, x0, x1 = 0, height, 0, width
+    else:
+        x0, y0 = int(box[0] * width), int(box[1] * height)
+        x1, y1 = int(np.ceil(box[2] * width)), int(np.ceil(box[3] * height))
+    a = current[max(y0, 0):max(y1, y0 + 1), max(x0, 0):max(x1, x0 + 1)]
+    b = reference[max(y0, 0):max(y1, y0 + 1), max(x0, 0):max(x1, x0 + 1)]
+    return float(np.abs(a - b).mean()) if a.size else 0.0
+
+
+def _expand(box, margin: float):
+    x0, y0, x1, y1 = box
+    dx, dy = (x1 - x0) * margin, (y1 - y0) * margin
+    return max(x0 - dx, 0.0), max(y0 - dy, 0.0), min(x1 + dx, 1.0), min(y1 + dy, 1.0)
+
+
+class FaceTracker:
+    """Face and eye bounding boxes (normalized) from the last successful mesh run"""
+
+    def __init__(self, margin: float = DROWSINESS_ROI_MARGIN):
+        self.margin = margin
+        self.face = LandmarkBuffer(FACE_OVAL)
+        self.face_box = None
+        self.eye_box = None
+
+    def update(self, landmarks, crop, eyes: LandmarkBuffer) -> bool:
+        """Track the face from `landmarks` (normalized to `crop`); False if the mesh is incomplete"""
+        if not self.face.fill(landmarks):
+            self.lose()
+            return False
+        if crop is not None:
+            self.face.remap(*crop)
+        self.face_box = _expand(self.face.bounds(), self.margin)
+        self.eye_box = _expand(eyes.bounds(), 0.5) if eyes.valid else None
+        return True
+
+    def lose(self):
+        self.face_box = None
+        self.eye_box = None
+
+    def roi(self, width: int, height: int) -> Optional[Tuple[int, int, int, int]]:
+        """Pixel crop (x0, y0, x1, y1) around the tracked face, or None when not tracking"""
+        if self.face_box is None:
+            return None
+        x0, y0, x1, y1 = self.face_box
+        return int(x0 * width), int(y0 * height), int(np.ceil(x1 * width)), int(np.ceil(y1 * height))
+
+
+class AdaptiveMesh:
+    """
+    Decides per frame whether Face Mesh must run. The mesh runs when there is
+    no tracked face, every `full_every` frames, or when the face or eye region
+    changed by more than `motion_threshold` since the last run. Frames in
+    between get an EAR extrapolated from the last two mesh results.
+    """
+
+    def __init__(self, scale: float = DROWSINESS_SCALE, full_every: int = DROWSINESS_FULL_EVERY,
+                 motion_threshold: float = DROWSINESS_MOTION_THRESHOLD, margin: float = DROWSINESS_ROI_MARGIN):
+        self.scale = min(max(scale, 0.1), 1.0)
+        self.full_every = max(full_every, 1)
+        self.motion_threshold = motion_threshold
+        self.tracker = FaceTracker(margin)
+        self._samples = deque(maxlen=2)  # (frame_no, ear) of recent mesh runs
+        self.reset()
+        self.stats = {'frames': 0, 'mesh_runs': 0, 'roi_runs': 0, 'interval_runs': 0,
+                      'motion_runs': 0, 'untracked_runs': 0, 'track_lost': 0}
+
+    def reset(self):
+        """Forget the tracked face and EAR history (e.g. when the video source changes)"""
+        self.tracker.lose()
+        self.reference = None
+        self.frame_no = 0
+        self._last_run = 0
+        self._samples.clear()
+        self.last_eye_pixels = []
+
+    def should_run(self, thumb: np.ndarray) -> bool:
+        self.frame_no += 1
+        self.stats['frames'] += 1
+        if self.tracker.face_box is None or self.reference is None or self.reference.shape != thumb.shape:
+            reason = 'untracked_runs'
+        elif self.frame_no - self._last_run >= self.full_every:
+            reason = 'interval_runs'
+        elif max(region_motion(thumb, self.reference, self.tracker.face_box),
+                 region_motion(thumb, self.reference, self.tracker.eye_box)) > self.motion_threshold:
+            reason = 'motion_runs'
+        else:
+            return False
+        self.stats[reason] += 1
+        return True
+
+    def mesh_ran(self, thumb: np.ndarray, ear: Optional[float], used_roi: bool):
+        """Record a mesh run (ear=None when no face was found)"""
+        self.stats['mesh_runs'] += 1
+        if used_roi:
+            self.stats['roi_runs'] += 1
+        self.reference = thumb
+        self._last_run = self.frame_no
+        if ear is None:
+            self._samples.clear()
+            self.last_eye_pixels = []
+        else:
+            self._samples.append((self.frame_no, ear))
+
+    def track_lost(self):
+        self.stats['track_lost'] += 1
+        self.tracker.lose()
+
+    def estimate_ear(self) -> float:
+        """EAR for a skipped frame: linear trend of the last two mesh runs, kept within their range"""
+        if not self._samples:
+            return 0.0
+        frame_b, ear_b = self._samples[-1]
+        if len(self._samples) < 2:
+            return ear_b
+        frame_a, ear_a = self._samples[0]
+        slope = (ear_b - ear_a) / (frame_b - frame_a)
+        estimate = ear_b + slope * (self.frame_no - frame_b)
+        return float(min(max(estimate, 0.0), max(ear_a, ear_b)))
+
+    def get_stats(self) -> Dict:
+        frames = self.stats['frames']
+        return dict(self.stats,
+                    mesh_run_ratio=round(self.stats['mesh_runs'] / frames, 3) if frames else 0.0,
+                    scale=self.scale, full_every=self.full_every, motion_threshold=self.motion_threshold)
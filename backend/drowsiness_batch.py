@@ -0,0 +1,259 @@
+# Headless batch analysis of recorded videos, sharded across a process pool
+# Usage (from backend/): python drowsiness_batch.py shift1.mp4 shift2.mp4 --workers 4 --output-dir data/drowsiness
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from drowsiness_metrics import EYE_AR_CONSEC_FRAMES, EYE_AR_THRESH, closed_frames
+
+# Frames per shard; long videos are split so one recording can use every core
+DROWSINESS_CHUNK_FRAMES = int(os.getenv('DROWSINESS_CHUNK_FRAMES', 1800))
+
+# One detector (and so one Face Mesh model) per worker process
+_detector = None
+
+
+def _init_worker(adaptive: bool):
+    global _detector
+    from simple_drowsiness_detector import SimpleDrowsinessDetector
+    _detector = SimpleDrowsinessDetector(adaptive=adaptive, sound=False)
+
+
+def _analyze_shard(task: Tuple[str, int, int]) -> Dict:
+    """EAR and face presence for frames [start, end) of one video (alert state is rebuilt by the parent)"""
+    import cv2
+    path, start, end = task
+    if _detector.adaptive is not None:
+        _detector.adaptive.reset()  # tracking must not carry over from another shard
+    capture = cv2.VideoCapture(path)
+    if start:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+    ears, faces = [], []
+    started, cpu_started = time.perf_counter(), time.process_time()
+    try:
+        while start + len(ears) < end:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            result = _detector.analyze_frame(frame)
+            ears.append(float(result['ear']))
+            faces.append(result['status'] != "No face detected")
+    finally:
+        capture.release()
+    return {
+        'path': path,
+        'start': start,
+        'ears': ears,
+        'faces': faces,
+        'wall_s': time.perf_counter() - started,
+        'cpu_s': time.process_time() - cpu_started,
+        'pid': os.getpid()
+    }
+
+
+def probe(path: str) -> Tuple[int, float]:
+    """(frame count, fps) of a video; frame count is 0 when the container does not say"""
+    import cv2
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    fps = float(capture.get(cv2.CAP_PROP_FPS) or 0) or 30.0
+    capture.release()
+    return frames, fps
+
+
+def shard_tasks(path: str, frames: int, chunk_frames: int) -> List[Tuple[str, int, int]]:
+    """Frame ranges for one video (a single open-ended shard when the frame count is unknown)"""
+    if frames <= 0:
+        return [(path, 0, sys.maxsize)]
+    return [(path, start, min(start + chunk_frames, frames)) for start in range(0, frames, chunk_frames)]
+
+
+def alert_events(ears: np.ndarray, faces: np.ndarray, fps: float, threshold: float = EYE_AR_THRESH,
+                 consec_frames: Optional[int] = None) -> Tuple[np.ndarray, List[Dict]]:
+    """
+    Replay the detector's alert rule over a whole recording: an alert starts
+    once the eyes have been closed for `consec_frames` analyzed frames (by
+    default EYE_AR_CLOSED_S at the recording's fps) and
+    ends on the first open-eye frame (frames without a face do not count either
+    way). Returns the per-frame alert flags and the alert events.
+    """
+    consec_frames = consec_frames or closed_frames(fps)
+    alerts = np.zeros(len(ears), dtype=bool)
+    events = []
+    counter = 0
+    closed_since = 0
+    current = None
+    for n in range(len(ears)):
+        if not faces[n]:
+            alerts[n] = current is not None
+            continue
+        if ears[n] < threshold:
+            if counter == 0:
+                closed_since = n
+            counter += 1
+            if counter >= consec_frames:
+                alerts[n] = True
+                if current is None:
+                    current = {'start_frame': n, 'closed_since_frame': closed_since}
+        else:
+            counter = 0
+            if current is not None:
+                events.append(_close_event(current, n, ears, faces, fps))
+                current = None
+    if current is not None:
+        events.append(_close_event(current, len(ears), ears, faces, fps))
+    return alerts, events
+
+
+def _close_event(event: Dict, end: int, ears: np.ndarray, faces: np.ndarray, fps: float) -> Dict:
+    start = event['start_frame']
+    # Frames without a face record EAR 0; they must not become the event's minimum
+    seen = ears[start:end][faces[start:end].astype(bool)]
+    return dict(event,
+                end_frame=end,
+                start_s=round(start / fps, 3),
+                end_s=round(end / fps, 3),
+                duration_s=round((end - event['closed_since_frame']) / fps, 3),
+                min_ear=round(float(seen.min()), 4) if seen.size else None)
+
+
+def blink_count(closed: np.ndarray, consec_frames: int = EYE_AR_CONSEC_FRAMES) -> int:
+    """Closed-eye runs shorter than an alert"""
+    edges = np.diff(np.concatenate(([0], closed.astype(np.int8), [0])))
+    runs = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    return int(((runs > 0) & (runs < consec_frames)).sum())
+
+
+def summarize(path: str, fps: float, ears: np.ndarray, faces: np.ndarray, alerts: np.ndarray,
+              events: List[Dict], threshold: float = EYE_AR_THRESH) -> Dict:
+    """Summary statistics for one recording"""
+    frames = len(ears)
+    with_face = ears[faces]
+    closed = faces & (ears < threshold)
+    return {
+        'video': path,
+        'frames': frames,
+        'fps': fps,
+        'duration_s': round(frames / fps, 2),
+        'face_detected_ratio': round(float(faces.mean()), 4) if frames else 0.0,
+        'mean_ear': round(float(with_face.mean()), 4) if with_face.size else None,
+        'p5_ear': round(float(np.percentile(with_face, 5)), 4) if with_face.size else None,
+        'eyes_closed_ratio': round(float(closed.sum() / max(faces.sum(), 1)), 4),
+        'blinks': blink_count(closed, closed_frames(fps)),
+        'alerts': len(events),
+        'alert_seconds': round(float(alerts.sum() / fps), 2)
+    }
+
+
+def write_outputs(output_dir: str, path: str, fps: float, ears, faces, alerts, events, fmt: str) -> Dict:
+    """Per-frame rows and alert events for one video as CSV or JSON; returns the file paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0])
+    rows = ({'frame': n, 'time_s': round(n / fps, 3), 'ear': round(float(ears[n]), 4),
+             'face': bool(faces[n]), 'alert': bool(alerts[n])} for n in range(len(ears)))
+    if fmt == 'json':
+        frames_path, events_path = f"{stem}.frames.json", f"{stem}.events.json"
+        with open(frames_path, 'w') as f:
+            json.dump(list(rows), f)
+        with open(events_path, 'w') as f:
+            json.dump(events, f, indent=2)
+    else:
+        frames_path, events_path = f"{stem}.frames.csv", f"{stem}.events.csv"
+        with open(frames_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['frame', 'time_s', 'ear', 'face', 'alert'])
+            writer.writeheader()
+            writer.writerows(rows)
+        with open(events_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['start_frame', 'end_frame', 'closed_since_frame', 'start_s',
+                                                   'end_s', 'duration_s', 'min_ear'])
+            writer.writeheader()
+            writer.writerows(events)
+    return {'frames': frames_path, 'events': events_path}
+
+
+def analyze_videos(paths: List[str], workers: Optional[int] = None, chunk_frames: int = DROWSINESS_CHUNK_FRAMES,
+                   adaptive: bool = False, output_dir: Optional[str] = None, fmt: str = 'csv') -> Dict:
+    """Analyze recordings in parallel; per-video summaries, events and throughput"""
+    workers = workers or os.cpu_count() or 1
+    videos = {}
+    tasks = []
+    for path in paths:
+        frames, fps = probe(path)
+        videos[path] = {'fps': fps, 'shards': []}
+        tasks.extend(shard_tasks(path, frames, chunk_frames))
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(adaptive,)) as pool:
+        # Largest shards first keeps the pool busy until the end
+        for shard in pool.map(_analyze_shard, sorted(tasks, key=lambda t: t[2] - t[1], reverse=True)):
+            videos[shard['path']]['shards'].append(shard)
+    wall = time.perf_counter() - started
+
+    results = []
+    for path, video in videos.items():
+        shards = sorted(video['shards'], key=lambda s: s['start'])
+        ears = np.array([ear for s in shards for ear in s['ears']], dtype=np.float64)
+        faces = np.array([face for s in shards for face in s['faces']], dtype=bool)
+        alerts, events = alert_events(ears, faces, video['fps'])
+        summary = summarize(path, video['fps'], ears, faces, alerts, events)
+        summary['events'] = events
+        if output_dir:
+            summary['files'] = write_outputs(output_dir, path, video['fps'], ears, faces, alerts, events, fmt)
+        results.append(summary)
+
+    all_shards = [s for video in videos.values() for s in video['shards']]
+    total_frames = sum(len(s['ears']) for s in all_shards)
+    busy = sum(s['wall_s'] for s in all_shards)
+    report = {
+        'videos': results,
+        'throughput': {
+            'frames': total_frames,
+            'shards': len(all_shards),
+            'workers': workers,
+            'wall_s': round(wall, 2),
+            'fps': round(total_frames / wall, 2) if wall else 0.0,
+            'fps_per_core': round(total_frames / wall / workers, 2) if wall else 0.0,
+            # Speed of a single worker while it is busy (excludes pool start-up and idle tails)
+            'fps_per_busy_worker': round(total_frames / busy, 2) if busy else 0.0,
+            'cpu_s': round(sum(s['cpu_s'] for s in all_shards), 2)
+        }
+    }
+    if output_dir:
+        with open(os.path.join(output_dir, 'summary.json'), 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyze recorded videos for drowsiness (headless)")
+    parser.add_argument('videos', nargs='+')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--chunk-frames', type=int, default=DROWSINESS_CHUNK_FRAMES,
+                        help='frames per shard (long videos are split across workers)')
+    parser.add_argument('--adaptive', action='store_true', help='use adaptive Face Mesh scheduling')
+    parser.add_argument('--output-dir', default='data/drowsiness', help='where per-video CSV/JSON files go')
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv')
+    args = parser.parse_args(argv)
+
+    report = analyze_videos(args.videos, args.workers, args.chunk_frames, args.adaptive, args.output_dir, args.format)
+    for video in report['videos']:
+        print(f"🎞️ {video['video']}: {video['frames']} frames, {video['alerts']} alert(s), "
+              f"{video['blinks']} blink(s), eyes closed {video['eyes_closed_ratio']:.1%}")
+    throughput = report['throughput']
+    print(f"⚡ {throughput['frames']} frames in {throughput['wall_s']}s on {throughput['workers']} worker(s): "
+          f"{throughput['fps']} fps, {throughput['fps_per_core']} fps/core")
+    print(f"📁 Results in {args.output_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
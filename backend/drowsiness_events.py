@@ -0,0 +1,52 @@
+# Batched persistence of drowsiness alert events (SQLite via DatabaseService)
+from typing import Dict, List, Optional
+
+from buffered_writer import BufferedWriter
+
+EVENT_FIELDS = ('session_id', 'user_id', 'source', 'event_type', 'started_at', 'ended_at', 'alert_s',
+                'eyes_closed_s', 'min_ear', 'perclos', 'blink_rate_per_min')
+
+
+class DrowsinessEventRecorder(BufferedWriter):
+    """
+    Buffers alert events from detector threads and writes them to SQLite in
+    batches, so a detection loop never blocks on the database.
+    """
+
+    save_method = 'save_drowsiness_events'
+    thread_name = 'drowsiness-event-flush'
+    label = 'Drowsiness event'
+
+    def __init__(self, flush_interval: float = 10.0, max_buffer: int = 50):
+        super().__init__(flush_interval, max_buffer)
+
+    def record(self, event: Dict):
+        """Queue one event (detector event_sink)"""
+        self._append({field: event.get(field) for field in EVENT_FIELDS})
+
+    def history(self, user_id, session_id: Optional[str] = None, since: Optional[str] = None,
+                limit: int = 500) -> List[Dict]:
+        """One user's persisted and still-buffered events, newest first, filtered by session and start time"""
+        if user_id is None:
+            raise ValueError("history() needs a user_id")
+        persisted = []
+        if self.storage is not None and hasattr(self.storage, 'get_drowsiness_events'):
+            persisted = self.storage.get_drowsiness_events(user_id, session_id, since, limit)
+
+        def matches(event):
+            return (str(event['user_id']) == str(user_id)
+                    and (session_id is None or event['session_id'] == session_id)
+                    and (since is None or event['started_at'] >= since))
+
+        with self._lock:
+            buffered = [dict(e) for e in self._buffer if matches(e)]
+        events = sorted(buffered + persisted, key=lambda e: e['started_at'] or '', reverse=True)
+        return events[:limit]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {'buffered': len(self._buffer), 'flush_interval': self.flush_interval}
+
+
+# Global recorder; app.create_app() attaches the database service
+drowsiness_recorder = DrowsinessEventRecorder()
@@ -0,0 +1,233 @@
+# Vectorized eye-landmark math for the drowsiness detector (NumPy only, no OpenCV/MediaPipe)
+import os
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# MediaPipe Face Mesh eye contours (the first six points of each feed the EAR)
+LEFT_EYE = [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398]
+RIGHT_EYE = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
+EAR_POINTS = 6
+
+# Eyes count as closed below this EAR; an alert needs them closed this many seconds in a row.
+# The alert rule counts analyzed frames, so the seconds are converted with the rate frames are
+# actually analyzed at (EYE_AR_CONSEC_FRAMES is the frame count at the 30 fps of a typical webcam).
+EYE_AR_THRESH = 0.25
+EYE_AR_CLOSED_S = float(os.getenv('EYE_AR_CLOSED_S', 1.0))
+REFERENCE_FPS = 30.0
+
+# Sliding window for PERCLOS and blink rate, and the frame rate its ring buffer is sized for
+PERCLOS_WINDOW_S = float(os.getenv('PERCLOS_WINDOW_S', 60))
+PERCLOS_MAX_FPS = int(os.getenv('PERCLOS_MAX_FPS', 30))
+
+
+
+def closed_frames(fps: float, closed_s: float = EYE_AR_CLOSED_S) -> int:
+    """Closed frames in a row that make an alert when frames are analyzed at `fps`"""
+    return max(int(round(closed_s * fps)), 1)
+
+
+EYE_AR_CONSEC_FRAMES = closed_frames(REFERENCE_FPS)
+
+# Point pairs of one eye: EAR = (|p1-p5| + |p2-p4|) / (2 * |p0-p3|)
+_EAR_FROM = np.array([1, 2, 0])
+_EAR_TO = np.array([5, 4, 3])
+
+
+class LandmarkBuffer:
+    """
+    Preallocated landmark coordinates for a fixed set of Face Mesh indices.
+    Each frame reads every needed landmark exactly once into the same arrays,
+    so EAR and drawing both work from one extraction without allocating.
+    """
+
+    def __init__(self, indices: Sequence[int]):
+        self.indices = list(indices)
+        self.points = np.zeros((len(self.indices), 2), dtype=np.float64)
+        self.pixels = np.zeros((len(self.indices), 2), dtype=np.int32)
+        self._scaled = np.zeros_like(self.points)
+        self._needed = max(self.indices) + 1 if self.indices else 0
+        self.valid = False
+
+    def fill(self, landmarks) -> bool:
+        """Copy normalized (x, y) of the tracked indices; False if the mesh has too few points"""
+        self.valid = len(landmarks) >= self._needed
+        if not self.valid:
+            return False
+        points = self.points
+        for row, idx in enumerate(self.indices):
+            landmark = landmarks[idx]
+            points[row, 0] = landmark.x
+            points[row, 1] = landmark.y
+        return True
+
+    def to_pixels(self, width: int, height: int) -> np.ndarray:
+        """Pixel coordinates of the last fill (truncated like int(x * w))"""
+        np.multiply(self.points, (width, height), out=self._scaled)
+        self.pixels[:] = self._scaled
+        return self.pixels
+
+    def remap(self, x0: int, y0: int, crop_width: int, crop_height: int, width: int, height: int):
+        """Convert points filled from a crop at (x0, y0) into full-frame normalized coordinates"""
+        self.points *= (crop_width / width, crop_height / height)
+        self.points += (x0 / width, y0 / height)
+
+    def bounds(self):
+        """(x0, y0, x1, y1) normalized bounding box of the last fill"""
+        x0, y0 = self.points.min(axis=0)
+        x1, y1 = self.points.max(axis=0)
+        return float(x0), float(y0), float(x1), float(y1)
+
+
+class EyeLandmarks(LandmarkBuffer):
+    """LandmarkBuffer over the EAR points of both eyes (left first, then right)"""
+
+    def __init__(self, left: Sequence[int] = LEFT_EYE, right: Sequence[int] = RIGHT_EYE):
+        super().__init__(list(left[:EAR_POINTS]) + list(right[:EAR_POINTS]))
+
+    def eye_points(self) -> np.ndarray:
+        """View of the last fill shaped (2 eyes, 6 points, xy)"""
+        return self.points.reshape(2, EAR_POINTS, 2)
+
+
+@lru_cache(maxsize=16)
+def _pair_indices(eyes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Flat row indices of every EAR point pair for `eyes` stacked eyes"""
+    base = (np.arange(eyes) * EAR_POINTS)[:, None]
+    return (base + _EAR_FROM).ravel(), (base + _EAR_TO).ravel()
+
+
+def eye_aspect_ratios(eye_points: np.ndarray) -> np.ndarray:
+    """
+    EAR of every eye in one call. `eye_points` is (..., 6, 2) (one frame's
+    eyes or a whole recording); returns (...) with 0 where the eye has no width,
+    matching the per-eye implementation.
+    """
+    shape = eye_points.shape[:-2]
+    points = eye_points.reshape(-1, 2)
+    start, end = _pair_indices(points.shape[0] // EAR_POINTS)
+    deltas = points[start] - points[end]
+    deltas *= deltas
+    distances = np.sqrt(deltas[:, 0] + deltas[:, 1]).reshape(shape + (3,))
+    vertical = distances[..., 0] + distances[..., 1]
+    horizontal = 2.0 * distances[..., 2]
+    return np.divide(vertical, horizontal, out=np.zeros_like(vertical), where=horizontal > 0)
+
+
+class EyeClosureWindow:
+    """
+    Fixed-size ring buffer of per-frame eye-closure samples covering the last
+    `window_s` seconds. push() is O(1) amortized: a running count of closed
+    samples is kept as samples enter and expire, so PERCLOS (share of time the
+    eyes are closed) and blink rate are read without scanning the window. When
+    frames arrive faster than the buffer was sized for, the oldest samples are
+    dropped and the window simply covers less time.
+
+    A blink is a closed-eye run shorter than an alert (`consec_frames`); runs
+    that long are alerts, not blinks. `consec_frames` is `closed_s` at the
+    analyzed frame rate: pass `fps` when it is known (a recording), otherwise
+    the rate is measured from the sample times, so a capped or overloaded
+    camera loop still alerts after `closed_s` seconds rather than after a
+    fixed number of frames.
+    """
+
+    def __init__(self, window_s: float = PERCLOS_WINDOW_S, capacity: Optional[int] = None,
+                 closed_s: float = EYE_AR_CLOSED_S, fps: Optional[float] = None):
+        self.window_s = window_s
+        self.capacity = max(capacity or int(window_s * PERCLOS_MAX_FPS), 1)
+        self.closed_s = closed_s
+        self.fixed_fps = fps
+        self.fps = fps or REFERENCE_FPS
+        self.consec_frames = closed_frames(self.fps, closed_s)
+        self._last_time: Optional[float] = None
+        self._measured = False
+        self._times = np.zeros(self.capacity, dtype=np.float64)
+        self._closed = np.zeros(self.capacity, dtype=bool)
+        self._blinks = deque()  # end times of blinks still inside the window
+        self.reset()
+
+    def reset(self):
+        self._start = 0
+        self._count = 0
+        self._closed_count = 0
+        self._blinks.clear()
+        self.run = 0  # length of the current closed-eye run
+        self.total_blinks = 0
+
+    def push(self, closed: bool, now: Optional[float] = None) -> bool:
+        """Add one frame's sample (`now` in seconds, monotonic by default); True if it ends a blink"""
+        now = time.monotonic() if now is None else now
+        self._measure_rate(now)
+        blink = False
+        if closed:
+            self.run += 1
+        else:
+            if 0 < self.run < self.consec_frames:
+                blink = True
+                self.total_blinks += 1
+                self._blinks.append(now)
+            self.run = 0
+
+        if self._count == self.capacity:
+            self._evict()
+        end = (self._start + self._count) % self.capacity
+        self._times[end] = now
+        self._closed[end] = closed
+        self._count += 1
+        self._closed_count += bool(closed)
+
+        cutoff = now - self.window_s
+        while self._count and self._times[self._start] < cutoff:
+            self._evict()
+        oldest = self._times[self._start]
+        while self._blinks and self._blinks[0] < oldest:
+            self._blinks.popleft()
+        return blink
+
+    def _measure_rate(self, now: float):
+        """Track the analyzed frame rate (moving average; gaps over a second are pauses, not frames)"""
+        last, self._last_time = self._last_time, now
+        if self.fixed_fps or last is None or not 0 < now - last <= 1.0:
+            return
+        rate = 1.0 / (now - last)
+        self.fps = rate if not self._measured else self.fps + 0.1 * (rate - self.fps)
+        self._measured = True
+        self.consec_frames = closed_frames(self.fps, self.closed_s)
+
+    def _evict(self):
+        self._closed_count -= int(self._closed[self._start])
+        self._start = (self._start + 1) % self.capacity
+        self._count -= 1
+
+    @property
+    def covered_s(self) -> float:
+        """Seconds between the oldest and newest sample in the window"""
+        if self._count < 2:
+            return 0.0
+        newest = self._times[(self._start + self._count - 1) % self.capacity]
+        return float(newest - self._times[self._start])
+
+    @property
+    def perclos(self) -> float:
+        """Fraction of samples in the window with the eyes closed"""
+        return self._closed_count / self._count if self._count else 0.0
+
+    @property
+    def blink_rate(self) -> float:
+        """Blinks per minute over the time the window covers"""
+        covered = self.covered_s
+        return len(self._blinks) * 60.0 / covered if covered >= 1.0 else 0.0
+
+    def get_stats(self) -> Dict:
+        return {
+            'perclos': round(self.perclos, 4),
+            'blink_rate_per_min': round(self.blink_rate, 2),
+            'window_s': round(self.covered_s, 2),
+            'samples': self._count,
+            'closed_run_frames': self.run,
+            'fps': round(self.fps, 2),
+            'alert_frames': self.consec_frames
+        }
@@ -0,0 +1,189 @@
+# Pipelined drowsiness detection: capture, inference and render stages on separate threads
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+# Default inference rate cap for pipelined mode (0 = as fast as frames arrive)
+DROWSINESS_TARGET_FPS = float(os.getenv('DROWSINESS_TARGET_FPS', 0))
+WINDOW_NAME = "Drowsiness Detection - Smart Grocery Planner"
+
+
+class LatestFrameQueue:
+    """
+    Bounded hand-off between stages. When full, put() drops the oldest item
+    instead of blocking, so the consumer always gets the freshest frame and a
+    slow stage never makes the producer fall behind.
+    """
+
+    def __init__(self, maxsize: int = 1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None):
+        """Oldest queued item, or None on timeout / once closed and drained"""
+        with self._cond:
+            if not self._items and not self.closed:
+                self._cond.wait(timeout)
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class StageTimer:
+    """Per-stage counters: frames handled, busy time, max time and achieved rate"""
+
+    def __init__(self):
+        self.frames = 0
+        self.busy = 0.0
+        self.max = 0.0
+        self.started = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            if self.started is None:
+                self.started = time.perf_counter() - seconds
+            self.frames += 1
+            self.busy += seconds
+            self.max = max(self.max, seconds)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            elapsed = time.perf_counter() - self.started if self.started else 0.0
+            return {
+                'frames': self.frames,
+                'avg_ms': round(self.busy / self.frames * 1000, 2) if self.frames else 0.0,
+                'max_ms': round(self.max * 1000, 2),
+                'fps': round(self.frames / elapsed, 2) if elapsed > 0 else 0.0,
+                'utilization': round(self.busy / elapsed, 3) if elapsed > 0 else 0.0
+            }
+
+
+def show_in_window(frame) -> bool:
+    """Default render sink: OpenCV window, returns False when 'q' is pressed"""
+    import cv2
+    cv2.imshow(WINDOW_NAME, frame)
+    return not (cv2.waitKey(1) & 0xFF == ord('q'))
+
+
+class DetectionPipeline:
+    """
+    Runs a SimpleDrowsinessDetector as three overlapping stages:
+
+    capture   -> reads frames as fast as the source delivers them
+    inference -> analyze_frame() on the newest captured frame (at most target_fps)
+    render    -> annotate_frame() + sink (window by default) on the newest result
+
+    Stages are joined by one-slot LatestFrameQueues, so stale frames are dropped
+    rather than queued and alerts always come from the freshest frame.
+    """
+
+    def __init__(self, detector, source, target_fps: float = DROWSINESS_TARGET_FPS,
+                 render: Optional[Callable] = show_in_window, mirror: bool = True):
+        self.detector = detector
+        self.source = source
+        self.target_fps = target_fps
+        self.render = render
+        self.mirror = mirror
+        self.captured = LatestFrameQueue(1)
+        self.analyzed = LatestFrameQueue(1)
+        self.timers = {'capture': StageTimer(), 'inference': StageTimer(), 'render': StageTimer()}
+        self.latency = StageTimer()  # frame arrival -> rendered, per displayed frame
+        self.last_result: Optional[Dict] = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def stop(self):
+        self._stop.set()
+        self.captured.close()
+        self.analyzed.close()
+
+    def _running(self) -> bool:
+        return not self._stop.is_set() and self.detector.is_running
+
+    def _capture(self):
+        flip = None
+        if self.mirror:
+            import cv2
+            flip = cv2.flip
+        while self._running():
+            started = time.perf_counter()
+            ok, frame = self.source.read()
+            if not ok:
+                break
+            captured_at = time.perf_counter()
+            if flip is not None:
+                frame = flip(frame, 1)
+            self.timers['capture'].record(time.perf_counter() - started)
+            self.captured.put((captured_at, frame))
+        self.stop()
+
+    def _inference(self):
+        interval = 1.0 / self.target_fps if self.target_fps > 0 else 0.0
+        next_due = time.perf_counter()
+        while self._running():
+            if interval:
+                delay = next_due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_due = max(next_due + interval, time.perf_counter())
+            item = self.captured.get(timeout=0.5)
+            if item is None:
+                continue
+            captured_at, frame = item
+            started = time.perf_counter()
+            result = self.detector.analyze_frame(frame)
+            self.timers['inference'].record(time.perf_counter() - started)
+            self.last_result = result
+            self.analyzed.put((captured_at, frame, result))
+
+    def run(self) -> Dict:
+        """Start capture and inference threads and render on the calling thread until stopped"""
+        self._threads = [
+            threading.Thread(target=self._capture, name='drowsiness-capture', daemon=True),
+            threading.Thread(target=self._inference, name='drowsiness-inference', daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+        try:
+            while self._running():
+                item = self.analyzed.get(timeout=0.5)
+                if item is None:
+                    continue
+                captured_at, frame, result = item
+                started = time.perf_counter()
+                self.detector.annotate_frame(frame, result)
+                keep_going = self.render(frame) if self.render else True
+                now = time.perf_counter()
+                self.timers['render'].record(now - started)
+                self.latency.record(now - captured_at)
+                if keep_going is False:
+                    break
+        finally:
+            self.stop()
+            for thread in self._threads:
+                thread.join(timeout=2)
+        return self.get_stats()
+
+    def get_stats(self) -> Dict:
+        """Per-stage timing, frames dropped between stages and capture-to-render latency"""
+        stats = {name: timer.summary() for name, timer in self.timers.items()}
+        stats['dropped'] = {'before_inference': self.captured.dropped, 'before_render': self.analyzed.dropped}
+        latency = self.latency.summary()
+        stats['latency_ms'] = {'avg': latency['avg_ms'], 'max': latency['max_ms']}
+        stats['target_fps'] = self.target_fps
+        return stats
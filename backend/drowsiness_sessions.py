@@ -0,0 +1,296 @@
+# Several drowsiness detection sessions (one per camera) sharing a bounded pool of Face Mesh models
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# Concurrent detection sessions (cameras) per process
+DROWSINESS_MAX_SESSIONS = int(os.getenv('DROWSINESS_MAX_SESSIONS', 4))
+# Face Mesh models shared by all sessions; each model serves one frame at a time
+DROWSINESS_MESH_POOL_SIZE = int(os.getenv('DROWSINESS_MESH_POOL_SIZE', 2))
+# Inference rate cap per session (0 = uncapped)
+DROWSINESS_SESSION_MAX_FPS = float(os.getenv('DROWSINESS_SESSION_MAX_FPS', 15))
+# Stream URLs sessions may open, comma-separated, optionally named ("dock=rtsp://cam1/live").
+# Clients pass a device index or one of these names/URLs, never a free-form string
+DROWSINESS_CAMERAS = os.getenv('DROWSINESS_CAMERAS', '')
+# Highest local device index a client may ask for
+DROWSINESS_MAX_DEVICE_INDEX = int(os.getenv('DROWSINESS_MAX_DEVICE_INDEX', 9))
+
+
+def parse_camera_allowlist(spec: str) -> Dict[str, str]:
+    """Map allowed names and URLs to the URL to open; an unnamed entry is reachable by its URL only"""
+    cameras = {}
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, url = entry.partition('=')
+        # Query strings contain '=' too; only a plain word before it is a name
+        if sep and re.fullmatch(r'[\w-]+', name.strip()) and url.strip():
+            cameras[name.strip()] = url.strip()
+            cameras[url.strip()] = url.strip()
+        else:
+            cameras[entry] = entry
+    return cameras
+
+
+CAMERA_ALLOWLIST = parse_camera_allowlist(DROWSINESS_CAMERAS)
+
+
+def resolve_camera(camera, allowlist: Optional[Dict[str, str]] = None):
+    """Device index or allowlisted stream URL for a client-supplied camera; ValueError for anything else"""
+    allowlist = CAMERA_ALLOWLIST if allowlist is None else allowlist
+    if isinstance(camera, str) and camera.strip().isdigit():
+        camera = int(camera)
+    if isinstance(camera, int) and not isinstance(camera, bool):
+        if not 0 <= camera <= DROWSINESS_MAX_DEVICE_INDEX:
+            raise ValueError(f'camera index must be between 0 and {DROWSINESS_MAX_DEVICE_INDEX}')
+        return camera
+    if isinstance(camera, str) and camera.strip() in allowlist:
+        return allowlist[camera.strip()]
+    raise ValueError('camera must be a device index or a stream listed in DROWSINESS_CAMERAS')
+
+
+class FaceMeshPool:
+    """
+    At most `size` Face Mesh models, created on first need and lent out one
+    frame at a time. A detector gets back the model it used last when that one
+    is idle (so MediaPipe's frame-to-frame tracking stays with one camera), else
+    a new model while the pool has room, else any idle model. When all are
+    busy, acquire() blocks in arrival order; pipelined sessions drop stale
+    frames meanwhile. With more sessions than models, models change hands
+    and MediaPipe re-detects the face on the next frame it sees.
+    """
+
+    def __init__(self, factory: Callable, size: int = DROWSINESS_MESH_POOL_SIZE):
+        self.factory = factory
+        self.size = max(size, 1)
+        self._cond = threading.Condition()
+        self._idle = []
+        self._models = []
+        self._creating = 0
+        self._waiting = deque()
+        self._last_owner = {}  # id(model) -> id(owner) of its last user
+        self._closed = False
+        self.stats = {'acquired': 0, 'affinity_hits': 0, 'handoffs': 0, 'waits': 0,
+                      'wait_ms_total': 0.0, 'wait_ms_max': 0.0}
+
+    @contextmanager
+    def acquire(self, owner=None):
+        model = self._checkout(id(owner))
+        try:
+            yield model
+        finally:
+            with self._cond:
+                closed = self._closed
+                if not closed:
+                    self._last_owner[id(model)] = id(owner)
+                    self._idle.append(model)
+                    self._cond.notify_all()
+            if closed:
+                model.close()
+
+    def _checkout(self, owner_key: int):
+        started = time.perf_counter()
+        waited = False
+        ticket = object()
+        with self._cond:
+            # First come, first served: a session that just returned its model
+            # cannot take it straight back while others are waiting
+            self._waiting.append(ticket)
+            try:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Face Mesh pool is closed")
+                    if self._waiting[0] is ticket:
+                        own = next((m for m in self._idle if self._last_owner.get(id(m)) == owner_key), None)
+                        if own is not None:
+                            self._idle.remove(own)
+                            self.stats['affinity_hits'] += 1
+                            return self._checked_out(own, started, waited)
+                        if len(self._models) + self._creating < self.size:
+                            self._creating += 1
+                            break
+                        if self._idle:
+                            self.stats['handoffs'] += 1
+                            return self._checked_out(self._idle.pop(0), started, waited)
+                    waited = True
+                    self._cond.wait()
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+        # Model loading takes a while; do it outside the lock
+        try:
+            model = self.factory()
+        except Exception:
+            with self._cond:
+                self._creating -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._creating -= 1
+            self._models.append(model)
+            return self._checked_out(model, started, waited)
+
+    def _checked_out(self, model, started: float, waited: bool):
+        # Caller holds the lock
+        self.stats['acquired'] += 1
+        if waited:
+            wait_ms = (time.perf_counter() - started) * 1000
+            self.stats['waits'] += 1
+            self.stats['wait_ms_total'] += wait_ms
+            self.stats['wait_ms_max'] = max(self.stats['wait_ms_max'], wait_ms)
+        return model
+
+    def close(self):
+        """Close idle models now and busy ones when they are returned; later acquire() calls fail"""
+        with self._cond:
+            self._closed = True
+            models, self._models, self._idle = self._idle, [], []
+            self._cond.notify_all()
+        for model in models:
+            try:
+                model.close()
+            except Exception:
+                pass
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            acquired = self.stats['acquired']
+            return dict(self.stats,
+                        size=self.size,
+                        created=len(self._models),
+                        in_use=len(self._models) - len(self._idle),
+                        wait_ms_total=round(self.stats['wait_ms_total'], 2),
+                        wait_ms_max=round(self.stats['wait_ms_max'], 2),
+                        wait_ratio=round(self.stats['waits'] / acquired, 4) if acquired else 0.0)
+
+
+def default_session_factory(pool: FaceMeshPool, **options):
+    from simple_drowsiness_detector import DrowsinessWebInterface
+    return DrowsinessWebInterface(face_mesh_pool=pool, **options)
+
+
+def default_model_factory():
+    from simple_drowsiness_detector import create_face_mesh
+    return create_face_mesh()
+
+
+class DetectionSessionManager:
+    """
+    Named detection sessions, each a DrowsinessWebInterface (own detector
+    state, thread, alarm channel and MJPEG/SSE broadcaster) reading one camera.
+    All sessions borrow Face Mesh models from one FaceMeshPool, so memory and
+    CPU for models stay bounded however many cameras are watched.
+    """
+
+    def __init__(self, max_sessions: int = DROWSINESS_MAX_SESSIONS, pool_size: int = DROWSINESS_MESH_POOL_SIZE,
+                 max_fps: float = DROWSINESS_SESSION_MAX_FPS, session_factory: Callable = default_session_factory,
+                 model_factory: Callable = default_model_factory, event_sink: Optional[Callable] = None):
+        self.max_sessions = max(max_sessions, 1)
+        self.event_sink = event_sink  # receives every session's finished sleep alerts
+        self.max_fps = max_fps
+        self.session_factory = session_factory
+        self.pool = FaceMeshPool(model_factory, pool_size)
+        self.sessions: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _cap_fps(self, target_fps: Optional[float]) -> float:
+        if self.max_fps <= 0:
+            return target_fps or 0.0
+        return min(target_fps, self.max_fps) if target_fps and target_fps > 0 else self.max_fps
+
+    def _reap(self):
+        """Drop sessions whose detection ended on its own (camera unplugged, stream ended). Caller holds the lock."""
+        finished = [sid for sid, s in self.sessions.items() if s['started'] and not s['interface'].is_running]
+        for sid in finished:
+            self.sessions.pop(sid)['interface'].close(timeout=0)
+
+    def start_session(self, camera=0, session_id: Optional[str] = None, target_fps: Optional[float] = None,
+                      adaptive: bool = False, sound: bool = True, user_id=None) -> Dict:
+        """Start detection on `camera` (device index or stream URL) as a new session"""
+        with self._lock:
+            if self._closed:
+                return {'status': 'error', 'message': 'Session manager is shut down'}
+            self._reap()
+            session_id = session_id or uuid.uuid4().hex[:8]
+            if session_id in self.sessions:
+                return {'status': 'already_running', 'session_id': session_id,
+                        'message': f'Session {session_id} is already running'}
+            for sid, session in self.sessions.items():
+                if session['camera'] == camera:
+                    return {'status': 'already_running', 'session_id': sid,
+                            'message': f'Camera {camera} is already used by session {sid}'}
+            if len(self.sessions) >= self.max_sessions:
+                return {'status': 'limit_reached',
+                        'message': f'At most {self.max_sessions} detection sessions can run at once'}
+            interface = self.session_factory(self.pool, adaptive=adaptive, sound=sound, event_sink=self.event_sink,
+                                             session_id=session_id, user_id=user_id)
+            session = {'interface': interface, 'camera': camera, 'target_fps': self._cap_fps(target_fps),
+                       'adaptive': adaptive, 'user_id': user_id, 'created': time.time(), 'started': False}
+            self.sessions[session_id] = session
+        # Pipelined mode applies the fps cap and never lets a busy pool back up the camera
+        result = interface.start_web_detection(camera_index=camera, pipelined=True,
+                                               target_fps=session['target_fps'])
+        session['started'] = True
+        return dict(result, session_id=session_id, target_fps=session['target_fps'])
+
+    @staticmethod
+    def _visible(session: Dict, user_id) -> bool:
+        """Sessions are private to the user who started them; user_id None means no filter"""
+        return user_id is None or str(session['user_id']) == str(user_id)
+
+    def get_session(self, session_id: str, user_id=None):
+        """The session's DrowsinessWebInterface, or None (also when it belongs to another user)"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+        return session['interface'] if session and self._visible(session, user_id) else None
+
+    def stop_session(self, session_id: str, timeout: float = 5.0, user_id=None) -> Dict:
+        """Stop a session, release its camera and forget it"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is not None and self._visible(session, user_id):
+                self.sessions.pop(session_id)
+            else:
+                session = None
+        if session is None:
+            return {'status': 'not_found', 'message': f'No session {session_id}'}
+        session['interface'].close(timeout)
+        return {'status': 'stopped', 'session_id': session_id, 'message': 'Drowsiness detection stopped'}
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop every session and close the pooled models"""
+        with self._lock:
+            self._closed = True
+            session_ids = list(self.sessions)
+        for session_id in session_ids:
+            self.stop_session(session_id, timeout)
+        self.pool.close()
+
+    def list_sessions(self, user_id=None) -> Dict:
+        with self._lock:
+            self._reap()
+            return {sid: {'camera': s['camera'], 'target_fps': s['target_fps'], 'adaptive': s['adaptive'],
+                          'user_id': s['user_id'], 'running': s['interface'].is_running, 'created': s['created']}
+                    for sid, s in self.sessions.items() if self._visible(s, user_id)}
+
+    def get_stats(self, user_id=None) -> Dict:
+        """Limits, pool usage and per-session statistics (of one user's sessions when user_id is given)"""
+        with self._lock:
+            active = len(self.sessions)
+            sessions = {sid: s for sid, s in self.sessions.items() if self._visible(s, user_id)}
+        return {
+            'max_sessions': self.max_sessions,
+            'max_fps': self.max_fps,
+            'active_sessions': active,
+            'pool': self.pool.get_stats(),
+            'sessions': {sid: dict(s['interface'].get_web_statistics(), camera=s['camera'],
+                                   target_fps=s['target_fps'])
+                         for sid, s in sessions.items()}
+        }
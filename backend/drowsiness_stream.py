@@ -0,0 +1,124 @@
+# Shared frame buffer for streaming annotated detector frames (MJPEG) and status (SSE) to many viewers
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+DROWSINESS_JPEG_QUALITY = int(os.getenv('DROWSINESS_JPEG_QUALITY', 75))
+# Upper bound on frames sent to each viewer (the detector may run faster)
+DROWSINESS_STREAM_FPS = float(os.getenv('DROWSINESS_STREAM_FPS', 15))
+MJPEG_BOUNDARY = 'frame'
+
+
+def encode_jpeg(frame, quality: int = DROWSINESS_JPEG_QUALITY) -> Optional[bytes]:
+    """JPEG bytes for a BGR frame, or None if encoding fails"""
+    import cv2
+    ok, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return buffer.tobytes() if ok else None
+
+
+class FrameBroadcaster:
+    """
+    Holds the latest encoded frame and detector status. The producer encodes
+    each frame once (and only while someone is watching); every viewer reads
+    the same bytes, so viewers add network cost but no encoding cost.
+    """
+
+    def __init__(self, max_fps: float = DROWSINESS_STREAM_FPS):
+        self.max_fps = max_fps
+        self._cond = threading.Condition()
+        self._jpeg: Optional[bytes] = None
+        self._status: Dict = {}
+        self._seq = 0
+        self._status_seq = 0
+        self._closed = False
+        self.viewers = 0
+        self.stats = {'frames_encoded': 0, 'frames_sent': 0, 'bytes_sent': 0, 'viewers_total': 0}
+
+    # --- producer -------------------------------------------------------------------
+
+    @property
+    def wanted(self) -> bool:
+        """True when at least one MJPEG viewer is connected (skip encoding otherwise)"""
+        return self.viewers > 0
+
+    def publish(self, jpeg: Optional[bytes], status: Optional[Dict] = None):
+        with self._cond:
+            if jpeg is not None:
+                self._jpeg = jpeg
+                self._seq += 1
+                self.stats['frames_encoded'] += 1
+            if status is not None:
+                self._status = status
+                self._status_seq += 1
+            self._closed = False
+            self._cond.notify_all()
+
+    def open(self):
+        """Detection (re)starting: viewers that connect now wait for frames instead of ending"""
+        with self._cond:
+            self._closed = False
+
+    def close(self):
+        """Detection stopped: wake every viewer so streams can end"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # --- viewers --------------------------------------------------------------------
+
+    def _wait(self, attr: str, last_seen: int, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while getattr(self, attr) == last_seen and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return getattr(self, attr) != last_seen
+
+    def mjpeg(self, idle_timeout: float = 10.0) -> Iterator[bytes]:
+        """multipart/x-mixed-replace body: the newest frame each time one arrives (rate limited)"""
+        interval = 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+        with self._cond:
+            self.viewers += 1
+            self.stats['viewers_total'] += 1
+        last_seen = 0
+        try:
+            while True:
+                if not self._wait('_seq', last_seen, idle_timeout):
+                    return
+                with self._cond:
+                    jpeg, last_seen = self._jpeg, self._seq
+                part = (f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                        f"Content-Length: {len(jpeg)}\r\n\r\n").encode('ascii') + jpeg + b"\r\n"
+                with self._cond:
+                    self.stats['frames_sent'] += 1
+                    self.stats['bytes_sent'] += len(part)
+                yield part
+                if interval:
+                    time.sleep(interval)
+        finally:
+            with self._cond:
+                self.viewers -= 1
+
+    def status_events(self, idle_timeout: float = 15.0) -> Iterator[str]:
+        """Server-sent events with the detector status; a keep-alive comment when idle"""
+        last_seen = -1
+        while True:
+            if self._wait('_status_seq', last_seen, idle_timeout):
+                with self._cond:
+                    status, last_seen, closed = self._status, self._status_seq, self._closed
+                yield f"event: status\ndata: {json.dumps(status, default=str)}\n\n"
+            else:
+                with self._cond:
+                    closed = self._closed
+                yield ": keep-alive\n\n"
+            if closed:
+                yield "event: stopped\ndata: {}\n\n"
+                return
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            return dict(self.stats, viewers=self.viewers, max_fps=self.max_fps)
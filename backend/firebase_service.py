@@ -1,6 +1,7 @@
 # Firebase integration (for storing user data)
 import firebase_admin
 from firebase_admin import credentials, firestore
+import logging
 import os
 import json
 from datetime import datetime
@@ -9,6 +10,8 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Initialize Firebase with error handling
 db = None
 firebase_enabled = False
@@ -25,21 +28,19 @@ try:
     })
     db = firestore.client()
     firebase_enabled = True
-    print("✅ Firebase initialized successfully")
-    print(f"📁 Project ID: smart-grocery-recipe-planner")
+    logger.info("✅ Firebase initialized successfully")
+    logger.info("📁 Project ID: smart-grocery-recipe-planner")
     
     # Test connection
     test_doc = db.collection('test').document('connection_test')
     test_doc.set({'timestamp': datetime.now(), 'status': 'connected'})
-    print("✅ Firebase connection test successful")
+    logger.info("✅ Firebase connection test successful")
     
 except Exception as e:
-    print(f"❌ Firebase initialization failed: {e}")
-    print("📝 Falling back to local JSON storage")
-    print("💡 To fix Firebase:")
-    print("   1. Go to https://console.firebase.google.com/")
-    print("   2. Select your project: smart-grocery-recipe-planner")
-    print("   3. Enable Firestore Database in the console")
+    logger.warning(f"❌ Firebase initialization failed: {e}")
+    logger.warning("📝 Falling back to local JSON storage. 💡 To fix Firebase: open "
+                   "https://console.firebase.google.com/, select smart-grocery-recipe-planner "
+                   "and enable Firestore Database")
     firebase_enabled = False
 
 def save_user_data(health_data, meal_plan, recipe_suggestions):
@@ -55,11 +56,10 @@ def save_user_data(health_data, meal_plan, recipe_suggestions):
         try:
             # Save to Firebase
             doc_ref = db.collection('user_data').add(data)
-            print(f"Data saved to Firebase with ID: {doc_ref[1].id}")
+            logger.info(f"Data saved to Firebase with ID: {doc_ref[1].id}")
             return {"status": "success", "storage": "firebase", "id": doc_ref[1].id}
         except Exception as e:
-            print(f"Firebase save failed: {e}")
-            print("Falling back to local storage")
+            logger.error(f"Firebase save failed, falling back to local storage: {e}")
             return save_to_local_storage(data)
     else:
         return save_to_local_storage(data)
@@ -86,10 +86,10 @@ def save_to_local_storage(data):
         with open(file_path, 'w') as f:
             json.dump(existing_data, f, indent=2)
         
-        print(f"Data saved to local storage with ID: {data['id']}")
+        logger.info(f"Data saved to local storage with ID: {data['id']}")
         return {"status": "success", "storage": "local", "id": data['id']}
     except Exception as e:
-        print(f"Local storage save failed: {e}")
+        logger.error(f"Local storage save failed: {e}")
         return {"status": "error", "message": str(e)}
 
 def get_user_data():
@@ -99,7 +99,7 @@ def get_user_data():
             docs = db.collection('user_data').stream()
             return [{"id": doc.id, **doc.to_dict()} for doc in docs]
         except Exception as e:
-            print(f"Firebase read failed: {e}")
+            logger.error(f"Firebase read failed: {e}")
             return get_from_local_storage()
     else:
         return get_from_local_storage()
@@ -113,5 +113,5 @@ def get_from_local_storage():
                 return json.load(f)
         return []
     except Exception as e:
-        print(f"Local storage read failed: {e}")
+        logger.error(f"Local storage read failed: {e}")
         return []
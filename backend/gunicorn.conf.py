@@ -0,0 +1,76 @@
+# Gunicorn configuration for production serving
+# Usage (from backend/): gunicorn -c gunicorn.conf.py
+import glob
+import multiprocessing
+import os
+import tempfile
+
+wsgi_app = 'wsgi:app'
+bind = os.getenv('BIND', '0.0.0.0:5000')
+
+# Process model: CPU-bound routes scale with workers, OpenAI-bound routes with threads
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# The app reads the effective count: in-process state such as drowsiness sessions needs exactly one worker
+os.environ['WEB_CONCURRENCY'] = str(workers)
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Import the app once in the master so workers fork with shared, already-imported code
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+# Must exceed the OpenAI deadline (OPENAI_DEADLINE, default 20s) so slow upstream
+# calls fail over to fallbacks instead of getting the worker killed
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recycle workers periodically to cap memory growth (jitter avoids restarting all at once).
+# Off by default for a single worker, whose restart would drop live drowsiness sessions
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000 if workers > 1 else 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Workers share metrics through snapshot files so /metrics covers every process
+os.environ.setdefault('METRICS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), f'smart-grocery-metrics-{os.getpid()}'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Start counters from zero on a fresh master
+    metrics_dir = os.environ['METRICS_MULTIPROC_DIR']
+    os.makedirs(metrics_dir, exist_ok=True)
+    for pattern in ('metrics_*.json', 'retired_*.json'):
+        for path in glob.glob(os.path.join(metrics_dir, pattern)):
+            os.remove(path)
+    # Compile the nutrition database once here instead of in every worker on first use
+    try:
+        import nutrition_db
+        nutrition_db.ensure_built()
+    except Exception as e:
+        server.log.warning(f"Nutrition database not compiled at startup: {e}")
+
+
+def when_ready(server):
+    server.log.info(f"🚀 Serving with {workers} worker(s) x {threads} thread(s) on {bind}")
+
+
+def post_fork(server, worker):
+    # Clients, connection pools and background threads must not be shared across fork
+    from app import init_worker
+    init_worker()
+
+
+def worker_exit(server, worker):
+    # Write out any buffered LLM usage before the worker goes away
+    from llm_usage import usage_tracker
+    from metrics import registry
+    usage_tracker.stop()
+    registry.write_snapshot()
+
+
+def child_exit(server, worker):
+    # Runs in the master: keep the exited worker's counters in the retired total and drop its snapshot file
+    from metrics import registry
+    registry.retire_worker(worker.pid)
@@ -0,0 +1,193 @@
+# BMI, BMR and daily calorie (TDEE) calculations, single-person and vectorized batch
+import csv
+import io
+import os
+from bisect import bisect_right
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+# NumPy is imported by the batch functions only; the single-person helpers run on every request
+if TYPE_CHECKING:
+    import numpy as np
+
+# Activity multipliers applied to BMR (shared by the single and batch routes)
+ACTIVITY_MULTIPLIERS = {
+    'sedentary': 1.2,
+    'light': 1.375,
+    'moderate': 1.55,
+    'active': 1.725,
+    'very_active': 1.9
+}
+DEFAULT_ACTIVITY_MULTIPLIER = ACTIVITY_MULTIPLIERS['moderate']
+DEFAULT_ACTIVITY_LEVEL = 'moderate'
+
+# BMI category upper bounds with their labels and UI colors
+BMI_THRESHOLDS = [18.5, 25, 30]
+BMI_CATEGORIES = ['Underweight', 'Normal weight', 'Overweight', 'Obese']
+BMI_COLORS = ['info', 'success', 'warning', 'danger']
+
+MAX_BATCH_ROWS = int(os.getenv('MAX_BATCH_ROWS', 50000))
+BATCH_FIELDS = ('id', 'weight', 'height', 'age', 'gender', 'activity_level')
+
+
+def bmi_category(bmi: float) -> Tuple[str, str]:
+    """Return the (category, color) for a BMI value"""
+    index = bisect_right(BMI_THRESHOLDS, bmi)
+    return BMI_CATEGORIES[index], BMI_COLORS[index]
+
+
+def normalize_activity_level(level) -> str:
+    """Canonical activity level key ("Very Active" -> very_active); blank means moderate"""
+    return str(level or DEFAULT_ACTIVITY_LEVEL).strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def activity_multiplier(level) -> float:
+    """TDEE multiplier for an activity level as sent by a client"""
+    return ACTIVITY_MULTIPLIERS.get(normalize_activity_level(level), DEFAULT_ACTIVITY_MULTIPLIER)
+
+
+def calculate_bmr(weight: float, height: float, age: int, gender: str) -> float:
+    """Mifflin-St Jeor BMR (weight in kg, height in cm)"""
+    if str(gender or 'male').strip().lower() == 'male':
+        return 10 * weight + 6.25 * height - 5 * age + 5
+    return 10 * weight + 6.25 * height - 5 * age - 161
+
+
+class BatchError(ValueError):
+    """Raised when a batch payload cannot be read"""
+
+
+def _to_float_array(values: List) -> 'np.ndarray':
+    """Convert a column to float64, mapping blanks and non-numeric values to NaN"""
+    import numpy as np
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        def to_float(value):
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return np.nan
+        return np.fromiter((to_float(v) for v in values), dtype=np.float64, count=len(values))
+
+
+def columns_from_json(data) -> Dict[str, List]:
+    """
+    Accept either a list of people (`[{...}]` or `{"people": [{...}]}`) or
+    columnar arrays (`{"weight": [...], "height": [...], ...}`).
+    """
+    if isinstance(data, dict) and 'people' in data:
+        data = data['people']
+    if isinstance(data, list):
+        if not all(isinstance(row, dict) for row in data):
+            raise BatchError('Each person must be a JSON object')
+        return {field: [row.get(field) for row in data] for field in BATCH_FIELDS}
+    if isinstance(data, dict) and isinstance(data.get('weight'), list):
+        size = len(data['weight'])
+        columns = {}
+        for field in BATCH_FIELDS:
+            values = data.get(field)
+            if values is None:
+                values = [None] * size
+            if not isinstance(values, list) or len(values) != size:
+                raise BatchError(f"Column '{field}' must be a list of {size} values")
+            columns[field] = values
+        return columns
+    raise BatchError("Expected a list of people, {'people': [...]} or columnar arrays")
+
+
+def columns_from_csv(text: str) -> Dict[str, List]:
+    """Read a CSV with a header row (weight, height and optional id, age, gender, activity_level)"""
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or not {'weight', 'height'} <= {f.strip().lower() for f in reader.fieldnames}:
+        raise BatchError('CSV must have a header row with weight and height columns')
+    rows = [{key.strip().lower(): (value.strip() if isinstance(value, str) else value)
+             for key, value in row.items() if key} for row in reader]
+    return {field: [row.get(field) or None for row in rows] for field in BATCH_FIELDS}
+
+
+def compute_batch(columns: Dict[str, List]) -> Dict[str, 'np.ndarray']:
+    """
+    Vectorized BMI, category, BMR and TDEE for a whole batch. Missing age,
+    gender and activity level use the same defaults as the single-person routes.
+    """
+    import numpy as np
+    size = len(columns['weight'])
+    if size > MAX_BATCH_ROWS:
+        raise BatchError(f'Batch too large ({size} rows, max {MAX_BATCH_ROWS})')
+
+    weight = _to_float_array(columns['weight'])
+    height_cm = _to_float_array(columns['height'])
+    age = _to_float_array([30 if a in (None, '') else a for a in columns['age']])
+    genders = np.asarray([str(g or 'male').strip().lower() for g in columns['gender']])
+    activity = [normalize_activity_level(a) for a in columns['activity_level']]
+
+    valid = np.isfinite(weight) & np.isfinite(height_cm) & np.isfinite(age) & (weight > 0) & (height_cm > 0)
+
+    height_m = height_cm / 100
+    bmi = np.divide(weight, height_m ** 2, out=np.full(size, np.nan), where=valid)
+    category_index = np.searchsorted(BMI_THRESHOLDS, np.where(valid, bmi, 0), side='right')
+
+    bmr = 10 * weight + 6.25 * height_cm - 5 * np.floor(age) + np.where(genders == 'male', 5, -161)
+    multipliers = np.fromiter((activity_multiplier(a) for a in activity),
+                              dtype=np.float64, count=size)
+    tdee = bmr * multipliers
+
+    return {
+        'valid': valid,
+        'bmi': np.round(bmi, 1),
+        'category_index': category_index,
+        'bmr': np.where(valid, np.round(bmr), np.nan),
+        'daily_calories': np.where(valid, np.round(tdee), np.nan),
+        'activity_level': activity
+    }
+
+
+def batch_rows(columns: Dict[str, List], result: Dict[str, 'np.ndarray'], fields: List[str]) -> List[Dict]:
+    """Turn batch results back into one dict per person (invalid rows carry an error)"""
+    ids = columns['id']
+    valid = result['valid'].tolist()
+    values = {
+        'bmi': result['bmi'].tolist(),
+        'category': [BMI_CATEGORIES[i] for i in result['category_index'].tolist()],
+        'color': [BMI_COLORS[i] for i in result['category_index'].tolist()],
+        'bmr': result['bmr'].tolist(),
+        'daily_calories': result['daily_calories'].tolist(),
+        'activity_level': result['activity_level']
+    }
+    rows = []
+    for position, ok in enumerate(valid):
+        row = {'index': position}
+        if ids[position] is not None:
+            row['id'] = ids[position]
+        if ok:
+            for field in fields:
+                value = values[field][position]
+                row[field] = int(value) if field in ('bmr', 'daily_calories') else value
+        else:
+            row['error'] = 'Invalid weight, height or age'
+        rows.append(row)
+    return rows
+
+
+def rows_to_csv(rows: List[Dict], fields: List[str]) -> str:
+    """Serialize batch rows as CSV"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=['index', 'id'] + fields + ['error'], extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+    return output.getvalue()
+
+
+def batch_summary(result: Dict[str, 'np.ndarray']) -> Dict[str, Optional[float]]:
+    """Aggregate counts per BMI category and mean values over the valid rows"""
+    import numpy as np
+    valid = result['valid']
+    counts = np.bincount(result['category_index'][valid], minlength=len(BMI_CATEGORIES))
+    return {
+        'count': int(valid.size),
+        'valid': int(valid.sum()),
+        'invalid': int(valid.size - valid.sum()),
+        'categories': dict(zip(BMI_CATEGORIES, counts.tolist())),
+        'mean_bmi': round(float(np.nanmean(result['bmi'])), 1) if valid.any() else None,
+        'mean_daily_calories': round(float(np.nanmean(result['daily_calories']))) if valid.any() else None
+    }
@@ -0,0 +1,139 @@
+# HTTP caching (ETags, Cache-Control) and response compression
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from flask import request, render_template, make_response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are not worth the CPU or the extra headers
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 500))
+COMPRESS_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml'
+}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Browser cache lifetime for template-only pages (revalidated with ETags afterwards)
+PAGE_MAX_AGE = int(os.getenv('PAGE_CACHE_MAX_AGE', 300))
+
+_page_cache = {}
+_page_lock = threading.Lock()
+_compressed_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+_compressed_lock = threading.Lock()
+_COMPRESSED_CACHE_SIZE = 256
+
+
+def make_etag(*parts) -> Optional[str]:
+    """Strong ETag from identifying parts (e.g. table, key, row version); None if any part is unknown"""
+    if any(part is None for part in parts):
+        return None
+    return hashlib.sha1("|".join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+
+
+def _client_etags():
+    """ETags from If-None-Match with any content-encoding suffix stripped"""
+    return {tag.split('-')[0] for tag in request.if_none_match.as_set()}
+
+
+def not_modified(etag: Optional[str], cache_control: str = 'private, no-cache'):
+    """Return a 304 response when the client already holds `etag`, otherwise None"""
+    if not etag or (etag not in _client_etags() and not request.if_none_match.star_tag):
+        return None
+    response = make_response('', 304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def with_etag(response, etag: Optional[str], cache_control: str = 'private, no-cache'):
+    """Attach an ETag and Cache-Control policy to a response"""
+    if etag:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def render_cached_page(template_name: str, max_age: int = PAGE_MAX_AGE):
+    """
+    Serve a page whose HTML depends only on its template and the asset build.
+    The rendered HTML and its ETag are kept per process and keyed on both, so
+    repeat requests skip rendering, revalidations get a 304 with no body, and
+    a new asset build re-renders pages instead of serving stale asset URLs.
+    """
+    from flask import current_app
+    import assets
+    key = (template_name, assets.build_id())
+    cached = None if current_app.debug else _page_cache.get(key)
+    if cached is None:
+        html = render_template(template_name)
+        cached = (html, make_etag('page', template_name, hashlib.sha1(html.encode('utf-8')).hexdigest()))
+        with _page_lock:
+            # Pages of superseded builds are never asked for again
+            for stale in [k for k in _page_cache if k[1] != key[1]]:
+                del _page_cache[stale]
+            _page_cache[key] = cached
+    html, etag = cached
+    cache_control = f'private, max-age={max_age}'
+    return not_modified(etag, cache_control) or with_etag(make_response(html), etag, cache_control)
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response):
+    """after_request hook: gzip/brotli-encode large text responses the client accepts"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        encoding = 'br'
+    elif accepted['gzip']:
+        encoding = 'gzip'
+    else:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    etag, _ = response.get_etag()
+    cache_key = (etag, encoding) if etag else None
+    compressed = None
+    if cache_key:
+        with _compressed_lock:
+            compressed = _compressed_cache.get(cache_key)
+    if compressed is None:
+        compressed = _compress(data, encoding)
+        if cache_key:
+            with _compressed_lock:
+                _compressed_cache[cache_key] = compressed
+                while len(_compressed_cache) > _COMPRESSED_CACHE_SIZE:
+                    _compressed_cache.popitem(last=False)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        # A strong ETag must differ per encoding; not_modified() strips the suffix
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+
+def init_app(app):
+    """Register response compression on a Flask app"""
+    app.after_request(compress_response)
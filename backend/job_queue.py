@@ -0,0 +1,312 @@
+# Background job queue with SQLite-persisted state and stage-by-stage progress
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ('succeeded', 'failed')
+
+
+class JobContext:
+    """Handed to a job function so it can report which stage it is in"""
+
+    def __init__(self, owner: 'JobQueue', job: Dict):
+        self._owner = owner
+        self.job = job
+        self._stage_started: Optional[float] = None
+
+    def stage(self, name: str):
+        """Mark the previous stage done and start `name`"""
+        self._owner._advance(self.job, name, self)
+
+
+class JobQueue:
+    """
+    Runs registered job kinds on a pool of worker threads. Every state change is
+    written through to storage (DatabaseService) so a restarted process can pick
+    up queued jobs and jobs whose worker died mid-run; running processes rescan
+    for such jobs every stale_after / 2. Falls back to memory when the storage
+    has no job table.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 100, max_attempts: int = 2,
+                 stale_after: float = 300.0, max_streams: int = 4, stream_timeout: float = 30.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.stale_after = stale_after
+        self.max_streams = max_streams
+        self.stream_timeout = stream_timeout
+        self._streams = 0
+        self.storage = None
+        self._handlers: Dict[str, Callable] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._pending = set()  # ids in self._queue, so rescans do not enqueue them twice
+        self._next_rescan = 0.0
+        self._memory: Dict[str, Dict] = {}
+        self._threads: List[threading.Thread] = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+        self.stats = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'recovered': 0, 'rejected': 0,
+                      'streams_rejected': 0}
+
+    # --- setup ------------------------------------------------------------------
+
+    def register(self, kind: str, func: Callable[[Dict, JobContext], Dict]):
+        """Register the function that executes jobs of `kind`"""
+        self._handlers[kind] = func
+
+    def attach_storage(self, storage):
+        """Use a DatabaseService (may be a lazy proxy; touched only when jobs run)"""
+        self.storage = storage
+
+    def _persistent(self) -> bool:
+        return self.storage is not None and hasattr(self.storage, 'claim_job')
+
+    def start(self):
+        """Start the worker threads in this process and re-enqueue unfinished jobs"""
+        with self._lock:
+            if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+                return
+            # After a fork the parent's threads and queue contents do not exist here
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            self._pending = set()
+            self._next_rescan = time.time() + self.stale_after / 2
+            self._threads = [
+                threading.Thread(target=self._work, name=f"job-worker-{n}", daemon=True)
+                for n in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+        self.recover()
+
+    def recover(self) -> int:
+        """Re-enqueue queued jobs and running jobs whose worker stopped reporting"""
+        if not self._persistent():
+            return 0
+        job_ids = [job_id for job_id in self.storage.get_recoverable_jobs(time.time() - self.stale_after)
+                   if self._enqueue(job_id)]
+        if job_ids:
+            self._count('recovered', len(job_ids))
+            logger.info(f"♻️ Recovered {len(job_ids)} unfinished job(s)")
+        return len(job_ids)
+
+    # --- public API ---------------------------------------------------------------
+
+    def submit(self, kind: str, payload: Dict, user_id=None) -> Optional[Dict]:
+        """Persist and enqueue a job; returns None when the queue is full"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self.start()
+        if self._queue.qsize() >= self.max_pending:
+            self._count('rejected')
+            return None
+
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'user_id': user_id,
+            'status': 'queued',
+            'stage': None,
+            'progress': [],
+            'payload': payload,
+            'result': None,
+            'error': None,
+            'attempts': 0,
+            'worker': None,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'updated_at': now
+        }
+        if self._persistent():
+            result = self.storage.save_job(job)
+            if result.get('status') != 'success':
+                logger.error(f"Job persist failed, keeping it in memory: {result.get('message')}")
+                self._memory[job['id']] = job
+        else:
+            self._memory[job['id']] = job
+            self._prune_memory()
+        self._count('submitted')
+        self._enqueue(job['id'])
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Current job state (from memory or storage)"""
+        if job_id in self._memory:
+            return dict(self._memory[job_id])
+        if self._persistent():
+            return self.storage.get_job(job_id)
+        return None
+
+    def open_stream(self) -> bool:
+        """
+        Take one of `max_streams` stream slots. Each open stream holds a server
+        thread, so past the cap callers are told to poll get() instead.
+        """
+        with self._lock:
+            if self._streams >= self.max_streams:
+                self.stats['streams_rejected'] += 1
+                return False
+            self._streams += 1
+            return True
+
+    def close_stream(self):
+        """Free a slot taken by open_stream"""
+        with self._lock:
+            self._streams -= 1
+
+    def stream(self, job_id: str, timeout: Optional[float] = None, poll_interval: float = 1.0) -> Iterator[Dict]:
+        """
+        Yield the job each time it changes until it finishes or `timeout` (default
+        stream_timeout) passes. Local updates wake the stream immediately; jobs run
+        by another process are picked up by polling.
+        """
+        deadline = time.time() + (self.stream_timeout if timeout is None else timeout)
+        last_seen = None
+        while time.time() < deadline:
+            job = self.get(job_id)
+            if job is None:
+                return
+            version = (job['status'], job['stage'], job['updated_at'])
+            if version != last_seen:
+                last_seen = version
+                yield job
+            if job['status'] in TERMINAL_STATES:
+                return
+            with self._changed:
+                self._changed.wait(poll_interval)
+
+    def get_stats(self) -> Dict:
+        """Queue depth, worker count and lifetime counters for this process"""
+        return dict(self.stats,
+                    pending=self._queue.qsize(),
+                    workers=self.workers,
+                    streams=self._streams,
+                    max_streams=self.max_streams,
+                    workers_alive=sum(1 for t in self._threads if t.is_alive()),
+                    storage='sqlite' if self._persistent() else 'memory')
+
+    # --- execution ------------------------------------------------------------------
+
+    def _prune_memory(self, keep: int = 1000):
+        """Drop the oldest finished in-memory jobs once there are more than `keep`"""
+        finished = [job_id for job_id, job in self._memory.items() if job['status'] in TERMINAL_STATES]
+        for job_id in finished[:max(0, len(self._memory) - keep)]:
+            self._memory.pop(job_id, None)
+
+    def _enqueue(self, job_id: str) -> bool:
+        with self._lock:
+            if job_id in self._pending:
+                return False
+            self._pending.add(job_id)
+        self._queue.put(job_id)
+        return True
+
+    def _rescan_if_due(self):
+        """Recover jobs of dead workers every stale_after / 2; one thread per process does the scan"""
+        now = time.time()
+        with self._lock:
+            if now < self._next_rescan:
+                return
+            self._next_rescan = now + self.stale_after / 2
+        try:
+            self.recover()
+        except Exception as e:
+            logger.error(f"Job rescan error: {e}")
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _save(self, job: Dict, **fields):
+        fields['updated_at'] = time.time()
+        job.update(fields)
+        if job['id'] in self._memory:
+            self._memory[job['id']] = dict(job)
+        else:
+            self.storage.update_job(job['id'], fields)
+        with self._changed:
+            self._changed.notify_all()
+
+    def _claim(self, job_id: str) -> Optional[Dict]:
+        worker = f"{os.getpid()}:{threading.current_thread().name}"
+        if job_id in self._memory:
+            job = self._memory[job_id]
+            if job['status'] != 'queued':
+                return None
+            job.update(status='running', worker=worker, attempts=job['attempts'] + 1, updated_at=time.time())
+            return dict(job)
+        now = time.time()
+        if not self.storage.claim_job(job_id, worker, now - self.stale_after, now):
+            return None  # another worker got it first
+        return self.storage.get_job(job_id)
+
+    def _advance(self, job: Dict, stage: Optional[str], context: JobContext, outcome: str = 'done'):
+        now = time.time()
+        progress = list(job.get('progress') or [])
+        if progress and progress[-1]['status'] == 'running':
+            progress[-1] = dict(progress[-1], status=outcome,
+                                duration_ms=round((now - context._stage_started) * 1000, 1))
+        if stage:
+            progress.append({'stage': stage, 'status': 'running',
+                             'started_at': datetime.now().isoformat(timespec='seconds')})
+        context._stage_started = now
+        self._save(job, stage=stage or job.get('stage'), progress=progress)
+
+    def _work(self):
+        while True:
+            try:
+                job_id = self._queue.get(timeout=max(self.stale_after / 2, 1.0))
+            except queue.Empty:
+                self._rescan_if_due()
+                continue
+            with self._lock:
+                self._pending.discard(job_id)
+            try:
+                self._run(job_id)
+            except Exception as e:
+                logger.error(f"Job worker error on {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+            self._rescan_if_due()
+
+    def _run(self, job_id: str):
+        job = self._claim(job_id)
+        if job is None:
+            return
+        if job['attempts'] > self.max_attempts:
+            self._save(job, status='failed', error=f"Gave up after {self.max_attempts} attempt(s)")
+            self._count('failed')
+            return
+
+        context = JobContext(self, job)
+        try:
+            result = self._handlers[job['kind']](job['payload'], context)
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} ({job['kind']}) failed: {e}")
+            self._advance(job, None, context, outcome='failed')
+            self._save(job, status='failed', error=str(e))
+            self._count('failed')
+            return
+        self._advance(job, None, context)
+        self._save(job, status='succeeded', stage='done', result=result)
+        self._count('succeeded')
+
+
+# Global job queue instance
+job_queue = JobQueue(
+    workers=int(os.getenv('JOB_WORKERS', 2)),
+    max_pending=int(os.getenv('JOB_MAX_PENDING', 100)),
+    max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', 2)),
+    stale_after=float(os.getenv('JOB_STALE_AFTER', 300)),
+    max_streams=int(os.getenv('JOB_MAX_STREAMS', 4)),
+    stream_timeout=float(os.getenv('JOB_STREAM_TIMEOUT', 30))
+)
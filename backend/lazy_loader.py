@@ -0,0 +1,78 @@
+# Lazy, on-first-use loading of heavy modules and services
+import importlib
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyObject:
+    """
+    Proxy that builds its target the first time it is used (attribute access,
+    call or truth test). Loading is thread-safe and happens at most once.
+    """
+
+    def __init__(self, loader: Callable[[], Any], name: Optional[str] = None):
+        object.__setattr__(self, '_loader', loader)
+        object.__setattr__(self, '_name', name or getattr(loader, '__name__', 'lazy'))
+        object.__setattr__(self, '_target', None)
+        object.__setattr__(self, '_loaded', False)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    object.__setattr__(self, '_target', self._loader())
+                    object.__setattr__(self, '_loaded', True)
+        return self._target
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._get()(*args, **kwargs)
+
+    def __bool__(self):
+        return bool(self._get())
+
+    def __repr__(self):
+        state = repr(self._target) if self._loaded else 'not loaded'
+        return f"<LazyObject {self._name}: {state}>"
+
+
+def lazy_import(module_name: str, attribute: Optional[str] = None, fallback: Any = None) -> LazyObject:
+    """
+    Lazily import `module_name` (and optionally one of its attributes). When the
+    import fails with ImportError the fallback is used instead, mirroring the
+    app's try/except import style.
+    """
+    def loader():
+        try:
+            module = importlib.import_module(module_name)
+            return getattr(module, attribute) if attribute else module
+        except ImportError:
+            logger.warning(f"⚠️ {module_name} module not found. Using fallback.")
+            return fallback
+    return LazyObject(loader, f"{module_name}.{attribute}" if attribute else module_name)
+
+
+def ensure_loaded(obj: Any) -> Any:
+    """Force a LazyObject to load now (e.g. at worker boot); other objects pass through"""
+    return obj._get() if isinstance(obj, LazyObject) else obj
+
+
+def reset_lazy(obj: Any):
+    """Drop a LazyObject's cached target so the next use loads it again"""
+    if isinstance(obj, LazyObject):
+        with obj._lock:
+            object.__setattr__(obj, '_target', None)
+            object.__setattr__(obj, '_loaded', False)
@@ -0,0 +1,238 @@
+# Shared OpenAI client with deadlines, jittered retries and a circuit breaker
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from llm_usage import instrument_client
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailableError(Exception):
+    """Raised when an OpenAI call cannot be completed; callers should use their fallback"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised without calling OpenAI while the circuit breaker is open"""
+
+
+class LLMCallError(LLMUnavailableError):
+    """Raised when a call failed after retries or ran out of its deadline"""
+
+
+def _retryable_errors():
+    try:
+        import openai
+        return (openai.APITimeoutError, openai.APIConnectionError,
+                openai.RateLimitError, openai.InternalServerError)
+    except ImportError:
+        return ()
+
+
+class CircuitBreaker:
+    """
+    Rolling-window error-rate breaker. Opens when at least `min_calls` calls in
+    the last `window` seconds failed at `failure_rate` or more, rejects calls for
+    `cooldown` seconds, then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, failure_rate: float = 0.5, min_calls: int = 5,
+                 window: float = 60.0, cooldown: float = 30.0):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._outcomes: deque = deque()
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def allow(self) -> bool:
+        """Return whether a call may proceed right now"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == 'open' and now - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'closed':
+                return True
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, success: bool):
+        """Record a call outcome and trip or reset the breaker"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == 'half_open':
+                self._trial_in_flight = False
+                if success:
+                    self.state = 'closed'
+                    self._outcomes.clear()
+                else:
+                    self._open(now)
+                return
+            self._outcomes.append((now, success))
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (self.state == 'closed' and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open(now)
+
+    def _open(self, now: float):
+        self.state = 'open'
+        self.opened_at = now
+        self.times_opened += 1
+        logger.warning("⚠️ OpenAI circuit breaker opened, failing fast to fallbacks")
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                'state': self.state,
+                'window_calls': len(self._outcomes),
+                'window_failures': failures,
+                'times_opened': self.times_opened,
+                'rejected_calls': self.rejected,
+                'retry_in_seconds': round(max(0.0, self.cooldown - (now - self.opened_at)), 1) if self.state == 'open' else 0
+            }
+
+
+class _ResilientCompletions:
+    def __init__(self, owner: 'ResilientClient'):
+        self._owner = owner
+
+    def create(self, deadline: Optional[float] = None, **kwargs):
+        return self._owner.complete(deadline=deadline, **kwargs)
+
+
+class _ResilientChat:
+    def __init__(self, owner: 'ResilientClient'):
+        self.completions = _ResilientCompletions(owner)
+
+
+class ResilientClient:
+    """
+    Drop-in wrapper exposing `chat.completions.create(...)` that enforces a total
+    deadline per call, retries retryable errors with jittered exponential backoff
+    and consults the circuit breaker before touching the network.
+    """
+
+    def __init__(self, client, breaker: CircuitBreaker, deadline: float = 20.0,
+                 attempt_timeout: float = 10.0, max_retries: int = 2, backoff: float = 0.5):
+        self._client = client
+        self.breaker = breaker
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.retries = 0
+        self.chat = _ResilientChat(self)
+
+    def complete(self, deadline: Optional[float] = None, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError("OpenAI circuit breaker is open")
+
+        retryable = _retryable_errors()
+        expires = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            remaining = expires - time.monotonic()
+            try:
+                response = self._client.chat.completions.create(
+                    timeout=max(0.1, min(self.attempt_timeout, remaining)), **kwargs
+                )
+                self.breaker.record(True)
+                return response
+            except retryable as e:
+                attempt += 1
+                sleep_for = random.uniform(0, self.backoff * (2 ** attempt))
+                if attempt > self.max_retries or time.monotonic() + sleep_for >= expires:
+                    self.breaker.record(False)
+                    raise LLMCallError(f"OpenAI call failed after {attempt} attempt(s): {e}") from e
+                self.retries += 1
+                time.sleep(sleep_for)
+            except Exception as e:
+                # Client-side errors (bad request, auth) say nothing about upstream health
+                self.breaker.record(True)
+                raise LLMCallError(f"OpenAI call rejected: {e}") from e
+
+    def get_state(self) -> Dict:
+        """Expose breaker and retry state for monitoring"""
+        return {
+            'circuit_breaker': self.breaker.snapshot(),
+            'retries': self.retries,
+            'deadline_seconds': self.deadline,
+            'attempt_timeout_seconds': self.attempt_timeout,
+            'max_retries': self.max_retries
+        }
+
+
+_client: Optional[ResilientClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> Optional[ResilientClient]:
+    """Return the process-wide OpenAI client, or None when OpenAI is not configured"""
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is not None:
+            return _client
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            logger.warning("⚠️ OpenAI API key not found")
+            return None
+        try:
+            import openai
+        except ImportError:
+            logger.warning("⚠️ OpenAI library not installed")
+            return None
+
+        attempt_timeout = float(os.getenv('OPENAI_ATTEMPT_TIMEOUT', 10))
+        # One underlying client (and HTTP connection pool) shared by every call site;
+        # retries are handled here so the SDK's own retry loop is disabled
+        raw_client = openai.OpenAI(api_key=api_key, timeout=attempt_timeout, max_retries=0)
+        _client = ResilientClient(
+            instrument_client(raw_client),
+            CircuitBreaker(
+                failure_rate=float(os.getenv('OPENAI_BREAKER_FAILURE_RATE', 0.5)),
+                min_calls=int(os.getenv('OPENAI_BREAKER_MIN_CALLS', 5)),
+                cooldown=float(os.getenv('OPENAI_BREAKER_COOLDOWN', 30))
+            ),
+            deadline=float(os.getenv('OPENAI_DEADLINE', 20)),
+            attempt_timeout=attempt_timeout,
+            max_retries=int(os.getenv('OPENAI_MAX_RETRIES', 2))
+        )
+        logger.info("✅ OpenAI client initialized")
+        return _client
+
+
+def reset_client():
+    """Forget the shared client so the next call builds a new one (used after fork)"""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+def get_client_state() -> Dict:
+    """Get the shared client's state, or a disabled marker when it is not configured"""
+    if _client is None:
+        return {'status': 'disabled'}
+    return dict(_client.get_state(), status='enabled')
@@ -0,0 +1,211 @@
+# Token, cost and latency accounting for OpenAI calls
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any
+
+from buffered_writer import BufferedWriter
+from metrics import openai_call_duration, openai_tokens_total
+
+# USD per 1M tokens (input, output); matched on the longest model-name prefix
+MODEL_PRICING = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4": (30.00, 60.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60)
+}
+
+# Stack of call-site labels; the innermost names the call, the outermost the pipeline
+_call_sites: contextvars.ContextVar = contextvars.ContextVar("llm_call_sites", default=())
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimate the USD cost of a completion from the pricing table"""
+    match = ""
+    for name in MODEL_PRICING:
+        if model.startswith(name) and len(name) > len(match):
+            match = name
+    if not match:
+        return 0.0
+    input_price, output_price = MODEL_PRICING[match]
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+@contextmanager
+def llm_call_site(name: str):
+    """Label every OpenAI call made inside the block with a call site"""
+    token = _call_sites.set(_call_sites.get() + (name,))
+    try:
+        yield
+    finally:
+        _call_sites.reset(token)
+
+
+def track_llm_call(name: str):
+    """Decorator form of llm_call_site"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with llm_call_site(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LLMUsageTracker(BufferedWriter):
+    """Buffers per-call usage records in memory and flushes them to SQLite periodically"""
+
+    save_method = 'save_llm_usage'
+    thread_name = 'llm-usage-flush'
+    label = 'LLM usage'
+    fallback_windows = 50
+
+    def __init__(self, flush_interval: float = 30.0, max_buffer: int = 200):
+        super().__init__(flush_interval, max_buffer)
+
+    def record(self, call_site: str, pipeline: str, model: str, prompt_tokens: int,
+               completion_tokens: int, latency_ms: float, outcome: str):
+        """Record a single OpenAI call"""
+        entry = {
+            'call_site': call_site,
+            'pipeline': pipeline,
+            'model': model,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'latency_ms': round(latency_ms, 2),
+            'cost_usd': estimate_cost(model, prompt_tokens, completion_tokens),
+            'outcome': outcome,
+            'created_at': datetime.now().isoformat(timespec='seconds')
+        }
+        openai_call_duration.observe(latency_ms / 1000, call_site, outcome)
+        if prompt_tokens or completion_tokens:
+            openai_tokens_total.inc(call_site, 'prompt', amount=prompt_tokens)
+            openai_tokens_total.inc(call_site, 'completion', amount=completion_tokens)
+        self._append(entry)
+
+    def records(self, since: datetime) -> List[Dict]:
+        """Return persisted and still-buffered records newer than `since`"""
+        persisted = []
+        if self.storage is not None and hasattr(self.storage, 'get_llm_usage'):
+            persisted = self.storage.get_llm_usage(since.isoformat(timespec='seconds'))
+        with self._lock:
+            buffered = [r for r in self._buffer if r['created_at'] >= since.isoformat(timespec='seconds')]
+        return persisted + buffered
+
+    def report(self, days: int = 7) -> Dict:
+        """Aggregate usage per call site with latency percentiles and daily cost"""
+        rows = self.records(datetime.now() - timedelta(days=days))
+
+        grouped: Dict[str, List[Dict]] = {}
+        for row in rows:
+            grouped.setdefault(row['call_site'], []).append(row)
+            if row.get('pipeline') and row['pipeline'] != row['call_site']:
+                grouped.setdefault(f"pipeline:{row['pipeline']}", []).append(row)
+
+        endpoints = {}
+        for call_site, items in grouped.items():
+            latencies = sorted(r['latency_ms'] for r in items)
+            errors = sum(1 for r in items if r['outcome'] != 'success')
+            endpoints[call_site] = {
+                'calls': len(items),
+                'errors': errors,
+                'models': sorted({r['model'] for r in items}),
+                'prompt_tokens': sum(r['prompt_tokens'] for r in items),
+                'completion_tokens': sum(r['completion_tokens'] for r in items),
+                'cost_usd': round(sum(r['cost_usd'] for r in items), 6),
+                'latency_ms': {
+                    'p50': percentile(latencies, 50),
+                    'p95': percentile(latencies, 95),
+                    'p99': percentile(latencies, 99),
+                    'max': latencies[-1]
+                }
+            }
+
+        daily_cost: Dict[str, Dict[str, float]] = {}
+        for row in rows:
+            day = daily_cost.setdefault(row['created_at'][:10], {})
+            day[row['call_site']] = round(day.get(row['call_site'], 0.0) + row['cost_usd'], 6)
+        for day in daily_cost.values():
+            day['total'] = round(sum(day.values()), 6)
+
+        return {
+            'window_days': days,
+            'total_calls': len(rows),
+            'total_cost_usd': round(sum(r['cost_usd'] for r in rows), 6),
+            'endpoints': endpoints,
+            'daily_cost': dict(sorted(daily_cost.items()))
+        }
+
+
+class _InstrumentedCompletions:
+    def __init__(self, completions, tracker: LLMUsageTracker):
+        self._completions = completions
+        self._tracker = tracker
+
+    def create(self, **kwargs):
+        sites = _call_sites.get()
+        call_site = sites[-1] if sites else 'unlabelled'
+        pipeline = sites[0] if sites else ''
+        model = kwargs.get('model', 'unknown')
+        start = time.perf_counter()
+        try:
+            response = self._completions.create(**kwargs)
+        except Exception as e:
+            self._tracker.record(call_site, pipeline, model, 0, 0,
+                                 (time.perf_counter() - start) * 1000, type(e).__name__)
+            raise
+        usage = getattr(response, 'usage', None)
+        self._tracker.record(
+            call_site, pipeline, getattr(response, 'model', None) or model,
+            getattr(usage, 'prompt_tokens', 0) or 0,
+            getattr(usage, 'completion_tokens', 0) or 0,
+            (time.perf_counter() - start) * 1000, 'success'
+        )
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+
+class _InstrumentedChat:
+    def __init__(self, chat, tracker: LLMUsageTracker):
+        self.completions = _InstrumentedCompletions(chat.completions, tracker)
+        self._chat = chat
+
+    def __getattr__(self, name):
+        return getattr(self._chat, name)
+
+
+class InstrumentedOpenAI:
+    """Transparent proxy over an openai.OpenAI client that records chat completion usage"""
+
+    def __init__(self, client, tracker: LLMUsageTracker):
+        self._client = client
+        self.chat = _InstrumentedChat(client.chat, tracker)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def instrument_client(client, tracker: Optional[LLMUsageTracker] = None):
+    """Wrap an OpenAI client so every chat completion is accounted for"""
+    if client is None or isinstance(client, InstrumentedOpenAI):
+        return client
+    return InstrumentedOpenAI(client, tracker or usage_tracker)
+
+
+# Global usage tracker instance
+usage_tracker = LLMUsageTracker()
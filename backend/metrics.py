@@ -0,0 +1,347 @@
+# Request, database and OpenAI metrics exposed in Prometheus text format
+import functools
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds: fine-grained for cheap routes, coarse for OpenAI-bound ones
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# With several gunicorn workers each process keeps its own registry; when this is set,
+# workers write snapshots here and /metrics merges them into one view
+MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR')
+# Counters of exited workers, folded together by the gunicorn master (child_exit)
+RETIRED_FILE = 'retired_workers.json'
+FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {json.dumps(list(k)): v for k, v in self._values.items()}
+
+    @staticmethod
+    def merge(into: Dict, other: Dict):
+        for key, value in other.items():
+            into[key] = into.get(key, 0.0) + value
+
+    def render(self, values: Dict) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, tuple(json.loads(k)))} {_format_value(v)}"
+                for k, v in sorted(values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        # Per-bucket (non-cumulative) counts keep observe() O(log buckets)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, *labels):
+        """Context manager observing the duration of the block"""
+        return _Timer(self, labels)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {json.dumps(list(k)): [list(v[0]), v[1], v[2]] for k, v in self._values.items()}
+
+    @staticmethod
+    def merge(into: Dict, other: Dict):
+        for key, (counts, total, count) in other.items():
+            if key not in into:
+                into[key] = [list(counts), total, count]
+                continue
+            entry = into[key]
+            entry[0] = [a + b for a, b in zip(entry[0], counts)]
+            entry[1] += total
+            entry[2] += count
+
+    def render(self, values: Dict) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(values.items()):
+            labels = tuple(json.loads(key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {repr(float(total))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Tuple):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start, *self._labels)
+
+
+class MetricsRegistry:
+    """Holds counters and histograms plus gauges computed at scrape time"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], Optional[float]]]] = {}
+        self._flush_thread: Optional[threading.Thread] = None
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], Optional[float]]):
+        """Register a gauge whose value is read from `callback` on every scrape (this process only)"""
+        self._gauges[name] = (documentation, callback)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def _collect(self) -> Dict[str, Dict]:
+        """This process's values, merged with other workers' snapshots in multi-process mode"""
+        if not MULTIPROC_DIR:
+            return self.snapshot()
+        self.write_snapshot()
+        merged: Dict[str, Dict] = {}
+        retired = self._read_retired()
+        self._merge(merged, retired['metrics'])
+        for path in glob.glob(os.path.join(MULTIPROC_DIR, 'metrics_*.json')):
+            if self._snapshot_pid(path) in retired['pids']:
+                continue  # already counted in the retired total, about to be deleted
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            self._merge(merged, snapshot)
+        return merged
+
+    def _merge(self, into: Dict[str, Dict], snapshot: Dict[str, Dict]):
+        for name, values in snapshot.items():
+            if name in self._metrics:
+                self._metrics[name].merge(into.setdefault(name, {}), values)
+
+    @staticmethod
+    def _snapshot_pid(path: str) -> Optional[int]:
+        try:
+            return int(os.path.basename(path)[len('metrics_'):-len('.json')])
+        except ValueError:
+            return None
+
+    def _read_retired(self) -> Dict:
+        try:
+            with open(os.path.join(MULTIPROC_DIR, RETIRED_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'pids': [], 'metrics': {}}
+
+    def _write_retired(self, retired: Dict):
+        path = os.path.join(MULTIPROC_DIR, RETIRED_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(retired, f)
+        os.replace(path + '.tmp', path)
+
+    def retire_worker(self, pid: int):
+        """
+        Fold an exited worker's last snapshot into the retired total and delete
+        the snapshot, so recycled workers neither vanish from the counters nor
+        leave files behind. Called by the gunicorn master, one worker at a time.
+        """
+        if not MULTIPROC_DIR:
+            return
+        path = os.path.join(MULTIPROC_DIR, f'metrics_{pid}.json')
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except OSError:
+            return
+        except ValueError:
+            snapshot = {}
+        try:
+            retired = self._read_retired()
+            self._merge(retired['metrics'], snapshot)
+            # Readers skip the pid while both its file and the total that includes it exist
+            self._write_retired({'pids': [pid], 'metrics': retired['metrics']})
+            os.remove(path)
+            self._write_retired({'pids': [], 'metrics': retired['metrics']})
+        except OSError as e:
+            logger.error(f"Metrics retire of worker {pid} failed: {e}")
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        collected = self._collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(collected.get(name, {})))
+        for name, (documentation, callback) in self._gauges.items():
+            try:
+                value = callback()
+            except Exception as e:
+                logger.error(f"Metrics gauge {name} failed: {e}")
+                continue
+            if value is None:
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def write_snapshot(self):
+        """Write this process's values for other workers' /metrics to merge"""
+        if not MULTIPROC_DIR:
+            return
+        path = os.path.join(MULTIPROC_DIR, f'metrics_{os.getpid()}.json')
+        try:
+            with open(path + '.tmp', 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            logger.error(f"Metrics snapshot write failed: {e}")
+
+    def start_snapshot_thread(self):
+        """Periodically persist this worker's snapshot (multi-process mode only)"""
+        if not MULTIPROC_DIR or (self._flush_thread and self._flush_thread.is_alive()):
+            return
+        os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+        def loop():
+            while True:
+                time.sleep(FLUSH_INTERVAL)
+                self.write_snapshot()
+
+        self._flush_thread = threading.Thread(target=loop, name='metrics-snapshot', daemon=True)
+        self._flush_thread.start()
+
+
+# Global registry and the application's metrics
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    'http_requests_total', 'HTTP requests by route, method and status', ('route', 'method', 'status'))
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route and method', ('route', 'method'))
+db_query_duration = registry.histogram(
+    'db_query_duration_seconds', 'DatabaseService method latency', ('method',))
+db_errors_total = registry.counter(
+    'db_errors_total', 'DatabaseService errors: raised, returned as status=error or caught behind a fallback',
+    ('method',))
+openai_call_duration = registry.histogram(
+    'openai_call_duration_seconds', 'OpenAI chat completion latency by call site and outcome', ('call_site', 'outcome'))
+openai_tokens_total = registry.counter(
+    'openai_tokens_total', 'OpenAI tokens by call site and kind', ('call_site', 'kind'))
+
+
+def instrument_methods(cls, histogram: Histogram = db_query_duration, errors: Counter = db_errors_total):
+    """
+    Time every public method of a class (used for DatabaseService) and count its
+    errors: exceptions and {'status': 'error'} results, since DatabaseService
+    reports most failures by returning one instead of raising.
+    """
+    for name, attribute in list(vars(cls).items()):
+        if name.startswith('_') or not callable(attribute):
+            continue
+
+        def wrap(func, label):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                except Exception:
+                    errors.inc(label)
+                    raise
+                else:
+                    if isinstance(result, dict) and result.get('status') == 'error':
+                        errors.inc(label)
+                    return result
+                finally:
+                    histogram.observe(time.perf_counter() - start, label)
+            return wrapper
+
+        setattr(cls, name, wrap(attribute, name))
+    return cls
+
+
+def init_app(app):
+    """Record per-route request counts, status codes and latency"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            # Label by URL rule, not path, so cardinality stays bounded
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            http_request_duration.observe(time.perf_counter() - start, route, request.method)
+            http_requests_total.inc(route, request.method, str(response.status_code))
+        return response
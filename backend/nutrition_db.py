@@ -0,0 +1,481 @@
+# Local nutrition database: USDA-style CSV compiled to a memory-mapped columnar matrix with fuzzy name lookup
+# Usage (from backend/): python nutrition_db.py build | python nutrition_db.py lookup "2 cups rice" "1 egg"
+import csv
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from lazy_loader import LazyObject
+from recipe_index import _normalize_ingredient
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+# Source table: one row per food, nutrients per 100 g
+NUTRITION_CSV = os.getenv('NUTRITION_CSV', os.path.join(DATA_DIR, 'nutrition.csv'))
+# Compiled output prefix: <prefix>.npy (matrix) and <prefix>.json (names); rebuilt when the CSV changes
+NUTRITION_DB = os.getenv('NUTRITION_DB', os.path.join(DATA_DIR, 'nutrition'))
+# Minimum character-trigram similarity (Dice) for a misspelled name to match
+NUTRITION_MATCH_THRESHOLD = float(os.getenv('NUTRITION_MATCH_THRESHOLD', 0.6))
+# A recipe's computed calories replace the model's only when this share of its lines matched...
+NUTRITION_MIN_COVERAGE = float(os.getenv('NUTRITION_MIN_COVERAGE', 0.7))
+# ...including its first lines, where recipes list the main ingredients
+NUTRITION_MAIN_INGREDIENTS = int(os.getenv('NUTRITION_MAIN_INGREDIENTS', 3))
+
+NUTRIENTS = ('calories', 'protein_g', 'carbs_g', 'fat_g', 'fiber_g', 'sugar_g', 'sodium_mg')
+# Stored after the nutrients: grams in one piece/portion, and g/ml for volume measures
+COLUMNS = NUTRIENTS + ('unit_g', 'density')
+UNIT_G, DENSITY = len(NUTRIENTS), len(NUTRIENTS) + 1
+
+UNIT_GRAMS = {'g': 1.0, 'gr': 1.0, 'gram': 1.0, 'kg': 1000.0, 'kilogram': 1000.0, 'mg': 0.001,
+              'oz': 28.35, 'ounce': 28.35, 'lb': 453.6, 'lbs': 453.6, 'pound': 453.6,
+              'can': 400.0, 'tin': 400.0, 'handful': 30.0, 'bunch': 100.0, 'pinch': 0.4, 'dash': 0.6}
+UNIT_ML = {'ml': 1.0, 'milliliter': 1.0, 'millilitre': 1.0, 'l': 1000.0, 'liter': 1000.0, 'litre': 1000.0,
+           'cup': 240.0, 'tbsp': 15.0, 'tbs': 15.0, 'tablespoon': 15.0, 'tsp': 5.0, 'teaspoon': 5.0,
+           'pint': 473.0, 'quart': 946.0}
+# Multiples of the food's own unit_g
+UNIT_COUNT = {'piece', 'whole', 'clove', 'slice', 'fillet', 'breast', 'head', 'stalk', 'sprig', 'leaf',
+              'portion', 'serving', 'medium', 'large', 'small', 'ear', 'bowl'}
+
+_FRACTION_CHARS = {'½': ' 1/2', '⅓': ' 1/3', '⅔': ' 2/3', '¼': ' 1/4', '¾': ' 3/4', '⅛': ' 1/8'}
+_NUMBER = r'\d+\s+\d+/\d+|\d+/\d+|\d*\.\d+|\d+'
+_QUANTITY_RE = re.compile(rf'^\s*({_NUMBER})(?:\s*(?:-|–|to)\s*({_NUMBER}))?\s*')
+_UNIT_RE = re.compile(r'^([a-z]+)\.?(?:\s+|$)(?:of\s+)?')
+_PAREN_RE = re.compile(r'\([^)]*\)')
+# Listed without an amount these contribute nothing worth counting
+_NEGLIGIBLE_RE = re.compile(r'\b(to taste|optional|for garnish|to garnish|for serving)\b')
+_DISH_SPLIT_RE = re.compile(r'\s*(?:\bwith\b|\band\b|\bor\b|&|,|\+|/)\s*')
+
+
+def _number(text: str) -> float:
+    total = 0.0
+    for part in text.split():
+        if '/' in part:
+            numerator, denominator = part.split('/')
+            total += float(numerator) / float(denominator) if float(denominator) else 0.0
+        else:
+            total += float(part)
+    return total
+
+
+def _key(name: str) -> str:
+    """Normalized lookup key; dataset names and queries go through the same steps"""
+    words = _normalize_ingredient(name).split()
+    # Finish what the plural 's' strip started: tomatoes -> tomatoe -> tomato, berries -> berrie -> berry
+    words = [w[:-2] + 'y' if w.endswith('ie') and len(w) > 4 else w[:-1] if w.endswith('oe') else w for w in words]
+    return " ".join(words)
+
+
+def _trigrams(key: str) -> set:
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_quantity(line: str) -> Tuple[Optional[float], Optional[str], str]:
+    """Split "1 1/2 cups rice, rinsed" into (1.5, 'cup', 'rice'); quantity/unit are None when absent"""
+    text = str(line).lower()
+    for char, replacement in _FRACTION_CHARS.items():
+        text = text.replace(char, replacement)
+    text = _PAREN_RE.sub(' ', text).strip()
+    quantity = None
+    if text.startswith(('a ', 'an ')):
+        quantity, text = 1.0, text.split(' ', 1)[1]
+    match = _QUANTITY_RE.match(text)
+    if match:
+        quantity = _number(match.group(1))
+        if match.group(2):
+            quantity = (quantity + _number(match.group(2))) / 2
+        text = text[match.end():]
+    unit = None
+    match = _UNIT_RE.match(text)
+    if match:
+        word = match.group(1)
+        if word not in UNIT_GRAMS and word not in UNIT_ML and word not in UNIT_COUNT and word.endswith('s'):
+            word = word[:-1]
+        if (word in UNIT_GRAMS or word in UNIT_ML or word in UNIT_COUNT) and text[match.end():].strip():
+            unit, text = word, text[match.end():]
+    name = text.split(',')[0].strip()
+    return quantity, unit, name
+
+
+def build(csv_path: str = NUTRITION_CSV, prefix: str = NUTRITION_DB) -> Dict:
+    """
+    Compile the CSV into <prefix>.<build>.npy (float32, one contiguous row per
+    column) and the index <prefix>.json naming that matrix. Each build writes
+    its own matrix file and replacing the index is the single commit point, so
+    concurrent builds (one per gunicorn worker) and readers never see a
+    matrix paired with another build's names.
+    """
+    names, aliases, rows = [], [], []
+    with open(csv_path, newline='', encoding='utf-8') as handle:
+        for record in csv.DictReader(handle):
+            names.append(record['name'].strip())
+            aliases.append([a.strip() for a in (record.get('aliases') or '').split('|') if a.strip()])
+            rows.append([float(record.get(column) or 0) for column in COLUMNS])
+    values = np.ascontiguousarray(np.asarray(rows, dtype=np.float32).T)
+    stat = os.stat(csv_path)
+    directory = os.path.dirname(os.path.abspath(prefix))
+    os.makedirs(directory, exist_ok=True)
+    matrix = f"{prefix}.{os.getpid()}-{uuid.uuid4().hex[:8]}.npy"
+    with open(matrix, 'wb') as handle:
+        np.save(handle, values)
+    index = {'columns': list(COLUMNS), 'names': names, 'aliases': aliases, 'matrix': os.path.basename(matrix),
+             'shape': list(values.shape), 'source': {'size': stat.st_size, 'mtime': stat.st_mtime}}
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=os.path.basename(prefix) + '.', suffix='.json.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+            json.dump(index, handle)
+        os.replace(tmp, prefix + '.json')
+    except BaseException:
+        for path in (tmp, matrix):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    _remove_old_matrices(prefix, matrix)
+    return {'status': 'success', 'foods': len(names), 'bytes': values.nbytes, 'path': matrix}
+
+
+def _remove_old_matrices(prefix: str, keep: str, min_age: float = 60.0):
+    """Delete superseded matrices; young ones may belong to a build that has not written its index yet"""
+    now = time.time()
+    for path in glob.glob(glob.escape(prefix) + '.*.npy') + [prefix + '.npy']:
+        try:
+            if path != keep and now - os.path.getmtime(path) > min_age:
+                os.remove(path)
+        except OSError:
+            pass  # gone already, or still mapped on a platform that refuses (Windows)
+
+
+class NutritionDB:
+    """
+    Nutrients for a fixed set of foods as a (columns x foods) float32 matrix,
+    so a recipe's totals are one gather plus one matrix-vector product. Names
+    resolve exactly, then by the longest run of words naming a food
+    ("boneless skinless chicken breast" -> chicken breast), then by
+    character-trigram similarity for misspellings. Resolved names are cached.
+    """
+
+    def __init__(self, values: np.ndarray, names: List[str], aliases: List[List[str]],
+                 threshold: float = NUTRITION_MATCH_THRESHOLD, storage: str = 'memory'):
+        # Plain ndarray view: same (possibly memory-mapped) buffer without np.memmap's per-operation overhead
+        self.values = np.asarray(values)
+        self.names = names
+        self.threshold = threshold
+        self.storage = storage
+        self._keys: Dict[str, int] = {}
+        for row, (name, extra) in enumerate(zip(names, aliases)):
+            for label in [name] + extra:
+                key = _key(label)
+                if key:
+                    self._keys.setdefault(key, row)
+        self._max_words = max(len(key.split()) for key in self._keys)
+
+        # Trigram postings for the fuzzy fallback: trigram -> indices into _key_list
+        self._key_list = list(self._keys)
+        self._key_rows = np.array([self._keys[k] for k in self._key_list], dtype=np.int32)
+        postings: Dict[str, List[int]] = {}
+        for position, key in enumerate(self._key_list):
+            for gram in _trigrams(key):
+                postings.setdefault(gram, []).append(position)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._key_grams = np.array([len(_trigrams(k)) for k in self._key_list], dtype=np.float32)
+
+        self._cache: Dict[str, Tuple[Optional[int], float]] = {}
+        self._lines: Dict[str, Dict] = {}  # parsed ingredient lines; recipes repeat the same phrasings
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'cache_hits': 0, 'exact': 0, 'partial': 0, 'fuzzy': 0, 'misses': 0,
+                      'recipes': 0, 'recipe_us_total': 0.0}
+
+    def __len__(self):
+        return len(self.names)
+
+    # --- name matching ----------------------------------------------------------------
+
+    def _fuzzy(self, key: str) -> Tuple[Optional[int], float]:
+        grams = _trigrams(key)
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if not hits:
+            return None, 0.0
+        overlap = np.bincount(np.concatenate(hits), minlength=len(self._key_list))
+        scores = 2.0 * overlap / (len(grams) + self._key_grams)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None, float(scores[best])
+        return int(self._key_rows[best]), float(scores[best])
+
+    def _spans(self, words: List[str]) -> Iterable[Tuple[int, int]]:
+        """(start, end) word spans, longest first and rightmost first (the head noun ends the phrase)"""
+        for size in range(min(len(words), self._max_words), 0, -1):
+            for start in range(len(words) - size, -1, -1):
+                yield start, start + size
+
+    def match(self, name: str) -> Tuple[Optional[int], float]:
+        """Row of the food `name` refers to and a 0-1 match score; (None, best score) when unknown"""
+        key = _key(name)
+        self.stats['lookups'] += 1
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            return cached
+        if not key:
+            result, kind = (None, 0.0), 'misses'
+        elif key in self._keys:
+            result, kind = (self._keys[key], 1.0), 'exact'
+        else:
+            words = key.split()
+            result, kind = None, None
+            for start, end in self._spans(words):
+                row = self._keys.get(" ".join(words[start:end]))
+                if row is not None:
+                    result, kind = (row, round((end - start) / len(words), 3)), 'partial'
+                    break
+            if result is None:
+                result = self._fuzzy(key)
+                kind = 'fuzzy' if result[0] is not None else 'misses'
+        self.stats[kind] += 1
+        with self._lock:
+            if len(self._cache) >= 8192:
+                self._cache.clear()
+            self._cache[key] = result
+        return result
+
+    def match_all(self, text: str) -> List[int]:
+        """Rows of every food named in `text`, left to right without overlaps ("chicken rice bowl" -> 2)"""
+        words = _key(text).split()
+        rows, start = [], 0
+        while start < len(words):
+            for end in range(min(len(words), start + self._max_words), start, -1):
+                row = self._keys.get(" ".join(words[start:end]))
+                if row is not None:
+                    rows.append(row)
+                    start = end
+                    break
+            else:
+                start += 1
+        if not rows and words:
+            row, _ = self.match(text)
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    # --- amounts and totals -----------------------------------------------------------
+
+    def grams(self, row: int, quantity: Optional[float], unit: Optional[str]) -> float:
+        """Weight of `quantity` `unit` of the food in `row` (one unit_g portion when nothing is given)"""
+        amount = 1.0 if quantity is None else quantity
+        if unit in UNIT_GRAMS:
+            return amount * UNIT_GRAMS[unit]
+        if unit in UNIT_ML:
+            return amount * UNIT_ML[unit] * float(self.values[DENSITY, row])
+        return amount * float(self.values[UNIT_G, row])
+
+    def _parse(self, line: str) -> Dict:
+        parsed = self._lines.get(line)
+        if parsed is not None:
+            return parsed
+        quantity, unit, name = parse_quantity(line)
+        row, score = self.match(name)
+        negligible = quantity is None and bool(_NEGLIGIBLE_RE.search(line.lower()))
+        grams = 0.0 if row is None or negligible else self.grams(row, quantity, unit)
+        parsed = {'text': line, 'quantity': quantity, 'unit': unit, 'food': self.names[row] if row is not None else None,
+                  'row': row, 'score': round(score, 3), 'grams': round(grams, 1)}
+        with self._lock:
+            if len(self._lines) >= 8192:
+                self._lines.clear()
+            self._lines[line] = parsed
+        return parsed
+
+    def parse_ingredient(self, line: str) -> Dict:
+        """Quantity, unit, matched food and weight in grams for one ingredient line"""
+        return dict(self._parse(str(line)))
+
+    def totals(self, rows: List[int], grams: List[float], divisor: float = 1.0) -> Dict:
+        """Nutrient sums for `grams` of each food in `rows`, divided by `divisor`"""
+        if not rows:
+            return {name: 0.0 for name in NUTRIENTS}
+        sums = self.values[:len(NUTRIENTS), rows] @ (np.asarray(grams, dtype=np.float32) / (100.0 * divisor))
+        return {name: round(value, 1) for name, value in zip(NUTRIENTS, sums.tolist())}
+
+    def recipe_nutrition(self, ingredients: Iterable[str], servings=1) -> Dict:
+        """Per-serving calories and macros from an ingredient list"""
+        started = time.perf_counter()
+        try:
+            servings = max(float(servings or 1), 1.0)
+        except (TypeError, ValueError):
+            servings = 1.0
+        lines = [str(i) for i in ingredients or [] if str(i).strip()]
+        parsed = [self._parse(line) for line in lines]
+        found = [p for p in parsed if p['row'] is not None]
+        result = self.totals([p['row'] for p in found], [p['grams'] for p in found], servings)
+        coverage = len(found) / len(parsed) if parsed else 0.0
+        main_matched = all(p['row'] is not None for p in parsed[:NUTRITION_MAIN_INGREDIENTS])
+        result.update({
+            'servings': servings,
+            'matched': len(found),
+            'unmatched': [p['text'] for p in parsed if p['row'] is None],
+            'coverage': round(coverage, 3),
+            # Enough of the recipe recognized for the totals to stand in for the whole dish
+            'complete': bool(parsed) and coverage >= NUTRITION_MIN_COVERAGE and main_matched,
+            'source': 'nutrition_db'
+        })
+        self.stats['recipes'] += 1
+        self.stats['recipe_us_total'] += (time.perf_counter() - started) * 1e6
+        return result
+
+    def dish_nutrition(self, dish: str) -> Dict:
+        """Rough single-serving estimate for a dish name: one portion of each food it names"""
+        rows = []
+        for part in _DISH_SPLIT_RE.split(str(dish)):
+            quantity, unit, name = parse_quantity(part)
+            rows += [(row, self.grams(row, quantity, unit)) for row in self.match_all(name)]
+        result = self.totals([r for r, _ in rows], [g for _, g in rows])
+        result['foods'] = [self.names[r] for r, _ in rows]
+        return result
+
+    def get_stats(self) -> Dict:
+        recipes = self.stats['recipes']
+        lookups = self.stats['lookups']
+        return dict(self.stats,
+                    foods=len(self.names),
+                    names=len(self._keys),
+                    storage=self.storage,
+                    matrix_bytes=int(self.values.nbytes),
+                    cache_size=len(self._cache),
+                    line_cache_size=len(self._lines),
+                    cache_hit_rate=round(self.stats['cache_hits'] / lookups, 4) if lookups else None,
+                    recipe_us_total=round(self.stats['recipe_us_total'], 1),
+                    avg_recipe_us=round(self.stats['recipe_us_total'] / recipes, 1) if recipes else None)
+
+
+def _is_stale(index: Dict, csv_path: str) -> bool:
+    if 'matrix' not in index or index.get('columns') != list(COLUMNS):
+        return True
+    if not os.path.exists(csv_path):
+        return False
+    stat = os.stat(csv_path)
+    source = index.get('source', {})
+    return source.get('size') != stat.st_size or source.get('mtime') != stat.st_mtime
+
+
+def _read_index(prefix: str) -> Optional[Dict]:
+    try:
+        with open(prefix + '.json', encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def ensure_built(csv_path: str = NUTRITION_CSV, prefix: str = NUTRITION_DB) -> Dict:
+    """The current index, compiling the CSV first when the index is missing or older than the CSV"""
+    index = _read_index(prefix)
+    if index is None or _is_stale(index, csv_path):
+        result = build(csv_path, prefix)
+        logger.info(f"🥗 Compiled nutrition database: {result['foods']} foods, {result['bytes']} bytes")
+        index = _read_index(prefix)
+    return index
+
+
+def load(csv_path: str = NUTRITION_CSV, prefix: str = NUTRITION_DB) -> NutritionDB:
+    """Memory-map the compiled database, (re)building it first when missing or older than the CSV"""
+    for _ in range(2):
+        try:
+            index = ensure_built(csv_path, prefix)
+        except OSError as e:
+            # Read-only deployment: parse the CSV into memory instead of compiling it
+            logger.warning(f"⚠️ Could not write compiled nutrition database ({e}); using the CSV in memory")
+            return _load_csv(csv_path)
+        try:
+            values = np.load(os.path.join(os.path.dirname(os.path.abspath(prefix)), index['matrix']), mmap_mode='r')
+        except FileNotFoundError:
+            continue  # a newer build replaced the index and removed this matrix; read the index again
+        if values.shape != (len(COLUMNS), len(index['names'])) or len(index['aliases']) != len(index['names']):
+            logger.warning(f"⚠️ Compiled nutrition database does not match its names {values.shape}; "
+                           f"using the CSV in memory")
+            break
+        return NutritionDB(values, index['names'], index['aliases'], storage='mmap')
+    return _load_csv(csv_path)
+
+
+def _load_csv(csv_path: str) -> NutritionDB:
+    with open(csv_path, newline='', encoding='utf-8') as handle:
+        records = list(csv.DictReader(handle))
+    values = np.asarray([[float(r.get(c) or 0) for r in records] for c in COLUMNS], dtype=np.float32)
+    aliases = [[a.strip() for a in (r.get('aliases') or '').split('|') if a.strip()] for r in records]
+    return NutritionDB(values, [r['name'].strip() for r in records], aliases)
+
+
+# Global database, compiled/mapped on first use
+nutrition_db = LazyObject(load, 'nutrition_db')
+
+
+def attach_recipe_nutrition(recipe: Dict) -> Dict:
+    """
+    Add per-serving `nutrition` to a recipe. Its calories replace the recipe's
+    (model-supplied) ones only when the match is complete; a partial match would
+    undercount the unrecognized ingredients.
+    """
+    nutrition = nutrition_db.recipe_nutrition(recipe.get('ingredients') or [], recipe.get('servings') or 1)
+    recipe['nutrition'] = nutrition
+    if nutrition['complete']:
+        recipe['calories'] = int(round(nutrition['calories']))
+    return recipe
+
+
+_DAY_RE = re.compile(r'\*\*Day\s+(\d+):?\*\*')
+_MEAL_LINE_RE = re.compile(r'^\s*[•*-]\s*([A-Za-z ]+?):\s*(.+?)\s*$')
+
+
+def plan_nutrition(meal_plan) -> Dict:
+    """
+    Per-meal and per-day estimates for a meal plan: the text plans from
+    meal_planner ("**Day 1:**" / "• Lunch: ...") or {'days': [{meal: dish}]}.
+    """
+    if isinstance(meal_plan, dict):
+        days = [{str(meal).title(): dish for meal, dish in day.items()} for day in meal_plan.get('days', [])]
+    else:
+        days = []
+        for line in str(meal_plan or '').splitlines():
+            if _DAY_RE.search(line):
+                days.append({})
+            elif days:
+                match = _MEAL_LINE_RE.match(line)
+                if match:
+                    days[-1][match.group(1).strip()] = match.group(2)
+    result_days = []
+    for number, day in enumerate(days, 1):
+        meals = {meal: dict(nutrition_db.dish_nutrition(dish), dish=dish) for meal, dish in day.items()}
+        total = {name: round(sum(m[name] for m in meals.values()), 1) for name in NUTRIENTS}
+        result_days.append({'day': number, 'meals': meals, 'total': total})
+    average = {name: round(sum(d['total'][name] for d in result_days) / len(result_days), 1) if result_days else 0.0
+               for name in NUTRIENTS}
+    return {'days': result_days, 'daily_average': average, 'source': 'nutrition_db'}
+
+
+def main(argv: List[str]) -> int:
+    command = argv[1] if len(argv) > 1 else 'build'
+    if command == 'build':
+        result = build()
+        print(f"🥗 {result['foods']} foods -> {result['path']} ({result['bytes']} bytes)")
+        return 0
+    if command == 'lookup':
+        db = load()
+        for line in argv[2:]:
+            print(json.dumps(db.parse_ingredient(line)))
+        print(json.dumps(db.recipe_nutrition(argv[2:]), indent=2))
+        return 0
+    print(f"Unknown command: {command} (expected build or lookup)")
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -1,16 +1,22 @@
-import openai
 import os
 from dotenv import load_dotenv
+from llm_client import get_client, LLMUnavailableError
+from llm_usage import track_llm_call
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def _client():
+    """Shared OpenAI client; raises LLMUnavailableError when OpenAI is not configured"""
+    client = get_client()
+    if client is None:
+        raise LLMUnavailableError("OpenAI is not configured")
+    return client
 
+@track_llm_call('recipe_suggestions')
 def generate_recipe_suggestions(meal_plan):
     try:
-        response = client.chat.completions.create(
+        response = _client().chat.completions.create(
             model="gpt-4",  # or "gpt-4" if you have access
             messages=[
                 {"role": "system", "content": "You are a helpful cooking assistant that suggests recipes based on meal plans."},
@@ -20,12 +26,15 @@ def generate_recipe_suggestions(meal_plan):
             temperature=0.7
         )
         return response.choices[0].message.content
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         return f"Error generating recipe suggestions: {str(e)}"
 
+@track_llm_call('grocery_list')
 def generate_grocery_list(meal_plan):
     try:
-        response = client.chat.completions.create(
+        response = _client().chat.completions.create(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that creates grocery lists based on meal plans."},
@@ -35,5 +44,7 @@ def generate_grocery_list(meal_plan):
             temperature=0.5
         )
         return response.choices[0].message.content
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         return f"Error generating grocery list: {str(e)}"
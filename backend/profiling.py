@@ -0,0 +1,188 @@
+# Opt-in per-request profiling (cProfile) with stored artifacts
+import cProfile
+import glob
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+# Fraction of requests profiled without being asked (0 = only on X-Profile requests)
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+# X-Profile requests and the admin endpoints must send this as X-Profile-Token; unset disables both
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 50))
+
+# Where the time goes, by source file (exclusive time, first match wins)
+COMPONENTS = [
+    ('openai', re.compile(r'[\\/](openai|httpx|httpcore|ssl)[\\/]|llm_client\.py|llm_usage\.py|openai_integration\.py')),
+    ('sqlite', re.compile(r'database_service\.py|sqlite3|_sqlite3')),
+    ('firebase', re.compile(r'firebase_service\.py|[\\/](firebase_admin|google)[\\/]')),
+    ('planning', re.compile(r'meal_planner\.py|recipe_index\.py|recipe_parser\.py|health_metrics\.py|numpy')),
+    ('templates', re.compile(r'[\\/]jinja2[\\/]|templates[\\/]')),
+    ('framework', re.compile(r'[\\/](flask|werkzeug)[\\/]')),
+]
+
+_PROFILE_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+# Only one profiler may be active per process (cProfile is not re-entrant across threads)
+_active_lock = threading.Lock()
+
+
+def token_ok() -> bool:
+    """Fails closed: without a configured PROFILE_TOKEN no request is trusted"""
+    token = request.headers.get('X-Profile-Token', '')
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+def _should_profile() -> bool:
+    if request.headers.get('X-Profile') == '1':
+        return token_ok()
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _component(filename: str) -> str:
+    for name, pattern in COMPONENTS:
+        if pattern.search(filename):
+            return name
+    return 'other'
+
+
+def summarize(stats: pstats.Stats, limit: int = 25) -> Dict:
+    """Exclusive time per component and the top functions by cumulative time"""
+    components: Dict[str, float] = {}
+    functions = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        component = _component(filename)
+        components[component] = components.get(component, 0.0) + tottime
+        functions.append({
+            'function': f"{os.path.basename(filename)}:{line}({name})",
+            'component': component,
+            'calls': calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3)
+        })
+    functions.sort(key=lambda f: f['cumtime_ms'], reverse=True)
+    return {
+        'components_ms': {k: round(v * 1000, 3) for k, v in sorted(components.items(), key=lambda i: -i[1])},
+        'top_functions': functions[:limit]
+    }
+
+
+def _start_profile():
+    if not _should_profile() or not _active_lock.acquire(blocking=False):
+        return
+    # Reuse an upstream request id when it has our format so logs and profiles line up
+    request_id = request.headers.get('X-Request-ID', '')
+    g._profile_id = request_id if _PROFILE_ID_RE.match(request_id) else uuid.uuid4().hex
+    g._profile_started = time.perf_counter()
+    g._profiler = cProfile.Profile()
+    g._profiler.enable()
+
+
+def _tag_response(response):
+    if g.get('_profiler') is not None:
+        g._profile_status = response.status_code
+        response.headers['X-Profile-Id'] = g._profile_id
+    return response
+
+
+def _finish_profile(exc=None):
+    profiler = g.pop('_profiler', None)
+    if profiler is None:
+        return
+    try:
+        profiler.disable()
+        duration_ms = (time.perf_counter() - g._profile_started) * 1000
+        save_profile(profiler, {
+            'profile_id': g._profile_id,
+            'method': request.method,
+            'path': request.path,
+            'route': request.url_rule.rule if request.url_rule else None,
+            'status': g.get('_profile_status', 500),
+            'error': repr(exc) if exc else None,
+            'duration_ms': round(duration_ms, 3),
+            'created_at': datetime.now().isoformat(timespec='seconds')
+        })
+    except Exception as e:
+        logger.error(f"Profile save error: {e}")
+    finally:
+        _active_lock.release()
+
+
+def save_profile(profiler: cProfile.Profile, meta: Dict):
+    """Write the raw .prof (for snakeviz/pstats) and a JSON summary, then prune old profiles"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, meta['profile_id'])
+    profiler.dump_stats(base + '.prof')
+    stats = pstats.Stats(profiler)
+    with open(base + '.json', 'w') as f:
+        json.dump(dict(meta, **summarize(stats)), f, indent=2)
+    logger.info(f"📈 Profiled {meta['method']} {meta['path']} in {meta['duration_ms']}ms -> {meta['profile_id']}")
+
+    summaries = sorted(glob.glob(os.path.join(PROFILE_DIR, '*.json')), key=os.path.getmtime, reverse=True)
+    for old in summaries[PROFILE_KEEP:]:
+        for path in (old, old[:-5] + '.prof'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def list_profiles(limit: int = 50) -> List[Dict]:
+    """Recent profile summaries, newest first (without the function tables)"""
+    summaries = sorted(glob.glob(os.path.join(PROFILE_DIR, '*.json')), key=os.path.getmtime, reverse=True)
+    profiles = []
+    for path in summaries[:limit]:
+        try:
+            with open(path) as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summary.pop('top_functions', None)
+        profiles.append(summary)
+    return profiles
+
+
+def profile_path(profile_id: str, kind: str = 'prof') -> Optional[str]:
+    """Path of a stored artifact, or None for unknown/invalid ids"""
+    if not _PROFILE_ID_RE.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f'{profile_id}.{kind}')
+    return path if os.path.exists(path) else None
+
+
+def profile_text(profile_id: str, limit: int = 40) -> Optional[str]:
+    """pstats text report sorted by cumulative time"""
+    path = profile_path(profile_id)
+    if not path:
+        return None
+    output = io.StringIO()
+    pstats.Stats(path, stream=output).sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+def init_app(app):
+    """Register the profiling hooks; nothing is registered (zero overhead) unless PROFILING_ENABLED=1"""
+    if not PROFILING_ENABLED:
+        return
+    app.before_request(_start_profile)
+    app.after_request(_tag_response)
+    app.teardown_request(_finish_profile)
+    logger.info(f"📈 Request profiling enabled (sample rate {PROFILE_SAMPLE_RATE})")
+    if not PROFILE_TOKEN:
+        logger.warning("⚠️ PROFILE_TOKEN is not set: X-Profile requests and /api/admin/profiles are refused")
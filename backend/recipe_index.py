@@ -0,0 +1,183 @@
+# Local similarity index over generated recipes (hashed feature vectors in NumPy)
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Feature weights: cuisine and diet matter more than a single ingredient
+FEATURE_WEIGHTS = {
+    'ing': 1.0,
+    'cuisine': 1.5,
+    'meal': 0.75,
+    'diet': 1.5
+}
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+_STOPWORDS = {"fresh", "chopped", "sliced", "diced", "large", "small", "some", "of", "and", "the", "a"}
+
+
+def _normalize_ingredient(ingredient: str) -> str:
+    """Lower-case an ingredient, drop quantities/adjectives and a plural 's'"""
+    words = [w for w in _TOKEN_RE.findall(str(ingredient).lower()) if w not in _STOPWORDS]
+    words = [w[:-1] if len(w) > 3 and w.endswith('s') and not w.endswith('ss') else w for w in words]
+    return " ".join(words)
+
+
+def parse_servings(value, default: int = 4) -> int:
+    """Serving count from a client value ("4", 4.0); `default` for blanks and text such as "2-3" """
+    try:
+        return max(int(float(value)), 1) if value not in (None, '') else default
+    except (TypeError, ValueError, OverflowError):
+        return default
+
+
+def request_signature(data: Dict) -> Dict:
+    """Reduce a recipe request to the normalized fields used for matching"""
+    ingredients = sorted({_normalize_ingredient(i) for i in data.get('ingredients', []) if _normalize_ingredient(i)})
+    return {
+        'ingredients': ingredients,
+        'cuisine': str(data.get('cuisine_type', '') or 'any').strip().lower(),
+        'meal': str(data.get('meal_type', '') or 'any').strip().lower(),
+        'diet': sorted({str(d).strip().lower() for d in data.get('dietary_restrictions', []) if d}),
+        'servings': parse_servings(data.get('servings'))
+    }
+
+
+class RecipeIndex:
+    """
+    In-memory cosine-similarity index. Each request signature is hashed into a
+    fixed-size signed feature vector; lookups are a single matrix-vector product.
+    Dietary restrictions, the serving count and the requested ingredients act
+    as hard filters: a match never drops a restriction or an ingredient the
+    user asked for, nor comes back with quantities for another number of people.
+    Each worker process holds its own index; load() pulls in recipes other
+    workers saved to the shared database, at most every `refresh_interval` s.
+    """
+
+    def __init__(self, dim: int = 1024, threshold: float = 0.9, refresh_interval: float = 5.0):
+        self.dim = dim
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self._vectors = np.zeros((64, dim), dtype=np.float32)
+        self._diets: List[frozenset] = []
+        self._servings: List[int] = []
+        self._ingredients: List[frozenset] = []
+        self._recipe_ids: List[int] = []
+        self._recipes: List[Dict] = []
+        self._known_ids = set()
+        self._last_id = 0  # highest stored recipe id seen; load() asks storage for newer ones
+        self._next_refresh = 0.0
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'lookup_ms_total': 0.0, 'refreshes': 0,
+                      'refreshed_recipes': 0}
+
+    def __len__(self):
+        return len(self._recipes)
+
+    def vectorize(self, signature: Dict) -> np.ndarray:
+        """Hash a request signature into an L2-normalized feature vector"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        features = [('ing', i) for i in signature['ingredients']]
+        # Individual words let "chicken breast" partially match "chicken"
+        features += [('ing', w) for i in signature['ingredients'] for w in i.split() if w != i]
+        features += [('cuisine', signature['cuisine']), ('meal', signature['meal'])]
+        features += [('diet', d) for d in signature['diet']]
+        for kind, value in features:
+            digest = zlib.crc32(f"{kind}:{value}".encode('utf-8'))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % self.dim] += sign * FEATURE_WEIGHTS[kind]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def add(self, recipe_id: int, signature: Dict, recipe: Dict):
+        """Add a stored recipe to the index (no-op if it is already there)"""
+        vector = self.vectorize(signature)
+        with self._lock:
+            if recipe_id in self._known_ids:
+                return
+            self._known_ids.add(recipe_id)
+            self._last_id = max(self._last_id, recipe_id)
+            size = len(self._recipes)
+            if size == self._vectors.shape[0]:
+                grown = np.zeros((size * 2, self.dim), dtype=np.float32)
+                grown[:size] = self._vectors
+                self._vectors = grown
+            self._vectors[size] = vector
+            self._diets.append(frozenset(signature['diet']))
+            self._servings.append(parse_servings(signature.get('servings')))
+            self._ingredients.append(frozenset(signature['ingredients']))
+            self._recipe_ids.append(recipe_id)
+            self._recipes.append(recipe)
+
+    def load(self, storage):
+        """
+        Add recipes persisted by DatabaseService since the last call (all of them
+        the first time), so recipes saved by other workers become hits here too
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_refresh:
+                return
+            self._next_refresh = now + self.refresh_interval
+            after_id = self._last_id
+        if hasattr(storage, 'get_indexed_recipes'):
+            # Read outside the lock so queries are not blocked by the database
+            rows = storage.get_indexed_recipes(after_id)
+            for recipe_id, signature, recipe in rows:
+                self.add(recipe_id, signature, recipe)
+            with self._lock:
+                self.stats['refreshes'] += 1
+                self.stats['refreshed_recipes'] += len(rows)
+        self.loaded = True
+
+    def query(self, signature: Dict) -> Tuple[Optional[Dict], float]:
+        """Return the nearest stored recipe above the threshold and its similarity"""
+        start = time.perf_counter()
+        vector = self.vectorize(signature)
+        diet = frozenset(signature['diet'])
+        servings = signature['servings']
+        ingredients = frozenset(signature['ingredients'])
+        best_recipe, best_score = None, 0.0
+        with self._lock:
+            size = len(self._recipes)
+            if size:
+                scores = self._vectors[:size] @ vector
+                top = min(8, size)
+                candidates = np.argpartition(scores, size - top)[size - top:]
+                for position in candidates[np.argsort(scores[candidates])[::-1]]:
+                    if scores[position] < self.threshold:
+                        break
+                    if (diet <= self._diets[position] and self._servings[position] == servings
+                            and ingredients <= self._ingredients[position]):
+                        best_recipe, best_score = self._recipes[position], float(scores[position])
+                        break
+            self.stats['lookups'] += 1
+            self.stats['hits' if best_recipe else 'misses'] += 1
+            self.stats['lookup_ms_total'] += (time.perf_counter() - start) * 1000
+        return (dict(best_recipe) if best_recipe else None), best_score
+
+    def get_stats(self) -> Dict:
+        """Get index size, hit rate and mean lookup latency"""
+        with self._lock:
+            lookups = self.stats['lookups']
+            return {
+                'size': len(self._recipes),
+                'threshold': self.threshold,
+                'refresh_interval': self.refresh_interval,
+                'refreshes': self.stats['refreshes'],
+                'refreshed_recipes': self.stats['refreshed_recipes'],
+                'lookups': lookups,
+                'hits': self.stats['hits'],
+                'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else None,
+                'avg_lookup_ms': round(self.stats['lookup_ms_total'] / lookups, 4) if lookups else None
+            }
+
+
+# Global recipe index instance
+recipe_index = RecipeIndex(threshold=float(os.getenv('RECIPE_INDEX_THRESHOLD', 0.9)),
+                           refresh_interval=float(os.getenv('RECIPE_INDEX_REFRESH_SECONDS', 5)))
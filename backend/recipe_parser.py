@@ -0,0 +1,215 @@
+# Structured recipe output: JSON schema, tolerant parser and parse metrics
+import json
+import re
+import threading
+from typing import Dict, List, Optional, Any, Tuple
+
+# JSON schema the model is asked (and, where supported, constrained) to follow
+RECIPE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "prep_time": {"type": "string"},
+        "servings": {"type": "integer"},
+        "calories": {"type": "integer"},
+        "ingredients": {"type": "array", "items": {"type": "string"}},
+        "instructions": {"type": "array", "items": {"type": "string"}},
+        "tips": {"type": "string"}
+    },
+    "required": ["name", "prep_time", "servings", "calories", "ingredients", "instructions", "tips"],
+    "additionalProperties": False
+}
+
+# Models that accept response_format={"type": "json_schema"} (strict structured outputs)
+STRUCTURED_OUTPUT_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+
+RECIPE_SYSTEM_PROMPT = (
+    "You are a recipe generator. Reply with one JSON object only, no prose, no code fences. "
+    "Keys: name (str), prep_time (str), servings (int), calories (int, per serving), "
+    "ingredients (list of str with quantities), instructions (list of str), tips (str)."
+)
+
+_FENCE_RE = re.compile(r"^\s*```(?:json|JSON)?\s*|\s*```\s*$")
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+
+
+def build_recipe_prompt(data: Dict) -> str:
+    """Build the compact user prompt for a recipe request"""
+    lines = [
+        f"ingredients: {', '.join(data.get('ingredients', [])) or 'any'}",
+        f"cuisine: {data.get('cuisine_type', 'any')}",
+        f"meal: {data.get('meal_type', 'lunch')}",
+        f"servings: {data.get('servings', 4)}"
+    ]
+    restrictions = data.get('dietary_restrictions', [])
+    if restrictions:
+        lines.append(f"diet: {', '.join(restrictions)}")
+    cooking_time = data.get('cooking_time')
+    if cooking_time:
+        lines.append(f"max time: {cooking_time}")
+    return "\n".join(lines)
+
+
+def recipe_response_format(model: str) -> Dict:
+    """Pick the strongest JSON response_format the model supports"""
+    if model.startswith(STRUCTURED_OUTPUT_MODELS):
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "recipe", "schema": RECIPE_SCHEMA, "strict": True}
+        }
+    return {"type": "json_object"}
+
+
+def _strip_fences(text: str) -> str:
+    """Remove markdown code fences around a JSON payload"""
+    return _FENCE_RE.sub("", text).strip()
+
+
+def _extract_object(text: str) -> Tuple[str, bool]:
+    """
+    Scan for the first top-level JSON object, skipping surrounding prose.
+    Returns the object text and whether it was closed; an unclosed object
+    (truncated completion) is returned with the missing brackets appended.
+    """
+    start = text.find("{")
+    if start == -1:
+        return "", False
+
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    for pos in range(start, len(text)):
+        char = text[pos]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return text[start:pos + 1], True
+
+    # Truncated: drop a dangling partial token and close what is still open
+    body = text[start:]
+    if in_string:
+        body += '"'
+    body = body.rstrip()
+    if stack and stack[-1] == "}":
+        # Inside an object a trailing string is a key still waiting for its value
+        body = re.sub(r"([,{])\s*\"[^\"]*\"\s*:?$", lambda m: "{" if m.group(1) == "{" else "", body)
+    body = re.sub(r"[,:]$", "", body.rstrip())
+    return body + "".join(reversed(stack)), False
+
+
+def _repair(text: str) -> str:
+    """Apply cheap syntactic repairs (trailing commas before a closing bracket)"""
+    return _TRAILING_COMMA_RE.sub(r"\1", text)
+
+
+def parse_recipe_json(text: Optional[str]) -> Tuple[Optional[Dict], str]:
+    """
+    Parse a recipe from a model completion, escalating through repair stages.
+    Returns (recipe or None, stage) where stage names the step that succeeded.
+    """
+    if not text:
+        return None, "empty"
+
+    stages = (
+        ("direct", lambda t: t),
+        ("fenced", _strip_fences),
+        ("extracted", lambda t: _extract_object(_strip_fences(t))[0]),
+        ("repaired", lambda t: _repair(_extract_object(_strip_fences(t))[0]))
+    )
+    for stage, transform in stages:
+        candidate = transform(text)
+        if not candidate:
+            continue
+        try:
+            parsed = json.loads(candidate)
+        except (ValueError, TypeError):
+            continue
+        if isinstance(parsed, dict) and parsed:
+            return parsed, stage
+
+    return None, "failed"
+
+
+def normalize_recipe(recipe: Dict, fallback: Dict) -> Dict:
+    """Coerce a parsed recipe onto the schema, filling gaps from the fallback"""
+    result = {}
+    for key, spec in RECIPE_SCHEMA["properties"].items():
+        value = recipe.get(key)
+        if spec["type"] == "integer":
+            # Drop thousands separators so "1,200 kcal" reads as 1200, not 1
+            match = re.search(r"\d+(?:\.\d+)?", str(value).replace(",", ""))
+            value = int(float(match.group(0))) if match else None
+        elif spec["type"] == "array":
+            if isinstance(value, str):
+                value = [line.strip() for line in value.splitlines() if line.strip()]
+            elif isinstance(value, list):
+                value = [str(item) for item in value if item]
+            else:
+                value = None
+        elif value is not None:
+            value = str(value).strip()
+        result[key] = value if value else fallback.get(key)
+    return result
+
+
+class RecipeParseStats:
+    """Thread-safe counters for recipe parse outcomes and token spend"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.attempts = 0
+            self.successes = 0
+            self.stages: Dict[str, int] = {}
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.wasted_completion_tokens = 0
+
+    def record(self, stage: str, success: bool, usage: Any = None):
+        """Record one completion and its token usage"""
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        with self._lock:
+            self.attempts += 1
+            self.stages[stage] = self.stages.get(stage, 0) + 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            if success:
+                self.successes += 1
+            else:
+                self.wasted_completion_tokens += completion_tokens
+
+    def snapshot(self) -> Dict:
+        """Return parse success rate and tokens per successful recipe"""
+        with self._lock:
+            total_tokens = self.prompt_tokens + self.completion_tokens
+            return {
+                "attempts": self.attempts,
+                "successes": self.successes,
+                "parse_success_rate": round(self.successes / self.attempts, 4) if self.attempts else None,
+                "stages": dict(self.stages),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "wasted_completion_tokens": self.wasted_completion_tokens,
+                "tokens_per_successful_recipe": round(total_tokens / self.successes, 1) if self.successes else None
+            }
+
+
+# Global parse statistics instance
+recipe_parse_stats = RecipeParseStats()
@@ -2,230 +2,409 @@ import cv2
 import numpy as np
 import threading
 import time
-import pygame
+import io
+import logging
 import os
 from datetime import datetime
-import mediapipe as mp
+
+# Face Mesh and the alarm are optional at import time so the detector can run with an
+# injected face_mesh_pool and no audio (headless analysis, benchmarks/bench_drowsiness_detector.py)
+try:
+    import mediapipe as mp
+except ImportError:
+    mp = None
+try:
+    import pygame
+except ImportError:
+    pygame = None
+
+from alarm_tone import ALARM_FREQUENCY, ALARM_VOLUME, ALARM_WAVEFORM, alarm_wav
+from drowsiness_adaptive import AdaptiveMesh, thumbnail
+from drowsiness_pipeline import DROWSINESS_TARGET_FPS, DetectionPipeline, show_in_window
+from drowsiness_stream import FrameBroadcaster, encode_jpeg
+from drowsiness_metrics import (
+    EYE_AR_CLOSED_S, EYE_AR_THRESH, LEFT_EYE, RIGHT_EYE, EyeClosureWindow, EyeLandmarks, eye_aspect_ratios
+)
+
+logger = logging.getLogger(__name__)
+
+# Decoded alarm sounds by (waveform, frequency, volume), shared by every detector in the process
+_alarm_sounds = {}
+_alarm_sounds_lock = threading.Lock()
+
+def create_face_mesh():
+    """A MediaPipe Face Mesh model with the detector's settings (video mode, one face, refined eyes)"""
+    if mp is None:
+        raise ImportError("mediapipe is required for Face Mesh (pip install mediapipe)")
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=False,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
 
 class SimpleDrowsinessDetector:
-    def __init__(self):
-        # Eye Aspect Ratio threshold
-        self.EYE_AR_THRESH = 0.25
-        self.EYE_AR_CONSEC_FRAMES = 30
+    def __init__(self, alarm_waveform=None, alarm_frequency=None, alarm_volume=None, adaptive=False,
+                 adaptive_options=None, sound=True, face_mesh_pool=None, event_sink=None, session_id=None,
+                 user_id=None, frame_rate=None):
+        # Eye Aspect Ratio threshold and how long the eyes must stay closed for an alert
+        self.EYE_AR_THRESH = EYE_AR_THRESH
+        self.EYE_AR_CLOSED_S = EYE_AR_CLOSED_S
         
         # Initialize counters and flags
         self.COUNTER = 0
         self.ALARM_ON = False
         self.is_running = False
         
-        # Initialize MediaPipe Face Mesh
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        # Initialize MediaPipe Face Mesh (or borrow one per frame from a pool shared with other detectors)
+        self.mp_face_mesh = mp.solutions.face_mesh if mp is not None else None
+        self.face_mesh_pool = face_mesh_pool
+        self.face_mesh = create_face_mesh() if face_mesh_pool is None else None
         
         # Eye landmark indices for MediaPipe
-        self.LEFT_EYE = [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398]
-        self.RIGHT_EYE = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
+        self.LEFT_EYE = LEFT_EYE
+        self.RIGHT_EYE = RIGHT_EYE
+        # Both eyes' EAR points are read once per frame into this preallocated buffer
+        self.eye_landmarks = EyeLandmarks(self.LEFT_EYE, self.RIGHT_EYE)
         
-        # Initialize pygame for sound
-        try:
-            pygame.mixer.init()
-            self.alarm_sound = None
-            self.create_alarm_sound()
-        except:
-            print("Warning: Could not initialize sound system")
+        # Adaptive mode: downsampled, ROI-cropped mesh runs only every N frames or on motion
+        self.adaptive = AdaptiveMesh(**(adaptive_options or {})) if adaptive else None
+        
+        # Alarm tone settings (defaults from ALARM_WAVEFORM / ALARM_FREQUENCY / ALARM_VOLUME)
+        self.alarm_waveform = alarm_waveform or ALARM_WAVEFORM
+        self.alarm_frequency = float(alarm_frequency or ALARM_FREQUENCY)
+        self.alarm_volume = float(ALARM_VOLUME if alarm_volume is None else alarm_volume)
+        
+        # Initialize pygame for sound (sound=False for headless analysis)
+        self.alarm_sound = None
+        self.alarm_channel = None
+        if sound and pygame is None:
+            logger.warning("pygame not installed, alarm sound disabled")
+        elif sound:
+            try:
+                if not pygame.mixer.get_init():
+                    pygame.mixer.init()
+                self.create_alarm_sound()
+            except:
+                logger.warning("Could not initialize sound system")
             
         # Statistics
         self.total_blinks = 0
         self.sleep_alerts = 0
         self.session_start = datetime.now()
+        self.pipeline = None
+        self.last_result = None
+        
+        # Sliding-window PERCLOS and blink rate (O(1) per frame). It also tracks the analyzed frame
+        # rate that turns EYE_AR_CLOSED_S into frames; `frame_rate` pins it (e.g. replaying a recording).
+        self.eye_closure = EyeClosureWindow(closed_s=self.EYE_AR_CLOSED_S, fps=frame_rate)
         
+        # Finished sleep alerts go to event_sink (e.g. the batched SQLite recorder) tagged with these ids
+        self.event_sink = event_sink
+        self.session_id = session_id
+        self.user_id = user_id
+        self.source = None
+        self._closed_since = None
+        self._alert = None
+        
+    @property
+    def EYE_AR_CONSEC_FRAMES(self):
+        """Closed frames in a row that raise an alert at the current analyzed frame rate"""
+        return self.eye_closure.consec_frames
+    
     def create_alarm_sound(self):
-        """Create a simple alarm tone"""
+        """Load the alarm tone from memory (synthesized and decoded once per process)"""
+        key = (self.alarm_waveform, self.alarm_frequency, self.alarm_volume)
         try:
-            # Generate a simple alarm beep
-            sample_rate = 22050
-            duration = 1.0
-            frequency = 800
-            
-            frames = int(duration * sample_rate)
-            arr = np.zeros((frames, 2))
-            
-            for i in range(frames):
-                wave = np.sin(2 * np.pi * frequency * i / sample_rate)
-                arr[i] = [wave * 0.3, wave * 0.3]
-            
-            # Convert to 16-bit integers
-            arr = (arr * 32767).astype(np.int16)
-            
-            # Save as temporary file
-            import wave
-            with wave.open("temp_alarm.wav", "w") as f:
-                f.setnchannels(2)
-                f.setsampwidth(2)
-                f.setframerate(sample_rate)
-                f.writeframes(arr.tobytes())
-                
-            self.alarm_sound = "temp_alarm.wav"
+            with _alarm_sounds_lock:
+                if key not in _alarm_sounds:
+                    _alarm_sounds[key] = pygame.mixer.Sound(file=io.BytesIO(alarm_wav(*key)))
+                self.alarm_sound = _alarm_sounds[key]
         except Exception as e:
-            print(f"Could not create alarm sound: {e}")
+            logger.error(f"Could not create alarm sound: {e}")
     
-    def calculate_ear(self, landmarks, eye_indices):
-        """Calculate Eye Aspect Ratio using MediaPipe landmarks"""
-        try:
-            # Get eye landmarks
-            eye_points = []
-            for idx in eye_indices:
-                if idx < len(landmarks):
-                    x = landmarks[idx].x
-                    y = landmarks[idx].y
-                    eye_points.append([x, y])
-            
-            if len(eye_points) < 6:
-                return 0
-            
-            # Convert to numpy array
-            eye_points = np.array(eye_points)
-            
-            # Calculate distances
-            # Vertical distances
-            v1 = np.linalg.norm(eye_points[1] - eye_points[5])
-            v2 = np.linalg.norm(eye_points[2] - eye_points[4])
-            
-            # Horizontal distance
-            h = np.linalg.norm(eye_points[0] - eye_points[3])
-            
-            # Calculate EAR
-            if h > 0:
-                ear = (v1 + v2) / (2.0 * h)
-            else:
-                ear = 0
-                
-            return ear
-        except:
-            return 0
+    def calculate_ears(self, landmarks, crop=None):
+        """
+        (left, right) Eye Aspect Ratios from one extraction of the eye landmarks.
+        `crop` (x0, y0, crop_w, crop_h, frame_w, frame_h) maps landmarks found
+        in a crop back to full-frame coordinates so EAR keeps the same scale.
+        """
+        if not self.eye_landmarks.fill(landmarks):
+            return 0.0, 0.0
+        if crop is not None:
+            self.eye_landmarks.remap(*crop)
+        left_ear, right_ear = eye_aspect_ratios(self.eye_landmarks.eye_points())
+        return float(left_ear), float(right_ear)
     
     def play_alarm(self):
         """Play alarm sound"""
         try:
-            if self.alarm_sound and os.path.exists(self.alarm_sound):
-                pygame.mixer.music.load(self.alarm_sound)
-                pygame.mixer.music.play(-1)  # Loop indefinitely
+            if self.alarm_sound and self.alarm_channel is None:
+                # Loop indefinitely on our own channel (the Sound is shared with other detectors)
+                self.alarm_channel = self.alarm_sound.play(loops=-1)
         except Exception as e:
-            print(f"Could not play alarm: {e}")
+            logger.error(f"Could not play alarm: {e}")
     
     def stop_alarm(self):
         """Stop alarm sound"""
         try:
-            pygame.mixer.music.stop()
+            if self.alarm_channel is not None:
+                self.alarm_channel.stop()
         except:
             pass
+        self.alarm_channel = None
     
-    def detect_drowsiness(self, frame):
-        """Main drowsiness detection function using MediaPipe"""
+    def process_mesh_image(self, rgb_image):
+        """Run Face Mesh on an RGB image with our own model or one checked out of the shared pool"""
+        if self.face_mesh_pool is None:
+            return self.face_mesh.process(rgb_image)
+        with self.face_mesh_pool.acquire(self) as face_mesh:
+            return face_mesh.process(rgb_image)
+    
+    def analyze_frame(self, frame):
+        """Face mesh, EAR and alert state for one frame (no drawing)"""
+        if self.adaptive is not None:
+            result = self._analyze_adaptive(frame)
+        else:
+            result = self._analyze_full(frame)
+        self.last_result = result
+        return result
+    
+    def _analyze_full(self, frame):
+        """analyze_frame() with Face Mesh on every full-resolution frame"""
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_frame)
+        results = self.process_mesh_image(rgb_frame)
         
         drowsiness_detected = False
         status = "Alert"
         ear = 0
+        eye_pixels = []
         
         if results.multi_face_landmarks:
             for face_landmarks in results.multi_face_landmarks:
-                # Calculate EAR for both eyes
-                left_ear = self.calculate_ear(face_landmarks.landmark, self.LEFT_EYE[:6])
-                right_ear = self.calculate_ear(face_landmarks.landmark, self.RIGHT_EYE[:6])
+                # Extract both eyes once, then EAR for both in one vectorized call
+                left_ear, right_ear = self.calculate_ears(face_landmarks.landmark)
                 
                 # Average EAR
                 ear = (left_ear + right_ear) / 2.0
                 
-                # Draw eye landmarks
-                h, w, _ = frame.shape
-                for idx in self.LEFT_EYE[:6] + self.RIGHT_EYE[:6]:
-                    if idx < len(face_landmarks.landmark):
-                        x = int(face_landmarks.landmark[idx].x * w)
-                        y = int(face_landmarks.landmark[idx].y * h)
-                        cv2.circle(frame, (x, y), 2, (0, 255, 0), -1)
+                # Eye landmark pixels from the same extraction
+                if self.eye_landmarks.valid:
+                    h, w, _ = frame.shape
+                    eye_pixels = self.eye_landmarks.to_pixels(w, h).tolist()
                 
                 # Check for drowsiness
-                if ear < self.EYE_AR_THRESH:
-                    self.COUNTER += 1
-                    
-                    if self.COUNTER >= self.EYE_AR_CONSEC_FRAMES:
-                        if not self.ALARM_ON:
-                            self.ALARM_ON = True
-                            self.sleep_alerts += 1
-                            self.play_alarm()
-                        
-                        drowsiness_detected = True
-                        status = "DROWSINESS ALERT!"
-                        cv2.putText(frame, "DROWSINESS ALERT!", (10, 30),
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                        cv2.putText(frame, "WAKE UP!", (10, 70),
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                else:
-                    self.COUNTER = 0
-                    if self.ALARM_ON:
-                        self.ALARM_ON = False
-                        self.stop_alarm()
-                        self.total_blinks += 1
+                if self.update_alert_state(ear):
+                    drowsiness_detected = True
+                    status = "DROWSINESS ALERT!"
         else:
             status = "No face detected"
         
+        return {"ear": ear, "drowsy": drowsiness_detected, "status": status, "eye_pixels": eye_pixels}
+    
+    def _process_mesh(self, frame, roi=None):
+        """Face Mesh on the frame or a crop of it, downscaled in adaptive mode: (landmarks, crop) or (None, crop)"""
+        h, w, _ = frame.shape
+        x0, y0, x1, y1 = roi or (0, 0, w, h)
+        image = frame[y0:y1, x0:x1]
+        scale = self.adaptive.scale if self.adaptive else 1.0
+        if scale < 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        results = self.process_mesh_image(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        crop = (x0, y0, x1 - x0, y1 - y0, w, h) if roi else None
+        if not results.multi_face_landmarks:
+            return None, crop
+        return results.multi_face_landmarks[0].landmark, crop
+    
+    def _analyze_adaptive(self, frame):
+        """analyze_frame() for adaptive mode: skipped frames reuse the tracked eyes and an estimated EAR"""
+        adaptive = self.adaptive
+        thumb = thumbnail(frame)
+        ran_mesh = adaptive.should_run(thumb)
+        
+        if ran_mesh:
+            h, w, _ = frame.shape
+            roi = adaptive.tracker.roi(w, h)
+            landmarks, crop = self._process_mesh(frame, roi)
+            if landmarks is None and roi is not None:
+                # Face left the crop: look at the whole frame before giving up
+                adaptive.track_lost()
+                landmarks, crop = self._process_mesh(frame)
+            
+            if landmarks is None:
+                adaptive.mesh_ran(thumb, None, roi is not None)
+                return {"ear": 0, "drowsy": False, "status": "No face detected", "eye_pixels": [], "mesh": True}
+            
+            left_ear, right_ear = self.calculate_ears(landmarks, crop)
+            ear = (left_ear + right_ear) / 2.0
+            adaptive.tracker.update(landmarks, crop, self.eye_landmarks)
+            adaptive.mesh_ran(thumb, ear, crop is not None)
+            if self.eye_landmarks.valid:
+                adaptive.last_eye_pixels = self.eye_landmarks.to_pixels(w, h).tolist()
+        else:
+            ear = adaptive.estimate_ear()
+        
+        drowsiness_detected = self.update_alert_state(ear)
+        return {
+            "ear": ear,
+            "drowsy": drowsiness_detected,
+            "status": "DROWSINESS ALERT!" if drowsiness_detected else "Alert",
+            "eye_pixels": adaptive.last_eye_pixels,
+            "mesh": ran_mesh
+        }
+    
+    def update_alert_state(self, ear, now=None):
+        """Advance the closed-eye counter for one frame; True while the alarm condition holds"""
+        now = time.monotonic() if now is None else now
+        closed = ear < self.EYE_AR_THRESH
+        if self.eye_closure.push(closed, now):
+            self.total_blinks += 1
+        
+        if closed:
+            if self.COUNTER == 0:
+                self._closed_since = now
+            self.COUNTER += 1
+            
+            if self.COUNTER >= self.EYE_AR_CONSEC_FRAMES:
+                if not self.ALARM_ON:
+                    self.ALARM_ON = True
+                    self.sleep_alerts += 1
+                    self.play_alarm()
+                    self._alert = {"started_at": datetime.now(), "started": now, "min_ear": ear}
+                elif self._alert is not None:
+                    self._alert["min_ear"] = min(self._alert["min_ear"], ear)
+                return True
+        else:
+            self.COUNTER = 0
+            if self.ALARM_ON:
+                self.ALARM_ON = False
+                self.stop_alarm()
+                self.end_alert(now)
+        return False
+    
+    def finish_alert(self):
+        """Silence the alarm and record an alert still in progress (detection is stopping)"""
+        self.stop_alarm()
+        if self.ALARM_ON:
+            self.ALARM_ON = False
+            self.end_alert()
+    
+    def end_alert(self, now=None):
+        """Close the current sleep alert (eyes opened or detection stopped) and hand it to event_sink"""
+        alert, self._alert = self._alert, None
+        if alert is None or self.event_sink is None:
+            return
+        now = time.monotonic() if now is None else now
+        closure = self.eye_closure.get_stats()
+        try:
+            self.event_sink({
+                "session_id": self.session_id,
+                "user_id": self.user_id,
+                "source": self.source,
+                "event_type": "sleep_alert",
+                "started_at": alert["started_at"].isoformat(timespec="seconds"),
+                "ended_at": datetime.now().isoformat(timespec="seconds"),
+                "alert_s": round(now - alert["started"], 2),
+                "eyes_closed_s": round(now - (self._closed_since or alert["started"]), 2),
+                "min_ear": round(float(alert["min_ear"]), 4),
+                "perclos": closure["perclos"],
+                "blink_rate_per_min": closure["blink_rate_per_min"]
+            })
+        except Exception as e:
+            logger.error(f"Could not record drowsiness event: {e}")
+    
+    def annotate_frame(self, frame, result):
+        """Draw eye landmarks, alert banner and counters for an analyze_frame() result"""
+        for x, y in result["eye_pixels"]:
+            cv2.circle(frame, (x, y), 2, (0, 255, 0), -1)
+        
+        if result["drowsy"]:
+            cv2.putText(frame, "DROWSINESS ALERT!", (10, 30),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            cv2.putText(frame, "WAKE UP!", (10, 70),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        
         # Display information
-        cv2.putText(frame, f"EAR: {ear:.2f}", (300, 30), 
+        cv2.putText(frame, f"EAR: {result['ear']:.2f}", (300, 30), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         cv2.putText(frame, f"Blinks: {self.total_blinks}", (10, 100),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         cv2.putText(frame, f"Alerts: {self.sleep_alerts}", (10, 130),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        cv2.putText(frame, f"Status: {status}", (10, 160),
+        cv2.putText(frame, f"Status: {result['status']}", (10, 160),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        
-        return frame, drowsiness_detected, status
+        return frame
     
-    def start_detection(self, camera_index=0):
-        """Start the drowsiness detection"""
+    def detect_drowsiness(self, frame):
+        """Main drowsiness detection function using MediaPipe"""
+        result = self.analyze_frame(frame)
+        self.annotate_frame(frame, result)
+        return frame, result["drowsy"], result["status"]
+    
+    def start_detection(self, camera_index=0, pipelined=False, target_fps=None, render=None):
+        """
+        Start the drowsiness detection. pipelined=True overlaps capture, inference
+        and rendering on separate threads (see drowsiness_pipeline.py). `render`
+        replaces the OpenCV window (headless use): it gets each annotated frame
+        and returns False to stop.
+        """
         self.is_running = True
+        self.source = str(camera_index)
         cap = cv2.VideoCapture(camera_index)
         
         if not cap.isOpened():
-            print("Error: Could not open camera")
+            logger.error("Could not open camera")
+            self.is_running = False
             return
         
-        print("Drowsiness Detection Started (MediaPipe). Press 'q' to quit.")
+        logger.info("Drowsiness Detection Started (MediaPipe)." + ("" if render else " Press 'q' to quit."))
         
-        while self.is_running:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Flip frame horizontally for mirror effect
-            frame = cv2.flip(frame, 1)
-            
-            # Detect drowsiness
-            frame, drowsy, status = self.detect_drowsiness(frame)
-            
-            # Display frame
-            cv2.imshow("Drowsiness Detection - Smart Grocery Planner", frame)
+        try:
+            if pipelined:
+                self.pipeline = DetectionPipeline(
+                    self, cap, target_fps=DROWSINESS_TARGET_FPS if target_fps is None else target_fps,
+                    render=render or show_in_window
+                )
+                stats = self.pipeline.run()
+                logger.info(f"Pipeline stats: {stats}")
+                return
             
-            # Break on 'q' key press
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-        
-        # Cleanup
-        cap.release()
-        cv2.destroyAllWindows()
-        self.stop_alarm()
+            while self.is_running:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                
+                # Flip frame horizontally for mirror effect
+                frame = cv2.flip(frame, 1)
+                
+                # Detect drowsiness
+                frame, drowsy, status = self.detect_drowsiness(frame)
+                
+                # Display frame (break on 'q' key press) or hand it to the headless sink
+                if (render or show_in_window)(frame) is False:
+                    break
+        finally:
+            # Cleanup
+            self.is_running = False
+            cap.release()
+            if render is None:
+                cv2.destroyAllWindows()
+            self.finish_alert()
     
     def stop_detection(self):
         """Stop the drowsiness detection"""
         self.is_running = False
+        if self.pipeline:
+            self.pipeline.stop()
+    
+    def close(self):
+        """Stop and release the detector's own Face Mesh model (pooled models belong to the pool)"""
+        self.stop_detection()
+        self.finish_alert()
+        if self.face_mesh is not None:
+            self.face_mesh.close()
+            self.face_mesh = None
     
     def get_statistics(self):
         """Get detection statistics"""
@@ -235,35 +414,102 @@ class SimpleDrowsinessDetector:
             "total_blinks": self.total_blinks,
             "sleep_alerts": self.sleep_alerts,
             "current_status": "Running" if self.is_running else "Stopped",
-            "detection_method": "MediaPipe Face Mesh"
+            "detection_method": "MediaPipe Face Mesh",
+            "eye_closure": self.eye_closure.get_stats(),
+            "pipeline": self.pipeline.get_stats() if self.pipeline else None,
+            "adaptive": self.adaptive.get_stats() if self.adaptive else None
         }
 
 # Web interface integration
 class DrowsinessWebInterface:
-    def __init__(self):
-        self.detector = SimpleDrowsinessDetector()
+    # Status updates pushed to SSE viewers at most this often (alert changes go out immediately)
+    STATUS_INTERVAL = 0.25
+    
+    def __init__(self, adaptive=False, face_mesh_pool=None, sound=True, event_sink=None, session_id=None,
+                 user_id=None):
+        self.detector = SimpleDrowsinessDetector(adaptive=adaptive, face_mesh_pool=face_mesh_pool, sound=sound,
+                                                 event_sink=event_sink, session_id=session_id, user_id=user_id)
         self.detection_thread = None
+        self.broadcaster = FrameBroadcaster()
+        self._last_status = (0.0, None)
         
-    def start_web_detection(self):
-        """Start detection in a separate thread for web interface"""
+    def start_web_detection(self, camera_index=0, pipelined=False, target_fps=None, headless=True):
+        """
+        Start detection in a separate thread for web interface. Headless (the
+        default) publishes annotated frames to the broadcaster for the MJPEG
+        stream instead of opening an OpenCV window.
+        """
         if self.detection_thread is None or not self.detection_thread.is_alive():
-            self.detection_thread = threading.Thread(target=self.detector.start_detection)
+            self.broadcaster.open()
+            self.detection_thread = threading.Thread(
+                target=self._run_detection,
+                kwargs={"camera_index": camera_index, "pipelined": pipelined, "target_fps": target_fps,
+                        "render": self._publish_frame if headless else None}
+            )
             self.detection_thread.daemon = True
             self.detection_thread.start()
             return {"status": "started", "message": "Drowsiness detection started using MediaPipe"}
         else:
             return {"status": "already_running", "message": "Detection already running"}
     
+    def _run_detection(self, **kwargs):
+        try:
+            self.detector.start_detection(**kwargs)
+        finally:
+            self.broadcaster.publish(None, self._status())
+            self.broadcaster.close()
+    
+    def _status(self):
+        result = self.detector.last_result or {}
+        return {
+            "running": self.detector.is_running,
+            "status": result.get("status", "Stopped"),
+            "ear": round(float(result.get("ear", 0)), 3),
+            "drowsy": bool(result.get("drowsy", False)),
+            "sleep_alerts": self.detector.sleep_alerts,
+            "total_blinks": self.detector.total_blinks,
+            "perclos": round(self.detector.eye_closure.perclos, 4),
+            "blink_rate_per_min": round(self.detector.eye_closure.blink_rate, 2)
+        }
+    
+    def _publish_frame(self, frame):
+        """Render sink: encode once for all MJPEG viewers (skipped when nobody watches) and push status"""
+        jpeg = encode_jpeg(frame) if self.broadcaster.wanted else None
+        status = None
+        now = time.monotonic()
+        last_time, last_drowsy = self._last_status
+        drowsy = bool((self.detector.last_result or {}).get("drowsy"))
+        if now - last_time >= self.STATUS_INTERVAL or drowsy != last_drowsy:
+            status = self._status()
+            self._last_status = (now, drowsy)
+        if jpeg is not None or status is not None:
+            self.broadcaster.publish(jpeg, status)
+        return True
+    
     def stop_web_detection(self):
         """Stop detection"""
         self.detector.stop_detection()
         return {"status": "stopped", "message": "Drowsiness detection stopped"}
     
+    def close(self, timeout=5.0):
+        """Stop detection, wait for the camera to be released and free the detector"""
+        self.stop_web_detection()
+        if self.detection_thread is not None:
+            self.detection_thread.join(timeout)
+        self.detector.close()
+        self.broadcaster.close()
+    
+    @property
+    def is_running(self):
+        return self.detection_thread is not None and self.detection_thread.is_alive()
+    
     def get_web_statistics(self):
         """Get statistics for web interface"""
-        return self.detector.get_statistics()
+        stats = self.detector.get_statistics()
+        stats["stream"] = self.broadcaster.get_stats()
+        return stats
 
 if __name__ == "__main__":
     # Test the drowsiness detector
-    detector = SimpleDrowsinessDetector()
-    detector.start_detection()
+    detector = SimpleDrowsinessDetector(adaptive=os.getenv('DROWSINESS_ADAPTIVE', '0') == '1')
+    detector.start_detection(pipelined=os.getenv('DROWSINESS_PIPELINED', '0') == '1')
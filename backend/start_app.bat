@@ -27,7 +27,7 @@ echo ✅ Project directory: %cd%
 
 echo.
 echo [3/4] Installing/checking dependencies...
-pip install flask flask-cors python-dotenv --quiet
+pip install flask flask-cors python-dotenv waitress --quiet
 if errorlevel 1 (
     echo WARNING: Some packages may not have installed correctly
 )
@@ -43,7 +43,7 @@ echo 🔥 Press Ctrl+C to stop the server
 echo ==========================================
 echo.
 
-python flask_app.py
+waitress-serve --threads=8 --port=5000 --call app:create_app
 
 echo.
 echo Server stopped. Press any key to exit...
@@ -0,0 +1,87 @@
+# Token buckets, bounded concurrency and the admission decision for LLM routes
+import threading
+
+import pytest
+
+from admission import AdmissionController, ConcurrencyLimiter, TokenBucket
+
+
+def test_token_bucket_allows_a_burst_then_refills():
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    now = bucket.updated
+    assert [bucket.try_acquire(now)[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = bucket.try_acquire(now)
+    assert not allowed and retry_after == pytest.approx(0.5)
+    assert bucket.try_acquire(now + 0.5)[0]
+
+
+def test_token_bucket_never_exceeds_capacity():
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    now = bucket.updated + 100
+    assert [bucket.try_acquire(now)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_refund_returns_a_token():
+    bucket = TokenBucket(rate=0.0, capacity=1)
+    now = bucket.updated
+    assert bucket.try_acquire(now)[0]
+    bucket.refund()
+    assert bucket.try_acquire(now)[0]
+
+
+def test_concurrency_limiter_sheds_beyond_the_queue():
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=0, queue_timeout=0.1)
+    assert limiter.acquire()
+    assert not limiter.acquire()
+    limiter.release()
+    assert limiter.acquire()
+
+
+def test_queued_request_gets_the_released_slot():
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=5)
+    assert limiter.acquire()
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(limiter.acquire()))
+    waiter.start()
+    while limiter.waiting == 0:
+        pass
+    limiter.release()
+    waiter.join(5)
+    assert admitted == [True] and limiter.active == 1
+
+
+def test_session_rate_limit_does_not_affect_other_sessions():
+    controller = AdmissionController(session_rate=0.0, session_burst=1, global_rate=0.0, global_burst=10,
+                                     max_concurrent=10)
+    assert controller.try_admit('a') == (None, 0.0)
+    reason, _ = controller.try_admit('a')
+    assert reason == 'session_rate'
+    assert controller.try_admit('b') == (None, 0.0)
+
+
+def test_global_rejection_does_not_charge_the_session():
+    controller = AdmissionController(session_rate=0.0, session_burst=1, global_rate=0.0, global_burst=1,
+                                     max_concurrent=10)
+    assert controller.try_admit('a')[0] is None
+    assert controller.try_admit('b')[0] == 'global_rate'
+    controller.global_bucket.refund()
+    assert controller.try_admit('b')[0] is None
+
+
+def test_concurrency_rejection_refunds_both_buckets():
+    controller = AdmissionController(session_rate=0.0, session_burst=1, global_rate=0.0, global_burst=1,
+                                     max_concurrent=0, max_queue=0, queue_timeout=0.01)
+    assert controller.try_admit('a')[0] == 'concurrency'
+    controller.limiter.max_concurrent = 1
+    assert controller.try_admit('a')[0] is None
+    stats = controller.get_stats()
+    assert stats['rejected_concurrency'] == 1 and stats['admitted'] == 1 and stats['active'] == 1
+    controller.release()
+    assert controller.get_stats()['active'] == 0
+
+
+def test_tracked_sessions_are_bounded():
+    controller = AdmissionController(max_sessions=2, max_concurrent=10)
+    for key in ('a', 'b', 'c'):
+        controller.check_rate(key)
+    assert controller.get_stats()['tracked_sessions'] == 2
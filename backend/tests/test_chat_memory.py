@@ -0,0 +1,140 @@
+# Token-budgeted chat memory, compaction and sharing conversations through SQLite
+import sqlite3
+import threading
+
+import pytest
+
+from chat_memory import ConversationStore, estimate_tokens, extractive_summary
+from database_service import DatabaseService
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return DatabaseService(str(tmp_path / 'chat.db'))
+
+
+def exchange(n):
+    return f"question {n} about dinner. more words here", f"answer {n} with a recipe. and some detail"
+
+
+def test_first_prompt_has_system_and_user_message():
+    store = ConversationStore()
+    messages = store.build_messages('s', 'SYSTEM', 'hello')
+    assert messages == [{'role': 'system', 'content': 'SYSTEM'}, {'role': 'user', 'content': 'hello'}]
+
+
+def test_turns_are_replayed_in_order():
+    store = ConversationStore()
+    store.add_exchange('s', 'hi', 'hello!')
+    messages = store.build_messages('s', 'SYSTEM', 'next')
+    assert [m['role'] for m in messages] == ['system', 'user', 'assistant', 'user']
+    assert messages[1]['content'] == 'hi' and messages[2]['content'] == 'hello!'
+
+
+def test_sessions_are_isolated():
+    store = ConversationStore()
+    store.add_exchange('a', 'hi', 'hello!')
+    assert len(store.build_messages('b', 'SYSTEM', 'x')) == 2
+
+
+def test_old_turns_are_summarized_to_stay_in_budget():
+    store = ConversationStore(token_budget=40, min_recent_turns=2)
+    for n in range(6):
+        store.add_exchange('s', *exchange(n))
+    messages = store.build_messages('s', 'SYSTEM', 'x')
+    assert messages[1]['content'].startswith('Summary of the earlier conversation')
+    assert 'question 0 about dinner' in messages[1]['content']
+    assert store.describe('s')['summarized']
+    assert store.describe('s')['context_tokens'] <= 40 + estimate_tokens(messages[1]['content'])
+    assert messages[-3]['content'] == exchange(5)[0]
+
+
+def test_summarizer_failure_falls_back_to_extractive_summary():
+    def broken(previous, turns, budget):
+        raise RuntimeError('LLM down')
+
+    store = ConversationStore(token_budget=20, min_recent_turns=2, summarizer=broken)
+    for n in range(4):
+        store.add_exchange('s', *exchange(n))
+    assert 'question 0 about dinner' in store.build_messages('s', 'SYSTEM', 'x')[1]['content']
+
+
+def test_turns_being_summarized_are_still_sent():
+    started, release = threading.Event(), threading.Event()
+
+    def slow(previous, turns, budget):
+        started.set()
+        release.wait(5)
+        return extractive_summary(previous, turns, budget)
+
+    store = ConversationStore(token_budget=20, min_recent_turns=2, summarizer=slow)
+    store.add_exchange('s', *exchange(0))
+    worker = threading.Thread(target=store.add_exchange, args=('s',) + exchange(1))
+    worker.start()
+    assert started.wait(5)
+    contents = [m['content'] for m in store.build_messages('s', 'SYSTEM', 'x')]
+    release.set()
+    worker.join(5)
+    assert exchange(0)[0] in contents and exchange(1)[0] in contents
+
+
+def test_messages_are_truncated():
+    store = ConversationStore(max_message_chars=10)
+    assert store.build_messages('s', 'SYSTEM', 'x' * 50)[-1]['content'] == 'x' * 10
+
+
+def test_least_recently_used_conversation_is_evicted():
+    store = ConversationStore(max_conversations=2)
+    for session_id in ('a', 'b', 'c'):
+        store.add_exchange(session_id, 'hi', 'hello')
+    assert store.get_stats()['conversations'] == 2
+    assert store.describe('a')['turns'] == 0
+
+
+def test_clear_forgets_the_conversation():
+    store = ConversationStore()
+    store.add_exchange('s', 'hi', 'hello')
+    store.clear('s')
+    assert store.describe('s')['turns'] == 0
+
+
+def test_conversation_follows_the_session_across_workers(storage):
+    first, second = ConversationStore(), ConversationStore()
+    first.attach_storage(storage)
+    second.attach_storage(storage)
+    first.add_exchange('s', 'hi', 'hello')
+    second.add_exchange('s', 'and pasta?', 'carbonara')
+    contents = [m['content'] for m in first.build_messages('s', 'SYSTEM', 'x')]
+    assert contents == ['SYSTEM', 'hi', 'hello', 'and pasta?', 'carbonara', 'x']
+
+
+def test_summary_is_shared_across_workers(storage):
+    first, second = (ConversationStore(token_budget=40, min_recent_turns=2) for _ in range(2))
+    first.attach_storage(storage)
+    second.attach_storage(storage)
+    for n in range(6):
+        (first if n % 2 else second).add_exchange('s', *exchange(n))
+    messages = first.build_messages('s', 'SYSTEM', 'x')
+    assert 'question 0 about dinner' in messages[1]['content']
+    assert messages[1]['content'].endswith(storage.get_chat_conversation('s')['summary'])
+
+
+def test_reset_on_one_worker_clears_the_others(storage):
+    first, second = ConversationStore(), ConversationStore()
+    first.attach_storage(storage)
+    second.attach_storage(storage)
+    first.add_exchange('s', 'hi', 'hello')
+    second.build_messages('s', 'SYSTEM', 'x')
+    first.clear('s')
+    assert len(second.build_messages('s', 'SYSTEM', 'x')) == 2
+
+
+def test_idle_conversations_are_pruned_from_storage(storage):
+    store = ConversationStore(idle_ttl=3600)
+    store.attach_storage(storage)
+    store.add_exchange('old', 'hi', 'hello')
+    with sqlite3.connect(storage.db_path) as conn:
+        conn.execute("UPDATE chat_conversations SET updated_at = updated_at - 7200 WHERE session_id = 'old'")
+    store.add_exchange('new', 'hi', 'hello')
+    assert storage.get_chat_conversation('old') is None
+    assert storage.get_chat_conversation('new')['turns'][0]['content'] == 'hi'
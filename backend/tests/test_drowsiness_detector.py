@@ -0,0 +1,99 @@
+# Alert timing of SimpleDrowsinessDetector on scripted Face Mesh sequences (needs OpenCV, no camera or audio)
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+
+from fakes import ScriptedFaceMesh, SingleMeshPool  # noqa: E402
+from simple_drowsiness_detector import SimpleDrowsinessDetector  # noqa: E402
+
+OPEN_EAR = 0.32
+CLOSED_EAR = 0.12
+
+
+def script(*runs):
+    return np.concatenate([np.full(frames, ear) for frames, ear in runs])
+
+
+def replay(ears, faces=None, frame_rate=30.0):
+    """Feed a script through analyze_frame(); returns the detector, per-frame alerts, alarm frames and events"""
+    detector = SimpleDrowsinessDetector(sound=False, face_mesh_pool=SingleMeshPool(ScriptedFaceMesh(ears, faces)),
+                                        frame_rate=frame_rate)
+    alarms, events, current = [], [], [0]
+    detector.play_alarm = lambda: alarms.append(current[0])
+    detector.stop_alarm = lambda: None
+    detector.event_sink = events.append
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    drowsy = []
+    for n in range(len(ears)):
+        current[0] = n
+        drowsy.append(detector.analyze_frame(frame)['drowsy'])
+    return detector, np.array(drowsy), alarms, events
+
+
+def test_detector_measures_the_scripted_ear():
+    detector, _, _, _ = replay(script((5, OPEN_EAR)))
+    assert detector.last_result['ear'] == pytest.approx(OPEN_EAR)
+
+
+def test_open_eyes_never_alert():
+    detector, drowsy, alarms, events = replay(script((300, OPEN_EAR)))
+    assert not drowsy.any() and alarms == [] and events == []
+    assert detector.eye_closure.perclos == 0.0
+
+
+def test_alert_fires_on_the_last_frame_of_one_second_closure():
+    detector, drowsy, alarms, events = replay(script((10, OPEN_EAR), (30, CLOSED_EAR), (10, OPEN_EAR)))
+    assert alarms == [39]
+    assert drowsy[39] and drowsy.sum() == 1
+    assert len(events) == 1 and events[0]['event_type'] == 'sleep_alert'
+    assert detector.sleep_alerts == 1 and detector.total_blinks == 0
+
+
+def test_one_frame_short_is_a_blink():
+    detector, drowsy, alarms, events = replay(script((10, OPEN_EAR), (29, CLOSED_EAR), (10, OPEN_EAR)))
+    assert alarms == [] and not drowsy.any() and events == []
+    assert detector.total_blinks == 1
+
+
+def test_lower_frame_rate_needs_fewer_frames_for_the_same_seconds():
+    _, _, alarms, _ = replay(script((10, OPEN_EAR), (15, CLOSED_EAR), (10, OPEN_EAR)), frame_rate=15.0)
+    assert alarms == [24]
+
+
+def test_alert_lasts_until_the_eyes_open():
+    _, drowsy, alarms, events = replay(script((10, OPEN_EAR), (60, CLOSED_EAR), (10, OPEN_EAR)))
+    assert alarms == [39]
+    assert drowsy[39:70].all() and not drowsy[70:].any()
+    assert len(events) == 1 and events[0]['min_ear'] == pytest.approx(CLOSED_EAR, abs=1e-4)
+
+
+def test_frames_without_a_face_do_not_reset_the_closure():
+    ears = script((10, OPEN_EAR), (40, CLOSED_EAR), (10, OPEN_EAR))
+    faces = np.ones(len(ears), dtype=bool)
+    faces[20] = False
+    detector, drowsy, alarms, _ = replay(ears, faces)
+    assert alarms == [40]  # 30 closed frames seen, one frame later than without the dropout
+    assert detector.last_result['status'] == 'Alert'
+
+
+def test_repeated_closures_raise_one_alarm_each():
+    detector, _, alarms, events = replay(script((10, OPEN_EAR), (45, CLOSED_EAR), (20, OPEN_EAR),
+                                                (35, CLOSED_EAR), (5, OPEN_EAR)))
+    assert alarms == [39, 104]
+    assert detector.sleep_alerts == 2 and len(events) == 2
+
+
+def test_live_rate_converts_seconds_to_frames():
+    detector = SimpleDrowsinessDetector(sound=False, face_mesh_pool=SingleMeshPool(None))
+    detector.play_alarm = detector.stop_alarm = lambda: None
+    fps, t, alerted_at = 15.0, 0.0, None
+    for n in range(30):
+        detector.update_alert_state(OPEN_EAR, t)
+        t += 1 / fps
+    for n in range(30):
+        if detector.update_alert_state(CLOSED_EAR, t) and alerted_at is None:
+            alerted_at = n + 1
+        t += 1 / fps
+    assert detector.EYE_AR_CONSEC_FRAMES == 15
+    assert alerted_at == 15  # one second of closed eyes at 15 fps, not 30 frames
@@ -0,0 +1,161 @@
+# EAR math, closure window (PERCLOS, blinks, frame rate) and the offline alert rule
+import numpy as np
+import pytest
+
+from drowsiness_batch import alert_events, blink_count
+from drowsiness_metrics import (
+    EAR_POINTS, EYE_AR_CONSEC_FRAMES, EyeClosureWindow, EyeLandmarks, LandmarkBuffer, closed_frames,
+    eye_aspect_ratios
+)
+from fakes import Landmark
+
+
+def eye(ear, width=2.0):
+    """Six eye points (p0..p5) whose EAR is exactly `ear`"""
+    half, opening = width / 2, ear * width / 2
+    return np.array([[-half, 0], [-half / 2, -opening], [half / 2, -opening],
+                     [half, 0], [half / 2, opening], [-half / 2, opening]], dtype=np.float64)
+
+
+def test_ear_of_shaped_eyes():
+    for ear in (0.0, 0.12, 0.25, 0.32):
+        assert eye_aspect_ratios(eye(ear)) == pytest.approx(ear)
+
+
+def test_ear_matches_the_textbook_formula():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 1, (EAR_POINTS, 2))
+    dist = lambda a, b: np.linalg.norm(points[a] - points[b])
+    expected = (dist(1, 5) + dist(2, 4)) / (2 * dist(0, 3))
+    assert eye_aspect_ratios(points) == pytest.approx(expected)
+
+
+def test_ear_is_vectorized_over_frames_and_eyes():
+    frames = np.stack([np.stack([eye(0.1), eye(0.3)]), np.stack([eye(0.2), eye(0.2)])])
+    assert eye_aspect_ratios(frames) == pytest.approx(np.array([[0.1, 0.3], [0.2, 0.2]]))
+
+
+def test_ear_of_a_zero_width_eye_is_zero():
+    assert eye_aspect_ratios(np.zeros((EAR_POINTS, 2))) == 0.0
+
+
+def test_landmark_buffer_reads_only_tracked_indices():
+    landmarks = [Landmark(i / 10, i / 20) for i in range(10)]
+    buffer = LandmarkBuffer([2, 7])
+    assert buffer.fill(landmarks)
+    assert buffer.points.tolist() == [[0.2, 0.1], [0.7, 0.35]]
+    assert buffer.to_pixels(100, 200).tolist() == [[20, 20], [70, 70]]
+    assert not LandmarkBuffer([12]).fill(landmarks)
+
+
+def test_eye_landmarks_shape():
+    landmarks = [Landmark(0.5, 0.5) for _ in range(478)]
+    buffer = EyeLandmarks()
+    assert buffer.fill(landmarks)
+    assert buffer.eye_points().shape == (2, EAR_POINTS, 2)
+
+
+def test_closed_frames_converts_seconds_at_the_frame_rate():
+    assert EYE_AR_CONSEC_FRAMES == closed_frames(30.0) == 30
+    assert closed_frames(15.0) == 15
+    assert closed_frames(30.0, closed_s=0.5) == 15
+    assert closed_frames(0.1) == 1
+
+
+def test_perclos_is_the_closed_share_of_the_window():
+    window = EyeClosureWindow(window_s=10, capacity=1000, fps=10)
+    for n in range(100):
+        window.push(n % 4 == 0, n / 10)
+    assert window.perclos == pytest.approx(0.25)
+    assert window.get_stats()['samples'] == 100
+
+
+def test_perclos_forgets_samples_older_than_the_window():
+    window = EyeClosureWindow(window_s=5, capacity=1000, fps=10)
+    for n in range(50):
+        window.push(True, n / 10)
+    for n in range(50, 120):
+        window.push(False, n / 10)
+    assert window.perclos == 0.0
+    assert window.covered_s == pytest.approx(5.0, abs=0.11)
+
+
+def test_perclos_with_a_full_ring_buffer_covers_the_newest_samples():
+    window = EyeClosureWindow(window_s=60, capacity=10, fps=10)
+    for n in range(20):
+        window.push(n >= 15, n / 10)
+    assert window.perclos == pytest.approx(0.5)
+
+
+def test_short_closures_are_blinks_and_long_ones_are_not():
+    window = EyeClosureWindow(fps=30)
+    closures = [3, 29, 30, 90]  # frames; an alert needs 30 at 30 fps
+    t = 0.0
+    blinks = []
+    for frames in closures:
+        for _ in range(frames):
+            window.push(True, t)
+            t += 1 / 30
+        blinks.append(window.push(False, t))
+        t += 1 / 30
+    assert blinks == [True, True, False, False]
+    assert window.total_blinks == 2
+
+
+def test_blink_rate_per_minute():
+    window = EyeClosureWindow(window_s=60, fps=30)
+    t = 0.0
+    for second in range(30):
+        for frame in range(30):
+            window.push(frame < 3, t)  # one 3-frame blink a second
+            t += 1 / 30
+    assert window.total_blinks == 30
+    assert window.blink_rate == pytest.approx(60.0, rel=0.05)
+
+
+@pytest.mark.parametrize('fps', [12.0, 15.0, 30.0])
+def test_alert_length_follows_the_measured_frame_rate(fps):
+    window = EyeClosureWindow()
+    for n in range(60):
+        window.push(False, n / fps)
+    assert window.fps == pytest.approx(fps)
+    assert window.consec_frames == closed_frames(fps)
+
+
+def test_pauses_do_not_count_as_slow_frames():
+    window = EyeClosureWindow()
+    for n in range(30):
+        window.push(False, n / 30)
+    window.push(False, 100.0)
+    assert window.fps == pytest.approx(30.0)
+
+
+def test_pinned_frame_rate_ignores_sample_times():
+    window = EyeClosureWindow(fps=30)
+    for n in range(30):
+        window.push(False, n / 1000)
+    assert window.consec_frames == 30
+
+
+def test_offline_alert_needs_closed_s_at_the_recording_fps():
+    ears = np.r_[np.full(10, 0.3), np.full(15, 0.1), np.full(5, 0.3)]
+    faces = np.ones(len(ears), dtype=bool)
+    alerts, events = alert_events(ears, faces, fps=15.0)
+    assert alerts.sum() == 1 and events[0]['start_frame'] == 24 and events[0]['duration_s'] == 1.0
+    alerts, events = alert_events(ears, faces, fps=30.0)
+    assert not alerts.any() and events == []
+
+
+def test_offline_alert_ignores_frames_without_a_face():
+    ears = np.r_[np.full(5, 0.3), np.full(40, 0.1), np.full(5, 0.3)]
+    faces = np.ones(len(ears), dtype=bool)
+    faces[20] = False
+    alerts, events = alert_events(ears, faces, fps=30.0)
+    assert [e['start_frame'] for e in events] == [35]
+    assert alerts[35:45].all() and not alerts[:35].any()
+
+
+def test_blink_count_of_closed_runs():
+    closed = np.array([0, 1, 1, 0, 1, 0, 1, 1, 1, 1, 0], dtype=bool)
+    assert blink_count(closed, consec_frames=4) == 2
+    assert blink_count(closed, consec_frames=5) == 3
@@ -0,0 +1,118 @@
+# Background job queue: stages, failures, retries and recovery through SQLite
+import time
+
+import pytest
+
+from database_service import DatabaseService
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return DatabaseService(str(tmp_path / 'jobs.db'))
+
+
+def wait_for(queue, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job and job['status'] in ('succeeded', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def two_stage_job(payload, context):
+    context.stage('plan')
+    context.stage('nutrition')
+    return {'doubled': payload['n'] * 2}
+
+
+def failing_job(payload, context):
+    context.stage('plan')
+    raise ValueError('no recipes')
+
+
+@pytest.mark.parametrize('persistent', [False, True])
+def test_job_runs_through_its_stages(persistent, storage):
+    queue = JobQueue(workers=1)
+    if persistent:
+        queue.attach_storage(storage)
+    queue.register('double', two_stage_job)
+    job = wait_for(queue, queue.submit('double', {'n': 21}, user_id=7)['id'])
+    assert job['status'] == 'succeeded' and job['result'] == {'doubled': 42}
+    assert [(p['stage'], p['status']) for p in job['progress']] == [('plan', 'done'), ('nutrition', 'done')]
+    assert queue.get_stats()['storage'] == ('sqlite' if persistent else 'memory')
+
+
+def test_failed_job_records_the_error():
+    queue = JobQueue(workers=1)
+    queue.register('fail', failing_job)
+    job = wait_for(queue, queue.submit('fail', {})['id'])
+    assert job['status'] == 'failed' and job['error'] == 'no recipes'
+    assert job['progress'][-1]['status'] == 'failed'
+    assert queue.get_stats()['failed'] == 1
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError):
+        JobQueue().submit('nope', {})
+
+
+def test_full_queue_rejects_new_jobs():
+    queue = JobQueue(workers=1, max_pending=0)
+    queue.register('double', two_stage_job)
+    assert queue.submit('double', {'n': 1}) is None
+    assert queue.get_stats()['rejected'] == 1
+
+
+def test_stream_yields_until_the_job_finishes():
+    queue = JobQueue(workers=1)
+    queue.register('double', two_stage_job)
+    job = queue.submit('double', {'n': 1})
+    updates = list(queue.stream(job['id'], timeout=5, poll_interval=0.05))
+    assert updates[-1]['status'] == 'succeeded'
+
+
+def test_streams_past_the_cap_are_refused():
+    queue = JobQueue(workers=1, max_streams=1)
+    assert queue.open_stream()
+    assert not queue.open_stream()
+    queue.close_stream()
+    assert queue.open_stream()
+    assert queue.get_stats()['streams_rejected'] == 1
+
+
+def test_jobs_left_by_a_dead_process_are_recovered(storage):
+    dead = JobQueue(workers=1)
+    dead.attach_storage(storage)
+    dead.register('double', two_stage_job)
+    now = time.time()
+    storage.save_job({'id': 'orphan', 'kind': 'double', 'user_id': 1, 'status': 'running', 'payload': {'n': 4},
+                      'attempts': 1, 'worker': 'gone', 'created_at': '2026-01-01T00:00:00', 'updated_at': now - 600})
+    queue = JobQueue(workers=1, stale_after=300)
+    queue.attach_storage(storage)
+    queue.register('double', two_stage_job)
+    queue.start()
+    job = wait_for(queue, 'orphan')
+    assert job['status'] == 'succeeded' and job['result'] == {'doubled': 8}
+    assert queue.get_stats()['recovered'] == 1
+
+
+def test_jobs_over_the_attempt_limit_fail(storage):
+    storage.save_job({'id': 'flaky', 'kind': 'double', 'status': 'queued', 'payload': {'n': 1}, 'attempts': 2,
+                      'created_at': '2026-01-01T00:00:00', 'updated_at': time.time()})
+    queue = JobQueue(workers=1, max_attempts=2)
+    queue.attach_storage(storage)
+    queue.register('double', two_stage_job)
+    queue.start()
+    job = wait_for(queue, 'flaky')
+    assert job['status'] == 'failed' and 'Gave up' in job['error']
+
+
+def test_a_claimed_job_is_not_run_twice(storage):
+    queue = JobQueue(workers=1)
+    queue.attach_storage(storage)
+    queue.register('double', two_stage_job)
+    job = wait_for(queue, queue.submit('double', {'n': 1})['id'])
+    assert not storage.claim_job(job['id'], 'other', time.time() - 300, time.time())
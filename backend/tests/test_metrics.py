@@ -0,0 +1,56 @@
+# DatabaseService instrumentation: latency and errors, including errors methods return instead of raising
+import pytest
+
+from metrics import Counter, Histogram, instrument_methods
+
+
+@pytest.fixture
+def instrumented():
+    class FakeService:
+        def ok(self):
+            return {'status': 'success'}
+
+        def failed(self):
+            return {'status': 'error', 'message': 'disk I/O error'}
+
+        def raises(self):
+            raise RuntimeError('boom')
+
+        def rows(self):
+            return []
+
+    errors = Counter('test_errors_total', 'errors', ('method',))
+    latency = Histogram('test_duration_seconds', 'latency', ('method',))
+    return instrument_methods(FakeService, latency, errors)(), errors, latency
+
+
+def test_errors_count_raised_and_returned_failures(instrumented):
+    service, errors, _ = instrumented
+    service.ok()
+    service.rows()
+    service.failed()
+    with pytest.raises(RuntimeError):
+        service.raises()
+    assert errors.snapshot() == {'["failed"]': 1.0, '["raises"]': 1.0}
+
+
+def test_every_call_is_timed(instrumented):
+    service, _, latency = instrumented
+    service.ok()
+    assert '["ok"]' in latency.snapshot()
+
+
+def test_database_fallbacks_are_counted(tmp_path):
+    from database_service import DatabaseService
+    from metrics import db_errors_total
+
+    service = DatabaseService(str(tmp_path / 'gone' / 'app.db'))
+    (tmp_path / 'gone' / 'app.db').unlink()
+    (tmp_path / 'gone').rmdir()
+    before = db_errors_total.snapshot()
+    assert service.get_job('missing') is None
+    assert service.save_drowsiness_events([{}])['status'] == 'error'
+    after = db_errors_total.snapshot()
+    for method in ('get_job', 'save_drowsiness_events'):
+        key = f'["{method}"]'
+        assert after[key] - before.get(key, 0.0) == 1.0
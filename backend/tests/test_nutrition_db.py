@@ -0,0 +1,103 @@
+# Nutrition database: quantity parsing, name matching, totals and the compiled (memory-mapped) matrix
+import os
+
+import pytest
+
+import nutrition_db
+from nutrition_db import NUTRIENTS, parse_quantity
+
+CSV = """name,aliases,calories,protein_g,carbs_g,fat_g,fiber_g,sugar_g,sodium_mg,unit_g,density
+chicken breast,chicken|chicken fillet,120,22.5,0,2.6,0,0,45,120,0.6
+white rice,rice,130,2.7,28,0.3,0.4,0.1,1,185,0.85
+olive oil,,884,0,0,100,0,0,2,14,0.92
+garlic,,149,6.4,33,0.5,2.1,1,17,3,1
+salt,,0,0,0,0,0,0,38758,6,1.2
+"""
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'nutrition.csv'
+    path.write_text(CSV)
+    return str(path)
+
+
+@pytest.fixture
+def db(csv_path, tmp_path):
+    return nutrition_db.load(csv_path, str(tmp_path / 'compiled' / 'nutrition'))
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('200g chicken breast', (200.0, 'g', 'chicken breast')),
+    ('1 1/2 cups rice, rinsed', (1.5, 'cup', 'rice')),
+    ('½ cup milk', (0.5, 'cup', 'milk')),
+    ('2-3 cloves garlic', (2.5, 'clove', 'garlic')),
+    ('a pinch of salt', (1.0, 'pinch', 'salt')),
+    ('2 chicken breasts (boneless)', (2.0, None, 'chicken breasts')),
+    ('salt to taste', (None, None, 'salt to taste')),
+])
+def test_parse_quantity(line, expected):
+    assert parse_quantity(line) == expected
+
+
+def test_compiled_database_is_memory_mapped(db):
+    assert db.storage == 'mmap' and len(db) == 5
+
+
+def test_stale_compiled_database_is_rebuilt(csv_path, tmp_path, db):
+    with open(csv_path, 'a') as handle:
+        handle.write("broccoli,,34,2.8,7,0.4,2.6,1.7,33,90,0.4\n")
+    os.utime(csv_path, (os.path.getmtime(csv_path) + 10,) * 2)
+    rebuilt = nutrition_db.load(csv_path, str(tmp_path / 'compiled' / 'nutrition'))
+    assert len(rebuilt) == 6 and rebuilt.match('broccoli')[0] is not None
+
+
+def test_name_matching_exact_alias_partial_and_fuzzy(db):
+    assert db.match('chicken breast') == (0, 1.0)
+    assert db.match('Rice') == (1, 1.0)
+    row, score = db.match('boneless skinless chicken breast')
+    assert row == 0 and score == 0.5
+    row, score = db.match('chiken breast')
+    assert row == 0 and 0.6 <= score < 1.0
+    assert db.match('unobtainium')[0] is None
+
+
+def test_grams_from_weight_volume_and_count(db):
+    assert db.parse_ingredient('200g chicken breast')['grams'] == 200.0
+    assert db.parse_ingredient('1 tbsp olive oil')['grams'] == pytest.approx(13.8, abs=0.1)
+    assert db.parse_ingredient('2 chicken breasts')['grams'] == 240.0
+    assert db.parse_ingredient('salt to taste')['grams'] == 0.0
+
+
+def test_recipe_nutrition_is_per_serving(db):
+    result = db.recipe_nutrition(['200g chicken breast', '100g rice'], servings=2)
+    assert result['calories'] == pytest.approx((240 + 130) / 2)
+    assert result['protein_g'] == pytest.approx((45 + 2.7) / 2, abs=0.1)
+    assert result['complete'] and result['coverage'] == 1.0 and result['unmatched'] == []
+
+
+def test_unmatched_main_ingredient_makes_the_result_incomplete(db):
+    result = db.recipe_nutrition(['300g unobtainium', '200g chicken breast', '100g rice'], servings=1)
+    assert not result['complete'] and result['unmatched'] == ['300g unobtainium']
+    assert result['calories'] == pytest.approx(370)
+
+
+@pytest.mark.parametrize('servings', [None, 0, 'two', '2-3'])
+def test_bad_servings_count_as_one(db, servings):
+    assert db.recipe_nutrition(['100g rice'], servings)['calories'] == pytest.approx(130)
+
+
+def test_empty_recipe(db):
+    result = db.recipe_nutrition([], 4)
+    assert all(result[name] == 0.0 for name in NUTRIENTS) and not result['complete']
+
+
+def test_dish_nutrition_counts_one_portion_per_food(db):
+    result = db.dish_nutrition('Grilled chicken with rice')
+    assert result['foods'] == ['chicken breast', 'white rice']
+    assert result['calories'] == pytest.approx(120 * 1.2 + 130 * 1.85, abs=0.1)
+
+
+def test_shipped_csv_compiles(tmp_path):
+    db = nutrition_db.load(nutrition_db.NUTRITION_CSV, str(tmp_path / 'nutrition'))
+    assert len(db) > 100 and db.match('salmon')[0] is not None
@@ -0,0 +1,90 @@
+# Recipe similarity index: signatures, hard filters and sharing recipes through SQLite
+import pytest
+
+from database_service import DatabaseService
+from recipe_index import RecipeIndex, parse_servings, request_signature
+
+REQUEST = {'ingredients': ['2 Chicken Breasts', 'fresh rice', 'broccoli'], 'cuisine_type': 'Asian',
+           'meal_type': 'Dinner', 'dietary_restrictions': ['gluten-free'], 'servings': 4}
+
+
+def signature(**changes):
+    return request_signature(dict(REQUEST, **changes))
+
+
+@pytest.mark.parametrize('value, expected', [
+    (4, 4), ('4', 4), (2.0, 2), ('2.5', 2), (0, 1), (None, 4), ('', 4), ('2-3', 4), ('many', 4), ([2], 4),
+    (float('inf'), 4)
+])
+def test_parse_servings(value, expected):
+    assert parse_servings(value) == expected
+
+
+def test_signature_normalizes_ingredients_and_fields():
+    sig = signature()
+    assert sig['ingredients'] == ['broccoli', 'chicken breast', 'rice']
+    assert sig['cuisine'] == 'asian' and sig['meal'] == 'dinner'
+    assert sig['diet'] == ['gluten-free'] and sig['servings'] == 4
+
+
+def test_vectors_are_normalized():
+    index = RecipeIndex(dim=256)
+    assert float((index.vectorize(signature()) ** 2).sum()) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_same_request_hits():
+    index = RecipeIndex()
+    index.add(1, signature(), {'name': 'Chicken Rice Bowl'})
+    recipe, score = index.query(signature(ingredients=['rice', 'broccoli', 'chicken breast']))
+    assert recipe == {'name': 'Chicken Rice Bowl'} and score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_different_request_misses():
+    index = RecipeIndex()
+    index.add(1, signature(), {'name': 'Chicken Rice Bowl'})
+    assert index.query(signature(ingredients=['salmon', 'potato'], cuisine_type='Nordic'))[0] is None
+
+
+@pytest.mark.parametrize('changes', [
+    {'dietary_restrictions': ['gluten-free', 'vegan']},
+    {'servings': 2},
+    {'ingredients': REQUEST['ingredients'] + ['peanuts']},
+])
+def test_hard_filters_reject_close_matches(changes):
+    index = RecipeIndex(threshold=0.5)
+    index.add(1, signature(), {'name': 'Chicken Rice Bowl'})
+    assert index.query(signature(**changes))[0] is None
+
+
+def test_stored_recipe_with_more_ingredients_still_matches():
+    index = RecipeIndex(threshold=0.8)
+    index.add(1, signature(ingredients=REQUEST['ingredients'] + ['garlic']), {'name': 'Garlic Chicken Rice'})
+    assert index.query(signature())[0] == {'name': 'Garlic Chicken Rice'}
+
+
+def test_adding_a_known_id_is_a_no_op():
+    index = RecipeIndex()
+    index.add(1, signature(), {'name': 'a'})
+    index.add(1, signature(), {'name': 'b'})
+    assert len(index) == 1
+
+
+def test_stats_count_hits_and_misses():
+    index = RecipeIndex()
+    index.add(1, signature(), {'name': 'a'})
+    index.query(signature())
+    index.query(signature(servings=8))
+    stats = index.get_stats()
+    assert stats['lookups'] == 2 and stats['hits'] == 1 and stats['hit_rate'] == 0.5
+
+
+def test_load_picks_up_recipes_saved_by_other_workers(tmp_path):
+    storage = DatabaseService(str(tmp_path / 'recipes.db'))
+    worker = RecipeIndex(refresh_interval=0)
+    worker.load(storage)
+    assert worker.query(signature())[0] is None
+    storage.save_recipe({'name': 'Chicken Rice Bowl', 'ingredients': REQUEST['ingredients']}, signature())
+    worker.load(storage)
+    recipe, _ = worker.query(signature())
+    assert recipe is not None and recipe['name'] == 'Chicken Rice Bowl'
+    assert worker.get_stats()['refreshed_recipes'] == 1
@@ -0,0 +1,90 @@
+# Recipe completion parsing, schema normalization and parse statistics
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from recipe_parser import (
+    RecipeParseStats, build_recipe_prompt, normalize_recipe, parse_recipe_json, recipe_response_format
+)
+
+RECIPE = {'name': 'Chicken Rice Bowl', 'prep_time': '25 minutes', 'servings': 2, 'calories': 540,
+          'ingredients': ['200g chicken breast', '1 cup rice'], 'instructions': ['Cook rice', 'Grill chicken'],
+          'tips': 'Rest the chicken'}
+FALLBACK = {'name': 'Fallback', 'prep_time': '30 minutes', 'servings': 4, 'calories': 400,
+            'ingredients': ['rice'], 'instructions': ['Cook'], 'tips': 'Enjoy'}
+
+
+def test_plain_json_parses_directly():
+    assert parse_recipe_json(json.dumps(RECIPE)) == (RECIPE, 'direct')
+
+
+def test_fenced_json_is_unwrapped():
+    text = '```json\n' + json.dumps(RECIPE) + '\n```'
+    assert parse_recipe_json(text) == (RECIPE, 'fenced')
+
+
+def test_object_is_extracted_from_prose():
+    text = 'Here is your recipe:\n' + json.dumps(RECIPE) + '\nEnjoy your meal! {not json}'
+    assert parse_recipe_json(text) == (RECIPE, 'extracted')
+
+
+def test_trailing_commas_are_repaired():
+    text = '{"name": "Soup", "ingredients": ["water", "salt",], "servings": 2,}'
+    assert parse_recipe_json(text) == ({'name': 'Soup', 'ingredients': ['water', 'salt'], 'servings': 2}, 'repaired')
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('{"name": "Soup", "ingredients": ["water", "sa', {'name': 'Soup', 'ingredients': ['water', 'sa']}),
+    ('{"name": "Soup", "servings": 2, "tips": "Serve', {'name': 'Soup', 'servings': 2, 'tips': 'Serve'}),
+    ('{"name": "Soup", "calor', {'name': 'Soup'}),
+    ('{"name": "Soup", "calories":', {'name': 'Soup'}),
+])
+def test_truncated_completions_keep_the_complete_fields(text, expected):
+    assert parse_recipe_json(text) == (expected, 'extracted')
+
+
+@pytest.mark.parametrize('text', [None, '', 'I cannot help with that.', '[]', '{}'])
+def test_unparseable_completions_fail(text):
+    recipe, stage = parse_recipe_json(text)
+    assert recipe is None and stage in ('empty', 'failed')
+
+
+def test_normalize_coerces_types():
+    recipe = normalize_recipe({'name': '  Soup ', 'servings': '4 people', 'calories': '350 kcal',
+                               'ingredients': 'water\n\nsalt\n', 'instructions': ['Boil', '', None]}, FALLBACK)
+    assert recipe['name'] == 'Soup' and recipe['servings'] == 4 and recipe['calories'] == 350
+    assert recipe['ingredients'] == ['water', 'salt'] and recipe['instructions'] == ['Boil']
+
+
+@pytest.mark.parametrize('value, expected', [('1,200 kcal', 1200), ('about 2,450.5', 2450), (1350, 1350)])
+def test_normalize_reads_thousands_separators(value, expected):
+    assert normalize_recipe({'calories': value}, FALLBACK)['calories'] == expected
+
+
+def test_normalize_fills_gaps_from_the_fallback():
+    recipe = normalize_recipe({'name': 'Soup', 'calories': 'unknown', 'ingredients': 7}, FALLBACK)
+    assert recipe['calories'] == 400 and recipe['ingredients'] == ['rice'] and recipe['tips'] == 'Enjoy'
+    assert set(recipe) == set(FALLBACK)
+
+
+def test_prompt_lists_the_request():
+    prompt = build_recipe_prompt({'ingredients': ['rice', 'egg'], 'cuisine_type': 'Asian', 'servings': 2,
+                                  'dietary_restrictions': ['vegetarian'], 'cooking_time': '20 min'})
+    assert prompt.splitlines() == ['ingredients: rice, egg', 'cuisine: Asian', 'meal: lunch', 'servings: 2',
+                                   'diet: vegetarian', 'max time: 20 min']
+
+
+def test_response_format_by_model():
+    assert recipe_response_format('gpt-4o-mini')['type'] == 'json_schema'
+    assert recipe_response_format('gpt-3.5-turbo') == {'type': 'json_object'}
+
+
+def test_parse_stats():
+    stats = RecipeParseStats()
+    stats.record('direct', True, SimpleNamespace(prompt_tokens=100, completion_tokens=50))
+    stats.record('failed', False, SimpleNamespace(prompt_tokens=100, completion_tokens=30))
+    snapshot = stats.snapshot()
+    assert snapshot['parse_success_rate'] == 0.5 and snapshot['wasted_completion_tokens'] == 30
+    assert snapshot['tokens_per_successful_recipe'] == 280.0
+    assert snapshot['stages'] == {'direct': 1, 'failed': 1}
@@ -0,0 +1,4 @@
+# WSGI entry point for the Smart Grocery + Recipe Planner
+from app import create_app
+
+app = create_app()